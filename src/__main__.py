@@ -7,8 +7,10 @@ import logging
 import sys
 from pathlib import Path
 
-from .config import load_config
+from .config import load_config, apply_overrides
 from .scheduler import Scheduler
+from .stats import format_summary
+from .workers import run_workers
 
 logging.basicConfig(
     level=logging.INFO,
@@ -20,6 +22,11 @@ def parse_args():
     parser = argparse.ArgumentParser(description="Stream Sim")
     parser.add_argument("--config", "-c", required=True, help="Path to configuration file")
     parser.add_argument("--debug", action="store_true", help="Enable debug logging")
+    parser.add_argument("--workers", "-w", type=int, default=1, help="Number of worker processes")
+    parser.add_argument("--unthrottled", action="store_true", help="Ignore rates and generate as fast as possible")
+    parser.add_argument("--count", "-n", type=int, help="Stop each stream after this many records")
+    parser.add_argument("--duration", "-d", type=float, help="Stop each stream after this many seconds")
+    parser.add_argument("--resume", action="store_true", help="Continue every stream from its last checkpoint")
     return parser.parse_args()
 
 def main():
@@ -28,6 +35,10 @@ def main():
     if args.debug:
         logger.setLevel(logging.DEBUG)
     
+    if args.workers < 1:
+        logger.error(f"--workers must be at least 1, got {args.workers}")
+        sys.exit(1)
+    
     config_path = Path(args.config)
     if not config_path.exists():
         logger.error(f"Configuration file not found: {args.config}")
@@ -38,11 +49,26 @@ def main():
         logger.info(f"Loaded configuration from {config_path}")
         logger.debug(f"Configuration: {config}")
         
-        scheduler = Scheduler(config)
-        asyncio.run(scheduler.run())
+        apply_overrides(config, args.unthrottled, args.count, args.duration)
+        if args.resume and "checkpoint" not in config:
+            logger.error("--resume needs a checkpoint section in the configuration")
+            sys.exit(1)
+        
+        if args.workers > 1:
+            totals = run_workers(config, args.workers, args.resume)
+        else:
+            scheduler = Scheduler(config, args.resume)
+            try:
+                asyncio.run(scheduler.run())
+            except KeyboardInterrupt:
+                logger.info("Simulation interrupted")
+            totals = scheduler.snapshot_stats()
+        
+        for line in format_summary(totals):
+            logger.info(line)
     except Exception as e:
         logger.exception(f"Error running simulator: {e}")
         sys.exit(1)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
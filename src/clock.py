@@ -0,0 +1,237 @@
+"""
+Clocks that timestamp generators read the current time from.
+"""
+import collections
+import datetime
+import itertools
+import math
+import random
+import time
+from typing import Dict, Any, List, Optional, Union
+
+from .rate_profile import ArrivalTimes, RateProfile
+
+# Speed value that disables sleeping between records
+MAX_SPEED = "max"
+
+class WallClock:
+    """
+    The real time, read once per record so that every field of a record
+    sees the same time.
+    """
+    
+    def __init__(self):
+        self._current = time.time()
+    
+    def reserve(self, n: int) -> int:
+        """
+        Reserve times for the next n records; wall time never runs out.
+        """
+        return n
+    
+    def tick(self) -> None:
+        """
+        Move on to the next record, reading the time.
+        """
+        self._current = time.time()
+    
+    def skip(self, n: int) -> None:
+        """
+        Move on by n records, reading the time once.
+        """
+        self._current = time.time()
+    
+    def now(self) -> float:
+        """
+        Return the time of the current record as seconds since the epoch.
+        """
+        return self._current
+    
+    def times(self, n: int) -> List[float]:
+        """
+        Return the times of the next n records, without moving on.
+        """
+        return [time.time()] * n
+    
+    def snapshot(self) -> None:
+        """
+        Return the clock's position for a checkpoint; wall time has none.
+        """
+        return None
+    
+    def restore(self, snapshot: None) -> None:
+        """
+        Continue from a checkpointed position.
+        """
+
+class SimulationClock:
+    """
+    Virtual time for a stream, advanced by one inter-arrival interval per record.
+    
+    The first record is stamped with start_time and every later record one
+    interval (plus jitter) after the previous one, independent of how fast
+    records are actually produced. With a rate profile, records are stamped
+    with the profile's arrival times instead, and the clock runs out once
+    the profile's rate stays at zero.
+    """
+    
+    def __init__(self, start_time: float, end_time: Optional[float], rate: float,
+                 jitter: float = 0.0, rng: Optional[random.Random] = None,
+                 profile: Optional[Dict[str, Any]] = None):
+        """
+        Initialize the clock.
+        
+        Args:
+            start_time: Virtual time of the first record, in epoch seconds
+            end_time: Virtual time after which no records are produced
+            rate: Records per second of virtual time
+            jitter: Random variation of each interval (0.1 = ±10%)
+            rng: Random generator for the jitter and Poisson arrivals
+            profile: The stream's rate_profile section
+        """
+        self.start_time = start_time
+        self.end_time = end_time
+        self.interval = 1.0 / rate
+        self.jitter = jitter
+        self._uniform = (rng or random).uniform
+        self._arrivals = None
+        self._current = start_time
+        self._next = start_time
+        if profile is not None:
+            self._arrivals = ArrivalTimes(RateProfile(profile, rate, start_time), rng)
+            self._next = start_time + self._arrivals.next()
+        self._reserved = collections.deque()
+    
+    @property
+    def finished(self) -> bool:
+        """Whether the next record would fall after end_time."""
+        return not self._reserved and self._exhausted()
+    
+    def _exhausted(self) -> bool:
+        """
+        Whether no record is left before end_time, or at all.
+        """
+        return self._next == math.inf or (self.end_time is not None and self._next > self.end_time)
+    
+    def reserve(self, n: int) -> int:
+        """
+        Reserve times for the next n records.
+        
+        Returns:
+            How many of them fall before end_time
+        """
+        reserved = self._reserved
+        while len(reserved) < n and not self._exhausted():
+            reserved.append(self._draw())
+        return min(n, len(reserved))
+    
+    def tick(self) -> None:
+        """
+        Move on to the next record.
+        """
+        self._current = self._reserved.popleft() if self._reserved else self._draw()
+    
+    def skip(self, n: int) -> None:
+        """
+        Move on by n records without reading the time.
+        """
+        for _ in range(n):
+            self.tick()
+    
+    def now(self) -> float:
+        """
+        Return the virtual time of the current record in epoch seconds.
+        """
+        return self._current
+    
+    def times(self, n: int) -> List[float]:
+        """
+        Return the virtual times of the next n records, without moving on.
+        Records past end_time keep the time of the last one before it.
+        """
+        reserved = self.reserve(n)
+        times = list(itertools.islice(self._reserved, reserved))
+        return times + [times[-1] if times else self._current] * (n - reserved)
+    
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Return the clock's position for a checkpoint.
+        """
+        snapshot = {"current": self._current, "next": self._next, "reserved": list(self._reserved)}
+        if self._arrivals is not None:
+            snapshot["position"] = self._arrivals.position
+        return snapshot
+    
+    def restore(self, snapshot: Optional[Dict[str, Any]]) -> None:
+        """
+        Continue from a checkpointed position, if the checkpoint has one.
+        """
+        if snapshot is None:
+            return
+        self._current = snapshot["current"]
+        self._next = snapshot["next"]
+        self._reserved = collections.deque(snapshot["reserved"])
+        if self._arrivals is not None and "position" in snapshot:
+            self._arrivals.position = snapshot["position"]
+    
+    def _draw(self) -> float:
+        """
+        Return the next record time and schedule the one after it.
+        """
+        current = self._next
+        if self._arrivals is not None:
+            self._next = self.start_time + self._arrivals.next()
+        elif self.jitter > 0:
+            self._next += self.interval * (1 + self._uniform(-self.jitter, self.jitter))
+        else:
+            self._next += self.interval
+        return current
+
+def parse_time(value: Union[str, int, float, datetime.datetime, datetime.date]) -> float:
+    """
+    Convert a configured time to epoch seconds.
+    
+    Accepts epoch seconds, ISO 8601 strings and the datetime objects YAML
+    produces for unquoted timestamps. Naive times are taken as UTC.
+    
+    Raises:
+        ValueError: If the value cannot be interpreted as a time
+    """
+    if isinstance(value, bool):
+        raise ValueError(f"invalid time: {value!r}")
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, str):
+        text = value.strip()
+        if text.endswith("Z"):
+            text = text[:-1] + "+00:00"
+        try:
+            value = datetime.datetime.fromisoformat(text)
+        except ValueError:
+            raise ValueError(f"invalid time: {value!r}") from None
+    if isinstance(value, datetime.date) and not isinstance(value, datetime.datetime):
+        value = datetime.datetime(value.year, value.month, value.day)
+    if isinstance(value, datetime.datetime):
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=datetime.timezone.utc)
+        return value.timestamp()
+    raise ValueError(f"invalid time: {value!r}")
+
+def create_clock(clock_config: Optional[Dict[str, Any]], rate: Any, jitter: float = 0.0,
+                 rng: Optional[random.Random] = None, profile: Optional[Dict[str, Any]] = None) -> Union[WallClock, SimulationClock]:
+    """
+    Create the clock for a stream.
+    
+    Args:
+        clock_config: The stream's clock section, or None for wall time
+        rate: The stream's records per second
+        jitter: The stream's jitter
+        rng: Random generator for the jitter and Poisson arrivals
+        profile: The stream's rate_profile section
+    """
+    if clock_config is None:
+        return WallClock()
+    
+    start_time = parse_time(clock_config["start_time"]) if "start_time" in clock_config else time.time()
+    end_time = parse_time(clock_config["end_time"]) if "end_time" in clock_config else None
+    return SimulationClock(start_time, end_time, rate, jitter, rng, profile)
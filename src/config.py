@@ -3,8 +3,18 @@ import yaml
 from pathlib import Path
 from typing import Dict, Any, List, Union, Optional
 
+from .clock import MAX_SPEED, parse_time
+from .formatters import BINARY_FORMATS
+from .generators.ids import ID_TYPES, id_kind
+from .outputs.queued import OVERFLOW_POLICIES
+from .outputs.columnar import COLUMNAR_TYPES
+from .rate_profile import RateProfile
+
 logger = logging.getLogger(__name__)
 
+# Output types that separate records with newlines
+LINE_OUTPUT_TYPES = ("file", "stdout", "partitioned_file")
+
 def load_config(config_path: Path) -> Dict[str, Any]:
     """Load a configuration from a YAML file."""
     with open(config_path, "r") as f:
@@ -23,9 +33,113 @@ def validate_config(config: Dict[str, Any]) -> None:
         if key not in config:
             raise ValueError(f"Missing required configuration key: {key}")
     
+    # Validate global run limits and the shared simulation clock
+    validate_limits("Configuration", config)
+    if "clock" in config:
+        validate_clock("Configuration", config["clock"])
+    if "checkpoint" in config:
+        validate_checkpoint(config["checkpoint"])
+    
     # Validate each stream
     for stream_name, stream_config in config["streams"].items():
         validate_stream_config(stream_name, stream_config)
+        if get_clock(config, stream_config) is not None and stream_config["rate"] == "max":
+            raise ValueError(f"Stream '{stream_name}' needs a numeric rate to run on a simulation clock")
+
+def validate_limits(owner: str, config: Dict[str, Any]) -> None:
+    """Validate the optional count and duration limits of a run or stream."""
+    count = config.get("count")
+    if count is not None and (not isinstance(count, int) or count <= 0):
+        raise ValueError(f"{owner} count must be a positive integer")
+    
+    duration = config.get("duration")
+    if duration is not None and (not isinstance(duration, (int, float)) or duration <= 0):
+        raise ValueError(f"{owner} duration must be a positive number of seconds")
+
+def validate_checkpoint(checkpoint_config: Any) -> None:
+    """Validate the checkpoint section."""
+    if not isinstance(checkpoint_config, dict):
+        raise ValueError("Configuration checkpoint must be a dictionary")
+    if not isinstance(checkpoint_config.get("path"), str):
+        raise ValueError("Configuration checkpoint path must be the name of a directory")
+    
+    interval = checkpoint_config.get("interval", 60.0)
+    if isinstance(interval, bool) or not isinstance(interval, (int, float)) or interval <= 0:
+        raise ValueError("Configuration checkpoint interval must be a positive number of seconds")
+
+def validate_clock(owner: str, clock_config: Any) -> None:
+    """Validate a simulation clock section."""
+    if not isinstance(clock_config, dict):
+        raise ValueError(f"{owner} clock must be a dictionary")
+    
+    times = {}
+    for key in ("start_time", "end_time"):
+        if key in clock_config:
+            try:
+                times[key] = parse_time(clock_config[key])
+            except ValueError as e:
+                raise ValueError(f"{owner} clock {key} is invalid: {e}") from e
+    
+    if "start_time" in times and "end_time" in times and times["end_time"] < times["start_time"]:
+        raise ValueError(f"{owner} clock end_time is before start_time")
+    
+    speed = clock_config.get("speed", 1.0)
+    if speed != MAX_SPEED and (isinstance(speed, bool) or not isinstance(speed, (int, float)) or speed <= 0):
+        raise ValueError(f"{owner} clock speed must be a positive number or 'max'")
+
+def apply_overrides(config: Dict[str, Any], unthrottled: bool = False,
+                    count: Optional[int] = None, duration: Optional[float] = None) -> None:
+    """
+    Apply command-line overrides to a loaded configuration.
+    
+    Global count and duration limits apply to every stream that does not
+    set its own. Unthrottled streams on a simulation clock keep their rate,
+    which sets the spacing of their timestamps, and run at speed max instead.
+    """
+    if count is not None:
+        config["count"] = count
+    if duration is not None:
+        config["duration"] = duration
+    validate_limits("Configuration", config)
+    
+    if unthrottled:
+        for stream_config in config["streams"].values():
+            clock_config = get_clock(config, stream_config)
+            if clock_config is not None:
+                stream_config["clock"] = dict(clock_config, speed=MAX_SPEED)
+            else:
+                stream_config["rate"] = "max"
+
+def get_limit(config: Dict[str, Any], stream_config: Dict[str, Any], key: str) -> Optional[Union[int, float]]:
+    """Return a stream's count or duration limit, falling back to the global one."""
+    return stream_config.get(key, config.get(key))
+
+def get_clock(config: Dict[str, Any], stream_config: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Return a stream's simulation clock section, falling back to the global one."""
+    return stream_config.get("clock", config.get("clock"))
+
+def has_stream_state(stream_config: Dict[str, Any]) -> bool:
+    """
+    Whether a stream keeps values across records that shards could not share:
+    stateful fields, such as a random walk per entity, or rolling windows.
+    """
+    if stream_config.get("windows"):
+        return True
+    return any(
+        isinstance(field_config, dict) and field_config.get("type") == "stateful"
+        for field_config in stream_config["schema"].values()
+    )
+
+def _frames_lines(output: Dict[str, Any]) -> bool:
+    """
+    Whether an output needs records as text: files and stdout write a line
+    per record, HTTP joins batches with newlines and GET sends a query string.
+    """
+    if output["type"] in LINE_OUTPUT_TYPES:
+        return True
+    if output["type"] == "http":
+        return output.get("batch_size", 1) != 1 or output.get("method", "POST").upper() == "GET"
+    return False
 
 def validate_stream_config(stream_name: str, stream_config: Dict[str, Any]) -> None:
     """Validate a single stream configuration."""
@@ -39,8 +153,43 @@ def validate_stream_config(stream_name: str, stream_config: Dict[str, Any]) -> N
         raise ValueError(f"Stream '{stream_name}' schema must be a dictionary")
     
     # Validate rate
-    if not isinstance(stream_config["rate"], (int, float)) or stream_config["rate"] <= 0:
-        raise ValueError(f"Stream '{stream_name}' rate must be a positive number")
+    rate = stream_config["rate"]
+    if rate != "max" and (not isinstance(rate, (int, float)) or rate <= 0):
+        raise ValueError(f"Stream '{stream_name}' rate must be a positive number or 'max'")
+    if "rate_profile" in stream_config:
+        if rate == "max":
+            raise ValueError(f"Stream '{stream_name}' needs a numeric rate to use a rate_profile")
+        try:
+            RateProfile(stream_config["rate_profile"], rate)
+        except ValueError as e:
+            raise ValueError(f"Stream '{stream_name}' rate_profile is invalid: {e}") from e
+    
+    validate_limits(f"Stream '{stream_name}'", stream_config)
+    if "clock" in stream_config:
+        validate_clock(f"Stream '{stream_name}'", stream_config["clock"])
+    
+    # Validate pacing options
+    jitter = stream_config.get("jitter", 0.0)
+    if not isinstance(jitter, (int, float)) or not 0 <= jitter < 1:
+        raise ValueError(f"Stream '{stream_name}' jitter must be a number in [0, 1)")
+    
+    max_batch = stream_config.get("max_batch", 1)
+    if not isinstance(max_batch, int) or max_batch <= 0:
+        raise ValueError(f"Stream '{stream_name}' max_batch must be a positive integer")
+    
+    if not isinstance(stream_config.get("vectorized", False), bool):
+        raise ValueError(f"Stream '{stream_name}' vectorized must be true or false")
+    
+    # Validate sharding options
+    if not isinstance(stream_config.get("seed", 0), int):
+        raise ValueError(f"Stream '{stream_name}' seed must be an integer")
+    
+    shards = stream_config.get("shards", 1)
+    if not isinstance(shards, int) or shards <= 0:
+        raise ValueError(f"Stream '{stream_name}' shards must be a positive integer")
+    if shards > 1 and has_stream_state(stream_config):
+        # Each shard would keep its own copy, e.g. diverging prices for one symbol
+        raise ValueError(f"Stream '{stream_name}' has stateful fields or windows and cannot be split into shards")
     
     # Validate outputs
     if not isinstance(stream_config["outputs"], list) or not stream_config["outputs"]:
@@ -52,5 +201,32 @@ def validate_stream_config(stream_name: str, stream_config: Dict[str, Any]) -> N
             raise ValueError(f"Stream '{stream_name}' output {i} must be a dictionary")
         if "type" not in output:
             raise ValueError(f"Stream '{stream_name}' output {i} missing required key: type")
-        if "format" not in output:
+        if "format" not in output and output["type"] not in COLUMNAR_TYPES:
             raise ValueError(f"Stream '{stream_name}' output {i} missing required key: format")
+        if output.get("format") in BINARY_FORMATS and _frames_lines(output):
+            raise ValueError(
+                f"Stream '{stream_name}' output {i} separates records with newlines, "
+                f"so it cannot use the binary {output['format']} format"
+            )
+        
+        for key in ("queue_size", "max_outstanding"):
+            value = output.get(key, 1)
+            if not isinstance(value, int) or isinstance(value, bool) or value <= 0:
+                raise ValueError(f"Stream '{stream_name}' output {i} {key} must be a positive integer")
+        if output.get("overflow", "block") not in OVERFLOW_POLICIES:
+            raise ValueError(
+                f"Stream '{stream_name}' output {i} overflow must be one of: {', '.join(OVERFLOW_POLICIES)}"
+            )
+    
+    # ID fields with `format: bytes` only fit outputs that write binary values
+    for field_name, field_config in stream_config["schema"].items():
+        if not (isinstance(field_config, dict) and field_config.get("type") in ID_TYPES):
+            continue
+        if id_kind(field_config) != "bytes":
+            continue
+        for i, output in enumerate(stream_config["outputs"]):
+            if output["type"] not in COLUMNAR_TYPES and output.get("format") not in BINARY_FORMATS:
+                raise ValueError(
+                    f"Stream '{stream_name}' field '{field_name}' holds bytes, which output {i} "
+                    f"cannot write as {output['format']}; use a binary format or another ID format"
+                )
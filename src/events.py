@@ -1,4 +1,7 @@
+import copy
+import heapq
 import logging
+import math
 import random
 from typing import Dict, Any, List, Optional
 
@@ -31,4 +34,111 @@ def _check_event_trigger(event: Dict[str, Any], record_count: int, state: Dict[s
     
     # More trigger types could be added here
     
-    return False
\ No newline at end of file
+    return False
+
+# Kinds of scheduled firings in an EventIndex
+_AT_COUNT = 0
+_EVERY_COUNT = 1
+_PROBABILITY = 2
+
+class EventIndex:
+    """
+    The events of a stream compiled into a schedule of upcoming firings.
+    
+    Every trigger is a heap entry holding the record count at which it
+    next fires: at_count once, every_count at each multiple, and
+    probability events after a gap drawn from the geometric distribution,
+    which is how many records pass until a per-record coin flip succeeds.
+    Records before the earliest entry are checked with one comparison,
+    however many events there are.
+    
+    As with check_events, the first event in the list whose trigger fires
+    wins a record. A probability event that fires together with an earlier
+    event draws its next gap as if it had not fired; since coin flips are
+    independent, firings follow the same distribution as flipping a coin
+    for every event on every record.
+    """
+    
+    def __init__(self, events: List[Dict[str, Any]], rng: Optional[random.Random] = None, start: int = 0):
+        """
+        Compile the events.
+        
+        Args:
+            events: Event definitions, in priority order
+            rng: Random generator for probability events
+            start: Record count already reached; the next record is start + 1
+        
+        Raises:
+            ValueError: If an event is invalid
+        """
+        self.events = events
+        self.rng = rng
+        self.random = (rng or random).random
+        self.heap = []
+        for i, event in enumerate(events):
+            if not isinstance(event, dict) or not isinstance(event.get("record"), dict):
+                raise ValueError(f"event {i} needs a record dictionary")
+            if "at_count" in event and event["at_count"] > start:
+                self.heap.append((event["at_count"], i, _AT_COUNT))
+            if "every_count" in event:
+                period = event["every_count"]
+                if not isinstance(period, int) or isinstance(period, bool) or period <= 0:
+                    raise ValueError(f"event {i} every_count must be a positive integer")
+                self.heap.append(((start // period + 1) * period, i, _EVERY_COUNT))
+            if "probability" in event:
+                probability = event["probability"]
+                if isinstance(probability, bool) or not isinstance(probability, (int, float)) or not 0 <= probability <= 1:
+                    raise ValueError(f"event {i} probability must be a number in [0, 1]")
+                if probability > 0:
+                    self.heap.append((start + self._gap(probability), i, _PROBABILITY))
+        heapq.heapify(self.heap)
+    
+    def snapshot(self) -> "EventIndex":
+        """
+        Return a copy to save while this index keeps changing.
+        """
+        snapshot = copy.copy(self)
+        snapshot.heap = list(self.heap)
+        if self.rng is not None:
+            snapshot.rng = copy.copy(self.rng)
+            snapshot.random = snapshot.rng.random
+        return snapshot
+    
+    def check(self, record_count: int) -> Optional[Dict[str, Any]]:
+        """
+        Return a copy of the event record to inject at record_count, if any.
+        
+        Record counts must not go backwards; firings scheduled for counts
+        that were never checked are dropped.
+        """
+        heap = self.heap
+        if not heap or heap[0][0] > record_count:
+            return None
+        
+        winner = None
+        while heap and heap[0][0] <= record_count:
+            count, i, kind = heap[0]
+            if count == record_count and (winner is None or i < winner):
+                winner = i
+            event = self.events[i]
+            if kind == _EVERY_COUNT:
+                period = event["every_count"]
+                heapq.heapreplace(heap, ((record_count // period + 1) * period, i, kind))
+            elif kind == _PROBABILITY:
+                heapq.heapreplace(heap, (record_count + self._gap(event["probability"]), i, kind))
+            else:
+                heapq.heappop(heap)
+        
+        if winner is None:
+            return None
+        # Clone the event record to avoid modifying the original
+        return self.events[winner]["record"].copy()
+    
+    def _gap(self, probability: float) -> int:
+        """
+        Draw the number of records up to and including the next firing of
+        an event that fires on each record with the given probability.
+        """
+        if probability >= 1:
+            return 1
+        return int(math.log1p(-self.random()) / math.log1p(-probability)) + 1
@@ -1,8 +1,11 @@
+import json
 import logging
-from typing import Dict, Any, Union
+from typing import Dict, Any, Callable, List, Optional, Union
 
-from .json_format import format_json
-from .csv_format import format_csv
+from .json_format import format_json, compile_json
+from .csv_format import format_csv, compile_csv
+from .msgpack_format import format_msgpack, compile_msgpack
+from .avro_format import compile_avro
 
 logger = logging.getLogger(__name__)
 
@@ -10,9 +13,22 @@ logger = logging.getLogger(__name__)
 FORMATTERS = {
     "json": format_json,
     "csv": format_csv,
+    "msgpack": format_msgpack,
 }
 
-def format_record(record: Dict[str, Any], output_format: str) -> str:
+# Formats whose records are binary and may contain newlines
+BINARY_FORMATS = ("msgpack", "avro")
+
+# Registry of encoders compiled once per stream from its schema, the
+# output's options for the format and the stream's events
+ENCODERS = {
+    "json": compile_json,
+    "csv": compile_csv,
+    "msgpack": compile_msgpack,
+    "avro": compile_avro,
+}
+
+def format_record(record: Dict[str, Any], output_format: str) -> Union[str, bytes]:
     """
     Format a record for output.
     """
@@ -20,4 +36,51 @@ def format_record(record: Dict[str, Any], output_format: str) -> str:
         return FORMATTERS[output_format](record)
     else:
         logger.warning(f"Unknown format: {output_format}, falling back to json")
-        return FORMATTERS["json"](record)
\ No newline at end of file
+        return FORMATTERS["json"](record)
+def encode_record(record: Dict[str, Any], output_format: str) -> bytes:
+    """
+    Format a record for output as UTF-8 bytes, the form connectors send.
+    """
+    data = format_record(record, output_format)
+    return data if isinstance(data, bytes) else data.encode("utf-8")
+
+def compile_encoder(output_format: str, schema: Dict[str, Any], options: Optional[Dict[str, Any]] = None,
+                    events: Optional[List[Dict[str, Any]]] = None) -> Callable[[Dict[str, Any]], bytes]:
+    """
+    Compile the encoder a stream uses for one output format.
+    
+    Args:
+        output_format: Name of the format
+        schema: Stream schema
+        options: Options of the format, from the output's section named after it
+        events: Stream events
+    
+    Returns:
+        Function encoding a record to bytes, whose encode_many attribute
+        encodes a list of records
+    """
+    if output_format not in ENCODERS and output_format not in FORMATTERS:
+        logger.warning(f"Unknown format: {output_format}, falling back to json")
+        output_format = "json"
+    
+    compiler = ENCODERS.get(output_format)
+    if compiler is not None:
+        return compiler(schema, options or {}, events)
+    
+    formatter = FORMATTERS[output_format]
+    
+    def encode(record: Dict[str, Any]) -> bytes:
+        return formatter(record).encode("utf-8")
+    
+    def encode_many(records: List[Dict[str, Any]]) -> List[bytes]:
+        return [formatter(record).encode("utf-8") for record in records]
+    
+    encode.encode_many = encode_many
+    return encode
+
+def encoder_key(output_config: Dict[str, Any]) -> str:
+    """
+    Identify the encoder an output needs, so outputs can share one.
+    """
+    output_format = output_config.get("format")
+    return json.dumps([output_format, output_config.get(output_format)], sort_keys=True, default=str)
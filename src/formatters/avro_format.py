@@ -0,0 +1,294 @@
+"""
+Avro binary encoding with a writer schema derived from the stream schema.
+"""
+import re
+import struct
+import logging
+from typing import Dict, Any, Callable, List, Optional
+
+from ..generators.ids import ID_TYPES, id_kind
+from .schema_registry import get_registry
+
+logger = logging.getLogger(__name__)
+
+# Wire formats: the bare datum, or Confluent's magic byte and schema id first
+WIRE_FORMATS = ("bare", "confluent")
+
+# Avro type of fields whose values can only be known at run time
+ANY_SCALAR = ["null", "boolean", "long", "double", "string"]
+
+_ENUM_SYMBOL = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+
+_DOUBLE = struct.Struct("<d")
+
+_SCHEMA_ID = struct.Struct(">I")
+
+def avro_schema(schema: Dict[str, Any], name: str = "Record", namespace: Optional[str] = None,
+                events: Optional[List[Dict[str, Any]]] = None) -> Dict[str, Any]:
+    """
+    Derive an Avro record schema from a stream's schema.
+    
+    Every field is a union with null, since event records may leave fields
+    out. String choices become enums when their values are valid symbols;
+    values injected by events are added to them.
+    
+    Args:
+        schema: Stream schema
+        name: Name of the record type
+        namespace: Optional namespace of the record type
+        events: Stream events
+    """
+    fields = []
+    for field_name, field_config in schema.items():
+        if not (isinstance(field_config, dict) and "type" in field_config):
+            field_config = {"type": "static", "value": field_config}
+        injected = [
+            event["record"][field_name] for event in events or []
+            if field_name in event.get("record", {})
+        ]
+        field_type = _avro_type(field_name, field_config, injected)
+        if isinstance(field_type, list):
+            fields.append({"name": field_name, "type": field_type, "default": None})
+        else:
+            fields.append({"name": field_name, "type": ["null", field_type], "default": None})
+    
+    record_schema = {"type": "record", "name": name, "fields": fields}
+    if namespace:
+        record_schema["namespace"] = namespace
+    return record_schema
+
+def _avro_type(field_name: str, config: Dict[str, Any], injected: List[Any]) -> Any:
+    """
+    Return the Avro type of one generator.
+    """
+    generator_type = config["type"]
+    if generator_type in ("random_int", "sequence_int"):
+        return "long"
+    if generator_type in ("random_float", "gaussian"):
+        return "double"
+    if generator_type in ID_TYPES:
+        id_value = id_kind(config)
+        if id_value == "int":
+            return "long"
+        if id_value == "bytes":
+            return "bytes"
+        if generator_type == "uuid" and config.get("format", "canonical") == "canonical":
+            return {"type": "string", "logicalType": "uuid"}
+        return "string"
+    if generator_type == "timestamp":
+        return "long" if config.get("format", "iso") == "epoch" else "string"
+    if generator_type in ("choice", "static"):
+        values = config.get("values", []) if generator_type == "choice" else [config.get("value")]
+        values = [value for value in values + injected if value is not None]
+        if values and all(isinstance(value, str) for value in values):
+            symbols = list(dict.fromkeys(values))
+            if all(_ENUM_SYMBOL.match(symbol) for symbol in symbols):
+                return {"type": "enum", "name": f"{field_name}_values", "symbols": symbols}
+            return "string"
+        if values and all(isinstance(value, bool) for value in values):
+            return "boolean"
+        if values and all(isinstance(value, int) and not isinstance(value, bool) for value in values):
+            return "long"
+        if values and all(isinstance(value, (int, float)) and not isinstance(value, bool) for value in values):
+            return "double"
+    
+    # faker, dependent and stateful values may be of any scalar type
+    return ANY_SCALAR
+
+def compile_avro(schema: Dict[str, Any], options: Dict[str, Any],
+                 events: Optional[List[Dict[str, Any]]] = None) -> Callable[[Dict[str, Any]], bytes]:
+    """
+    Compile an Avro encoder for a stream.
+    
+    Args:
+        schema: Stream schema
+        options: The output's `avro` options: wire_format, name, namespace,
+            and for the Confluent wire format schema_id or registry and subject
+        events: Stream events
+    
+    Raises:
+        ValueError: If the options are invalid
+    """
+    wire_format = options.get("wire_format", "bare")
+    if wire_format not in WIRE_FORMATS:
+        raise ValueError(f"Avro wire_format must be one of: {', '.join(WIRE_FORMATS)}")
+    
+    writer_schema = avro_schema(schema, options.get("name", "Record"), options.get("namespace"), events)
+    writers = [(field["name"], _compile_writer(field["type"])) for field in writer_schema["fields"]]
+    
+    prefix = b""
+    if wire_format == "confluent":
+        schema_id = options.get("schema_id")
+        if schema_id is None:
+            subject = options.get("subject", f"{writer_schema['name']}-value")
+            schema_id = get_registry(options.get("registry")).register(subject, writer_schema)
+        prefix = b"\x00" + _SCHEMA_ID.pack(schema_id)
+    
+    def encode(record: Dict[str, Any]) -> bytes:
+        out = bytearray(prefix)
+        get = record.get
+        for field_name, write in writers:
+            write(get(field_name), out)
+        return bytes(out)
+    
+    def encode_many(records: List[Dict[str, Any]]) -> List[bytes]:
+        return [encode(record) for record in records]
+    
+    encode.encode_many = encode_many
+    encode.schema = writer_schema
+    return encode
+
+def _compile_writer(avro_type: Any) -> Callable[[Any, bytearray], None]:
+    """
+    Compile a function appending a value of avro_type to a buffer.
+    """
+    if isinstance(avro_type, list):
+        return _compile_union(avro_type)
+    if isinstance(avro_type, dict):
+        if avro_type["type"] == "enum":
+            return _compile_enum(avro_type["symbols"])
+        return _compile_writer(avro_type["type"])
+    return _PRIMITIVE_WRITERS[avro_type]
+
+def _compile_union(branches: List[Any]) -> Callable[[Any, bytearray], None]:
+    """
+    Compile a union writer, choosing the branch by the value's Python type.
+    """
+    if branches == ANY_SCALAR:
+        return _write_any
+    
+    # ["null", T]: the common nullable field
+    value_type = branches[1]
+    if isinstance(value_type, dict) and value_type["type"] == "enum":
+        # Branch and symbol index are both precomputed
+        encoded = {None: b"\x00"}
+        encoded.update((symbol, b"\x02" + _encode_long(i)) for i, symbol in enumerate(value_type["symbols"]))
+        symbols = value_type["symbols"]
+        
+        def write(value: Any, out: bytearray) -> None:
+            try:
+                out += encoded[value]
+            except KeyError:
+                raise ValueError(f"{value!r} is not one of the enum symbols {symbols}") from None
+        
+        return write
+    
+    if value_type == "double":
+        pack = _DOUBLE.pack
+        
+        def write(value: Any, out: bytearray) -> None:
+            if value is None:
+                out.append(0)
+            else:
+                out += b"\x02" + pack(value)
+        
+        return write
+    
+    write_value = _compile_writer(value_type)
+    
+    def write(value: Any, out: bytearray) -> None:
+        if value is None:
+            out.append(0)
+        else:
+            out.append(2)
+            write_value(value, out)
+    
+    return write
+
+def _compile_enum(symbols: List[str]) -> Callable[[Any, bytearray], None]:
+    """
+    Compile an enum writer.
+    """
+    encoded = {symbol: _encode_long(i) for i, symbol in enumerate(symbols)}
+    
+    def write(value: Any, out: bytearray) -> None:
+        try:
+            out += encoded[value]
+        except KeyError:
+            raise ValueError(f"{value!r} is not one of the enum symbols {symbols}") from None
+    
+    return write
+
+def _encode_long(n: int) -> bytes:
+    """
+    Encode a long as a zigzag varint.
+    """
+    out = bytearray()
+    _write_long(n, out)
+    return bytes(out)
+
+def _write_long(value: Any, out: bytearray) -> None:
+    """
+    Append a long as a zigzag varint.
+    """
+    if not isinstance(value, int):
+        raise TypeError(f"expected an integer, got {value!r}")
+    n = (value << 1) ^ (value >> 63)
+    if n < 0x80:
+        out.append(n)
+        return
+    while n > 0x7F:
+        out.append((n & 0x7F) | 0x80)
+        n >>= 7
+    out.append(n)
+
+def _write_double(value: Any, out: bytearray) -> None:
+    """
+    Append a double as 8 little-endian bytes.
+    """
+    out += _DOUBLE.pack(value)
+
+def _write_boolean(value: Any, out: bytearray) -> None:
+    """
+    Append a boolean as one byte.
+    """
+    out.append(1 if value else 0)
+
+def _write_string(value: Any, out: bytearray) -> None:
+    """
+    Append a length-prefixed UTF-8 string.
+    """
+    data = value.encode("utf-8") if isinstance(value, str) else str(value).encode("utf-8")
+    _write_long(len(data), out)
+    out += data
+
+def _write_bytes(value: Any, out: bytearray) -> None:
+    """
+    Append length-prefixed bytes.
+    """
+    _write_long(len(value), out)
+    out += value
+
+def _write_null(value: Any, out: bytearray) -> None:
+    """
+    Null takes no bytes.
+    """
+    pass
+
+def _write_any(value: Any, out: bytearray) -> None:
+    """
+    Write a value of the ANY_SCALAR union.
+    """
+    if value is None:
+        out.append(0)
+    elif isinstance(value, bool):
+        out.append(2)
+        _write_boolean(value, out)
+    elif isinstance(value, int):
+        out.append(4)
+        _write_long(value, out)
+    elif isinstance(value, float):
+        out.append(6)
+        _write_double(value, out)
+    else:
+        out.append(8)
+        _write_string(value, out)
+
+_PRIMITIVE_WRITERS = {
+    "null": _write_null,
+    "boolean": _write_boolean,
+    "long": _write_long,
+    "double": _write_double,
+    "string": _write_string,
+    "bytes": _write_bytes,
+}
@@ -1,6 +1,13 @@
 import csv
 import io
-from typing import Dict, Any
+import logging
+import operator
+import re
+from typing import Dict, Any, Callable, List, Optional, Tuple
+
+from .fields import field_kinds
+
+logger = logging.getLogger(__name__)
 
 def format_csv(record: Dict[str, Any]) -> str:
     """
@@ -19,4 +26,151 @@ def format_csv(record: Dict[str, Any]) -> str:
     writer.writerow(values)
     
     # Return the CSV string without trailing newline
-    return output.getvalue().rstrip()
\ No newline at end of file
+    return output.getvalue().rstrip()
+
+class _LineSink:
+    """
+    File-like target of a csv.writer that keeps the lines written to it.
+    """
+    
+    def __init__(self):
+        self.lines = []
+        self.write = self.lines.append
+
+# Characters that make the csv module quote a field
+_NEEDS_QUOTES = re.compile(r'[,"\r\n]')
+
+def _quote(text: str) -> str:
+    """
+    Quote a field the way csv.writer does.
+    """
+    if _NEEDS_QUOTES.search(text):
+        return '"' + text.replace('"', '""') + '"'
+    return text
+
+def csv_header(schema: Dict[str, Any]) -> str:
+    """
+    Return the header line of a stream's CSV output, without a newline.
+    """
+    return ",".join(_quote(field_name) for field_name in schema)
+
+# Per field kind: the check that a value can be written directly, and the
+# source writing it
+_VALUE_SOURCE = {
+    "int": ("type({v}) is int", "{v}"),
+    "float": ("type({v}) is float", "{v}!r"),
+    "text": ("type({v}) is str", "{v}"),
+    "enum": ("type({v}) is str and ({e} := {d}.get({v})) is not None", "{e}"),
+    "any": ("type({v}) is str and not needs_quotes({v})", "{v}"),
+}
+
+def compile_csv(schema: Dict[str, Any], options: Dict[str, Any],
+                events: Optional[List[Dict[str, Any]]] = None) -> Callable[[Dict[str, Any]], bytes]:
+    """
+    Compile a CSV encoder for a stream.
+    
+    Columns follow the schema, so every row has the same columns: fields
+    an event record leaves out are empty, and fields outside the schema are
+    not written. Rows whose values all have their generator's type are
+    written by one f-string; any other row goes through a csv.writer kept
+    for the stream.
+    
+    Args:
+        schema: Stream schema
+        options: The output's `csv` options: header, to put a header line
+            before the first record
+        events: Stream events
+    """
+    names = list(schema)
+    extra = sorted({
+        field_name for event in events or [] for field_name in event.get("record", {})
+        if field_name not in schema
+    })
+    if extra:
+        logger.warning(f"Event fields {', '.join(extra)} are not in the schema and are left out of CSV output")
+    
+    sink = _LineSink()
+    lines = sink.lines
+    writerow = csv.writer(sink).writerow
+    
+    def encode_values(values: Any) -> bytes:
+        writerow(values)
+        return lines.pop()[:-2].encode("utf-8")
+    
+    def encode_other(record: Dict[str, Any]) -> bytes:
+        return encode_values([record.get(field_name, "") for field_name in names])
+    
+    encode_row = _compile_row(names, field_kinds(schema, events), encode_values, encode_other)
+    header = [(csv_header(schema) + "\n").encode("utf-8")] if options.get("header", False) and names else []
+    
+    if header:
+        def encode(record: Dict[str, Any]) -> bytes:
+            data = encode_row(record)
+            if header:
+                data = header.pop() + data
+            return data
+    else:
+        encode = encode_row
+    
+    def encode_many(records: List[Dict[str, Any]]) -> List[bytes]:
+        encoded = [encode_row(record) for record in records]
+        if header and encoded:
+            encoded[0] = header.pop() + encoded[0]
+        return encoded
+    
+    encode.encode_many = encode_many
+    return encode
+
+def _compile_row(names: List[str], kinds: Dict[str, Tuple[str, Any]], encode_values: Callable[[Any], bytes],
+                 encode_other: Callable[[Dict[str, Any]], bytes]) -> Callable[[Dict[str, Any]], bytes]:
+    """
+    Compile the function writing a record's row.
+    
+    Args:
+        names: Columns, in order
+        kinds: Field kinds from field_kinds
+        encode_values: Writes a sequence of values with the csv module
+        encode_other: Writes a record that lacks some of the columns
+    """
+    if len(names) < 2:
+        # A row of one empty field must be quoted; leave that to the csv module
+        getter = (lambda record: (record[names[0]],)) if names else (lambda record: ())
+        
+        def encode(record: Dict[str, Any]) -> bytes:
+            try:
+                return encode_values(getter(record))
+            except KeyError:
+                return encode_other(record)
+        
+        return encode
+    
+    namespace = {
+        "getter": operator.itemgetter(*names),
+        "needs_quotes": _NEEDS_QUOTES.search,
+        "encode_values": encode_values,
+        "encode_other": encode_other,
+    }
+    checks = []
+    pieces = []
+    for i, field_name in enumerate(names):
+        kind, data = kinds.get(field_name, ("any", None))
+        if kind == "enum":
+            namespace[f"d{i}"] = {value: _quote(value) for value in data}
+        check, source = _VALUE_SOURCE[kind]
+        checks.append(f"({check.format(v=f'v{i}', d=f'd{i}', e=f'e{i}')})")
+        pieces.append("{" + source.format(v=f"v{i}", e=f"e{i}") + "}")
+    
+    values = ", ".join(f"v{i}" for i in range(len(names)))
+    source = (
+        "def encode(record):\n"
+        "    try:\n"
+        "        values = getter(record)\n"
+        "    except KeyError:\n"
+        "        return encode_other(record)\n"
+        f"    {values} = values\n"
+        f"    if {' and '.join(checks)}:\n"
+        f"        return f'''{','.join(pieces)}'''.encode('utf-8')\n"
+        "    return encode_values(values)\n"
+    )
+    exec(compile(source, "<csv encoder>", "exec"), namespace)
+    return namespace["encode"]
@@ -0,0 +1,57 @@
+"""
+Classification of schema fields for the schema-specialized encoders.
+"""
+import logging
+from typing import Dict, Any, List, Optional, Tuple
+
+from ..generators.ids import ID_TYPES, id_kind
+
+logger = logging.getLogger(__name__)
+
+def field_kinds(schema: Dict[str, Any], events: Optional[List[Dict[str, Any]]] = None) -> Dict[str, Tuple[str, Any]]:
+    """
+    Classify each field of a schema by the values its generator produces.
+    
+    Args:
+        schema: Stream schema
+        events: Stream events, whose records may put other values in a field
+    
+    Returns:
+        (kind, values) per field name. The kind is "int", "float", "text"
+        for strings that never need escaping or quoting, "enum" for a fixed
+        set of strings, given as values, or "any".
+    """
+    injected = {}
+    for event in events or []:
+        for field_name, value in event.get("record", {}).items():
+            injected.setdefault(field_name, []).append(value)
+    
+    kinds = {}
+    for field_name, field_config in schema.items():
+        if not (isinstance(field_config, dict) and "type" in field_config):
+            field_config = {"type": "static", "value": field_config}
+        generator_type = field_config["type"]
+        values = injected.get(field_name, [])
+        
+        kind = ("any", None)
+        if generator_type in ("random_int", "sequence_int"):
+            kind = ("int", None)
+        elif generator_type in ("random_float", "gaussian"):
+            kind = ("float", None)
+        elif generator_type == "timestamp":
+            timestamp_format = field_config.get("format", "iso")
+            if timestamp_format == "epoch":
+                kind = ("int", None)
+            elif timestamp_format == "iso" and not values:
+                kind = ("text", None)
+        elif generator_type in ID_TYPES and not values:
+            id_value = id_kind(field_config)
+            if id_value != "bytes":
+                kind = (id_value, None)
+        elif generator_type in ("choice", "static"):
+            choices = field_config.get("values", []) if generator_type == "choice" else [field_config.get("value")]
+            choices = choices + values
+            if choices and all(isinstance(value, str) for value in choices):
+                kind = ("enum", list(dict.fromkeys(choices)))
+        kinds[field_name] = kind
+    return kinds
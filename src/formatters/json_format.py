@@ -1,8 +1,174 @@
 import json
-from typing import Dict, Any
+import logging
+from json.encoder import encode_basestring_ascii
+from typing import Dict, Any, Callable, List, Optional, Tuple
+
+from .fields import field_kinds
+
+logger = logging.getLogger(__name__)
+
+# JSON backends: the schema-specialized built-in encoder, or orjson
+JSON_BACKENDS = ("builtin", "orjson")
+
+# Record layouts compiled per encoder before new ones use json.dumps
+MAX_LAYOUTS = 64
 
 def format_json(record: Dict[str, Any]) -> str:
     """
     Format a record as JSON.
     """
-    return json.dumps(record)
\ No newline at end of file
+    return json.dumps(record)
+
+def compile_json(schema: Dict[str, Any], options: Dict[str, Any],
+                 events: Optional[List[Dict[str, Any]]] = None) -> Callable[[Dict[str, Any]], bytes]:
+    """
+    Compile a JSON encoder for a stream.
+    
+    The built-in backend writes the same JSON as format_json, with fields
+    in schema order, using code specialized for each field's generator:
+    keys are escaped once, integers and floats skip the generic encoder,
+    and the strings of a choice are encoded ahead of time. Values of an
+    unexpected type fall back to json.dumps, and records with other fields,
+    such as events, are written in their own order. orjson is faster still
+    and writes compact JSON.
+    
+    Args:
+        schema: Stream schema
+        options: The output's `json` options: backend
+        events: Stream events
+    
+    Raises:
+        ValueError: If the options are invalid
+        ImportError: If the orjson backend is chosen but not installed
+    """
+    backend = options.get("backend", "builtin")
+    if backend not in JSON_BACKENDS:
+        raise ValueError(f"JSON backend must be one of: {', '.join(JSON_BACKENDS)}")
+    
+    if backend == "orjson":
+        try:
+            import orjson
+        except ImportError:
+            raise ImportError("orjson not installed. Install with: pip install orjson") from None
+        dumps = orjson.dumps
+        
+        def encode(record: Dict[str, Any]) -> bytes:
+            return dumps(record)
+        
+        def encode_many(records: List[Dict[str, Any]]) -> List[bytes]:
+            return [dumps(record) for record in records]
+        
+        encode.encode_many = encode_many
+        return encode
+    
+    kinds = field_kinds(schema, events)
+    layouts = {}
+    
+    def encode_other(record: Dict[str, Any]) -> bytes:
+        layout = tuple(record)
+        encoder = layouts.get(layout)
+        if encoder is None:
+            if len(layouts) >= MAX_LAYOUTS:
+                return json.dumps(record).encode("utf-8")
+            encoder = layouts[layout] = _compile_layout(layout, kinds)
+        return encoder(record)
+    
+    # Records with the schema's fields take a single call
+    encode = _compile_layout(tuple(schema), kinds, encode_other)
+    
+    def encode_many(records: List[Dict[str, Any]]) -> List[bytes]:
+        return [encode(record) for record in records]
+    
+    encode.encode_many = encode_many
+    return encode
+
+# Per field kind: the check that a value has the generator's type, the
+# source writing such a value, and the source writing any value, falling
+# back to json.dumps
+_VALUE_SOURCE = {
+    "int": (
+        "type({v}) is int",
+        "{v}",
+        "({v} if type({v}) is int else dumps({v}))",
+    ),
+    "float": (
+        "type({v}) is float and {v} - {v} == 0.0",
+        "{v}!r",
+        "(repr({v}) if type({v}) is float and {v} - {v} == 0.0 else dumps({v}))",
+    ),
+    "text": (
+        "type({v}) is str",
+        None,
+        "(f'\"{{{v}}}\"' if type({v}) is str else dumps({v}))",
+    ),
+    "enum": (
+        "type({v}) is str and ({e} := {d}.get({v})) is not None",
+        "{e}",
+        "(({d}.get({v}) or dumps({v})) if type({v}) is str else dumps({v}))",
+    ),
+    "any": (
+        None,
+        "(quote({v}) if type({v}) is str else dumps({v}))",
+        "(quote({v}) if type({v}) is str else dumps({v}))",
+    ),
+}
+
+def _compile_layout(layout: Tuple[str, ...], kinds: Dict[str, Tuple[str, Any]],
+                    encode_other: Optional[Callable[[Dict[str, Any]], bytes]] = None) -> Callable[[Dict[str, Any]], bytes]:
+    """
+    Compile an encoder for records with the fields of layout.
+    
+    The encoder checks the type of every value at once and then fills in
+    one f-string, or one checking each value when any is unexpected. Field
+    names and encoded strings are passed in as variables, never as source.
+    
+    Args:
+        layout: Field names, in the order they are written
+        kinds: Field kinds from field_kinds
+        encode_other: Encoder of records with other fields. Without it the
+            encoder only takes records whose keys are layout, in order.
+    """
+    if not layout:
+        return lambda record: b"{}" if not record or encode_other is None else encode_other(record)
+    
+    namespace = {"dumps": json.dumps, "quote": encode_basestring_ascii, "encode_other": encode_other}
+    checks = []
+    fast = []
+    slow = []
+    for i, field_name in enumerate(layout):
+        names = {"v": f"v{i}", "d": f"d{i}", "e": f"e{i}"}
+        namespace[f"k{i}"] = ("{" if i == 0 else ", ") + json.dumps(field_name) + ": "
+        namespace[f"n{i}"] = field_name
+        kind, data = kinds.get(field_name, ("any", None))
+        if kind == "enum":
+            namespace[f"d{i}"] = {value: json.dumps(value) for value in data}
+        check, fast_source, slow_source = _VALUE_SOURCE[kind]
+        if check is not None:
+            checks.append(f"({check.format(**names)})")
+        # Strings that need no escaping go straight between quotes
+        fast.append(f"{{k{i}}}" + ('"{' + names["v"] + '}"' if fast_source is None else "{" + fast_source.format(**names) + "}"))
+        slow.append(f"{{k{i}}}{{{slow_source.format(**names)}}}")
+    
+    values = ", ".join(f"v{i}" for i in range(len(layout)))
+    if encode_other is None:
+        lines = [f"    {values}, = record.values()"]
+    else:
+        # Same number of fields and no KeyError: the same fields
+        lookups = ", ".join(f"record[n{i}]" for i in range(len(layout)))
+        lines = [
+            f"    if len(record) != {len(layout)}:",
+            "        return encode_other(record)",
+            "    try:",
+            f"        {values}, = {lookups},",
+            "    except KeyError:",
+            "        return encode_other(record)",
+        ]
+    if checks:
+        lines.append(f"    if {' and '.join(checks)}:")
+        lines.append(f"        return f'''{''.join(fast)}}}}}'''.encode('utf-8')")
+        lines.append(f"    return f'''{''.join(slow)}}}}}'''.encode('utf-8')")
+    else:
+        lines.append(f"    return f'''{''.join(fast)}}}}}'''.encode('utf-8')")
+    source = "def encode(record):\n" + "\n".join(lines) + "\n"
+    exec(compile(source, "<json encoder>", "exec"), namespace)
+    return namespace["encode"]
@@ -0,0 +1,34 @@
+from typing import Dict, Any, Callable, List, Optional
+
+def compile_msgpack(schema: Dict[str, Any], options: Dict[str, Any],
+                    events: Optional[List[Dict[str, Any]]] = None) -> Callable[[Dict[str, Any]], bytes]:
+    """
+    Compile a MessagePack encoder, packing each record as a map.
+    
+    Raises:
+        ImportError: If the msgpack package is not installed
+    """
+    try:
+        import msgpack
+    except ImportError:
+        raise ImportError("msgpack not installed. Install with: pip install msgpack") from None
+    
+    # One packer per stream avoids setting up a new one for every record
+    pack = msgpack.Packer(use_bin_type=True).pack
+    
+    def encode(record: Dict[str, Any]) -> bytes:
+        return pack(record)
+    
+    def encode_many(records: List[Dict[str, Any]]) -> List[bytes]:
+        return [pack(record) for record in records]
+    
+    encode.encode_many = encode_many
+    return encode
+
+def format_msgpack(record: Dict[str, Any]) -> bytes:
+    """
+    Format a record as MessagePack.
+    """
+    import msgpack
+    
+    return msgpack.packb(record, use_bin_type=True)
@@ -0,0 +1,114 @@
+"""
+Minimal schema registry clients for the Confluent wire format.
+"""
+import json
+import os
+import logging
+import urllib.request
+from typing import Dict, Any, Optional
+
+logger = logging.getLogger(__name__)
+
+class LocalSchemaRegistry:
+    """
+    A schema registry stand-in that keeps its schemas in a local JSON file,
+    or only in memory without a path.
+    
+    Registering a schema that is already known returns its existing id, so
+    repeated runs and several streams agree on ids.
+    """
+    
+    def __init__(self, path: Optional[str] = None):
+        """
+        Initialize the registry.
+        
+        Args:
+            path: JSON file to load schemas from and save them to
+        """
+        self.path = path
+        self.schemas = {}
+        self.subjects = {}
+        if path is not None and os.path.exists(path):
+            with open(path, "r") as f:
+                data = json.load(f)
+            self.schemas = {int(schema_id): schema for schema_id, schema in data.get("schemas", {}).items()}
+            self.subjects = data.get("subjects", {})
+    
+    def register(self, subject: str, schema: Dict[str, Any]) -> int:
+        """
+        Register a schema under a subject and return its id.
+        """
+        text = json.dumps(schema, sort_keys=True)
+        schema_id = next((i for i, known in self.schemas.items() if known == text), None)
+        if schema_id is None:
+            schema_id = max(self.schemas, default=0) + 1
+            self.schemas[schema_id] = text
+        
+        versions = self.subjects.setdefault(subject, [])
+        if schema_id not in versions:
+            versions.append(schema_id)
+            self._save()
+        return schema_id
+    
+    def _save(self) -> None:
+        """
+        Write the registry to its file, if it has one.
+        """
+        if self.path is None:
+            return
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        temp_path = f"{self.path}.tmp"
+        with open(temp_path, "w") as f:
+            json.dump({"schemas": self.schemas, "subjects": self.subjects}, f, indent=2)
+        os.replace(temp_path, self.path)
+
+class HttpSchemaRegistry:
+    """
+    Client for a Confluent-compatible schema registry.
+    """
+    
+    def __init__(self, url: str, timeout: float = 10.0):
+        """
+        Initialize the client.
+        
+        Args:
+            url: Base URL of the registry, e.g. http://localhost:8081
+            timeout: Request timeout in seconds
+        """
+        self.url = url.rstrip("/")
+        self.timeout = timeout
+    
+    def register(self, subject: str, schema: Dict[str, Any]) -> int:
+        """
+        Register a schema under a subject and return its id.
+        """
+        body = json.dumps({"schema": json.dumps(schema)}).encode("utf-8")
+        request = urllib.request.Request(
+            f"{self.url}/subjects/{subject}/versions",
+            data=body,
+            headers={"Content-Type": "application/vnd.schemaregistry.v1+json"},
+            method="POST"
+        )
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            schema_id = json.load(response)["id"]
+        logger.info(f"Registered schema for subject {subject} with id {schema_id}")
+        return schema_id
+
+# Registries shared by all streams of a process, by location
+_REGISTRIES = {}
+
+def get_registry(location: Optional[str] = None) -> Any:
+    """
+    Return the registry at location: an http(s) URL, a JSON file path, or
+    None for one in memory.
+    """
+    registry = _REGISTRIES.get(location)
+    if registry is None:
+        if location is not None and location.startswith(("http://", "https://")):
+            registry = HttpSchemaRegistry(location)
+        else:
+            registry = LocalSchemaRegistry(location)
+        _REGISTRIES[location] = registry
+    return registry
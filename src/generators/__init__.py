@@ -13,6 +13,8 @@ from .basic import (
 from .datetime import generate_timestamp
 from .stateful import generate_dependent, generate_stateful
 from .faker import generate_faker
+from .plan import COMPILERS, SchemaPlan, compile_schema
+from .batch import BatchPlan, ColumnarBatch, compile_batch, create_batch
 
 logger = logging.getLogger(__name__)
 
@@ -34,6 +36,9 @@ GENERATORS = {
 def create_record(schema: Dict[str, Any], state: Dict[str, Any], count: int) -> Dict[str, Any]:
     """
     Generate a complete record based on the schema.
+    
+    This interprets the schema on every call; streams run by the
+    Scheduler use a SchemaPlan from compile_schema instead.
     """
     record = {}
     
@@ -1,6 +1,12 @@
+import bisect
+import itertools
 import random
 import uuid
-from typing import Dict, Any, Union, List, Optional
+from typing import Dict, Any, Union, List, Optional, Callable
+
+from .context import GeneratorContext
+
+FieldGenerator = Callable[[Dict[str, Any], int, Dict[str, Any]], Any]
 
 def generate_static(config: Dict[str, Any], state: Dict[str, Any], count: int) -> Any:
     """
@@ -71,13 +77,8 @@ def generate_sequence_int(config: Dict[str, Any], state: Dict[str, Any], count:
     sequence_name = config.get("name", "_default")
     state_key = f"sequence_{sequence_name}"
     
-    if state_key not in state:
-        # Initialize the sequence
-        state[state_key] = start
-        return start
-    
-    # Get current value
-    current = state[state_key]
+    # Get current value (the state holds the next value to emit)
+    current = state.get(state_key, start)
     
     # Update state for next time
     state[state_key] = current + step
@@ -135,4 +136,116 @@ def generate_gaussian(config: Dict[str, Any], state: Dict[str, Any], count: int)
     precision = config.get("precision", 4)
     
     value = random.normalvariate(mean, stddev)
-    return round(value, precision)
\ No newline at end of file
+    return round(value, precision)
+
+def compile_static(config: Dict[str, Any], context: GeneratorContext) -> FieldGenerator:
+    """
+    Compile a static value generator.
+    """
+    value = config.get("value")
+    
+    def generate(state: Dict[str, Any], count: int, record: Dict[str, Any]) -> Any:
+        return value
+    
+    return generate
+
+def compile_random_int(config: Dict[str, Any], context: GeneratorContext) -> FieldGenerator:
+    """
+    Compile a random integer generator.
+    """
+    min_val = config.get("min", 0)
+    max_val = config.get("max", 100)
+    if min_val > max_val:
+        raise ValueError(f"min ({min_val}) is greater than max ({max_val})")
+    
+    randint = context.rng.randint
+    
+    def generate(state: Dict[str, Any], count: int, record: Dict[str, Any]) -> int:
+        return randint(min_val, max_val)
+    
+    return generate
+
+def compile_random_float(config: Dict[str, Any], context: GeneratorContext) -> FieldGenerator:
+    """
+    Compile a random float generator.
+    """
+    min_val = config.get("min", 0.0)
+    max_val = config.get("max", 1.0)
+    precision = config.get("precision", 4)
+    if min_val > max_val:
+        raise ValueError(f"min ({min_val}) is greater than max ({max_val})")
+    
+    uniform = context.rng.uniform
+    
+    def generate(state: Dict[str, Any], count: int, record: Dict[str, Any]) -> float:
+        return round(uniform(min_val, max_val), precision)
+    
+    return generate
+
+def compile_sequence_int(config: Dict[str, Any], context: GeneratorContext) -> FieldGenerator:
+    """
+    Compile a sequence integer generator.
+    """
+    start = config.get("start", 0)
+    step = config.get("step", 1)
+    state_key = f"sequence_{config.get('name', '_default')}"
+    
+    def generate(state: Dict[str, Any], count: int, record: Dict[str, Any]) -> int:
+        current = state.get(state_key, start)
+        state[state_key] = current + step
+        return current
+    
+    return generate
+
+def compile_choice(config: Dict[str, Any], context: GeneratorContext) -> FieldGenerator:
+    """
+    Compile a choice generator.
+    
+    Weights are accumulated once so each draw is a single bisect.
+    """
+    values = list(config.get("values", []))
+    weights = config.get("weights", None)
+    
+    if not values:
+        raise ValueError("choice requires a non-empty 'values' list")
+    
+    if weights is None:
+        choice = context.rng.choice
+        
+        def generate(state: Dict[str, Any], count: int, record: Dict[str, Any]) -> Any:
+            return choice(values)
+        
+        return generate
+    
+    if len(weights) != len(values):
+        raise ValueError(f"choice has {len(values)} values but {len(weights)} weights")
+    
+    cum_weights = list(itertools.accumulate(weights))
+    total = cum_weights[-1]
+    if total <= 0:
+        raise ValueError("choice weights must sum to a positive number")
+    
+    rand = context.rng.random
+    hi = len(values) - 1
+    
+    def generate(state: Dict[str, Any], count: int, record: Dict[str, Any]) -> Any:
+        return values[bisect.bisect(cum_weights, rand() * total, 0, hi)]
+    
+    return generate
+
+def compile_gaussian(config: Dict[str, Any], context: GeneratorContext) -> FieldGenerator:
+    """
+    Compile a Gaussian (normal) distribution generator.
+    """
+    mean = config.get("mean", 0.0)
+    stddev = config.get("stddev", 1.0)
+    precision = config.get("precision", 4)
+    if stddev < 0:
+        raise ValueError(f"stddev must not be negative, got {stddev}")
+    
+    normalvariate = context.rng.normalvariate
+    
+    def generate(state: Dict[str, Any], count: int, record: Dict[str, Any]) -> float:
+        return round(normalvariate(mean, stddev), precision)
+    
+    return generate
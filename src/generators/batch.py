@@ -0,0 +1,287 @@
+"""
+Vectorized generation of whole batches of records with NumPy.
+"""
+import logging
+from typing import Dict, Any, Callable, List, Optional, Union
+
+from ..clock import WallClock, SimulationClock
+from .plan import SchemaPlan, compile_schema
+from .ids import vector_uuid, vector_ulid, vector_snowflake
+
+logger = logging.getLogger(__name__)
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+class ColumnarBatch:
+    """
+    A batch of records stored column by column.
+    
+    Columns are NumPy arrays or lists of equal length. Row dicts are only
+    built when rows() is first called.
+    """
+    
+    def __init__(self, columns: Dict[str, Any], size: int, rows: Optional[List[Dict[str, Any]]] = None):
+        """
+        Initialize the batch.
+        
+        Args:
+            columns: Column values keyed by field name, in record field order
+            size: Number of records in the batch
+            rows: Already materialized rows, if any
+        """
+        self.columns = columns
+        self.size = size
+        self._rows = rows
+    
+    @classmethod
+    def from_rows(cls, rows: List[Dict[str, Any]], names: List[str]) -> "ColumnarBatch":
+        """
+        Build a batch from record dicts, keeping the named fields.
+        """
+        columns = {name: [row.get(name) for row in rows] for name in names}
+        return cls(columns, len(rows), rows)
+    
+    def __len__(self) -> int:
+        return self.size
+    
+    def row(self, index: int) -> Dict[str, Any]:
+        """
+        Return one record without materializing the others.
+        """
+        if self._rows is not None:
+            return self._rows[index]
+        index %= self.size
+        return {name: _to_list(column[index:index + 1])[0] for name, column in self.columns.items()}
+    
+    def rows(self) -> List[Dict[str, Any]]:
+        """
+        Materialize the batch as a list of record dicts.
+        """
+        if self._rows is None:
+            names = list(self.columns)
+            values = [_to_list(column) for column in self.columns.values()]
+            self._rows = [dict(zip(names, row)) for row in zip(*values)]
+        return self._rows
+
+class BatchPlan:
+    """
+    A schema compiled for batch generation.
+    
+    Fields with a vectorized generator are produced as whole columns; all
+    other fields fall back to the per-record generators of the SchemaPlan,
+    run row by row after the vectorized columns are filled in.
+    """
+    
+    def __init__(self, plan: SchemaPlan, vector_fields: Dict[str, Callable], rng: Any = None):
+        """
+        Initialize the batch plan.
+        
+        Args:
+            plan: Per-record plan for the same schema
+            vector_fields: Vectorized generators keyed by field name
+            rng: NumPy random generator of the vectorized generators
+        """
+        self.plan = plan
+        self.vector_fields = vector_fields
+        self.rng = rng
+        self.scalar_fields = [
+            (name, generator) for name, generator in plan.fields
+            if name not in vector_fields
+        ]
+    
+    def generate(self, state: Dict[str, Any], count: int, n: int) -> ColumnarBatch:
+        """
+        Generate n records.
+        
+        Args:
+            state: Current state
+            count: Record count of the first record in the batch
+            n: Number of records
+        """
+        columns = {}
+        for field_name in self.plan.field_names:
+            generator = self.vector_fields.get(field_name)
+            columns[field_name] = generator(state, count, n) if generator else None
+        
+        if not self.scalar_fields:
+            self.plan.clock.skip(n)
+            return ColumnarBatch(columns, n)
+        
+        # Fill the remaining fields record by record, in plan order
+        for field_name, _ in self.scalar_fields:
+            columns[field_name] = [None] * n
+        rows = ColumnarBatch(columns, n).rows()
+        tick = self.plan.clock.tick
+        for i, record in enumerate(rows):
+            tick()
+            for field_name, generator in self.scalar_fields:
+                try:
+                    record[field_name] = generator(state, count + i, record)
+                except Exception as e:
+                    logger.error(f"Error generating field {field_name}: {e}")
+                    record[field_name] = None
+        for field_name, _ in self.scalar_fields:
+            columns[field_name] = [record[field_name] for record in rows]
+        
+        return ColumnarBatch(columns, n, rows)
+
+def compile_batch(schema: Dict[str, Any], seed: Optional[int] = None,
+                  clock: Optional[Union[WallClock, SimulationClock]] = None) -> BatchPlan:
+    """
+    Compile a schema into a BatchPlan.
+    
+    Args:
+        schema: Stream schema
+        seed: Seed for the NumPy and per-record random generators
+        clock: Clock for timestamp fields, defaults to wall time
+    
+    Raises:
+        ImportError: If NumPy is not installed
+        ValueError: If the schema is invalid
+    """
+    if np is None:
+        raise ImportError("NumPy not installed. Install with: pip install numpy")
+    
+    plan = compile_schema(schema, seed, clock)
+    rng = np.random.default_rng(seed)
+    
+    vector_fields = {}
+    for field_name in plan.field_names:
+        field_config = schema[field_name]
+        if not (isinstance(field_config, dict) and "type" in field_config):
+            field_config = {"type": "static", "value": field_config}
+        compiler = VECTOR_COMPILERS.get(field_config["type"])
+        if compiler is not None:
+            vector_fields[field_name] = compiler(field_config, rng, plan.clock)
+    
+    return BatchPlan(plan, vector_fields, rng)
+
+def create_batch(schema: Dict[str, Any], n: int, state: Optional[Dict[str, Any]] = None, count: int = 1) -> ColumnarBatch:
+    """
+    Generate a batch of n records based on the schema.
+    
+    This compiles the schema on every call; callers generating many
+    batches should keep a BatchPlan from compile_batch instead.
+    """
+    return compile_batch(schema).generate(state if state is not None else {}, count, n)
+
+def _to_list(column: Any) -> List[Any]:
+    """
+    Convert a column to a list of plain Python values.
+    """
+    if np is not None and isinstance(column, np.ndarray):
+        return column.tolist()
+    return list(column)
+
+def _vector_static(config: Dict[str, Any], rng: Any, clock: Any) -> Callable:
+    """
+    Compile a vectorized generator of a static value.
+    """
+    value = config.get("value")
+    
+    def generate(state: Dict[str, Any], count: int, n: int) -> List[Any]:
+        return [value] * n
+    
+    return generate
+
+def _vector_random_int(config: Dict[str, Any], rng: Any, clock: Any) -> Callable:
+    """
+    Compile a vectorized generator of random integers.
+    """
+    min_val = config.get("min", 0)
+    max_val = config.get("max", 100)
+    integers = rng.integers
+    
+    def generate(state: Dict[str, Any], count: int, n: int) -> Any:
+        return integers(min_val, max_val, size=n, endpoint=True)
+    
+    return generate
+
+def _vector_random_float(config: Dict[str, Any], rng: Any, clock: Any) -> Callable:
+    """
+    Compile a vectorized generator of random floats.
+    """
+    min_val = config.get("min", 0.0)
+    max_val = config.get("max", 1.0)
+    precision = config.get("precision", 4)
+    uniform = rng.uniform
+    
+    def generate(state: Dict[str, Any], count: int, n: int) -> Any:
+        return np.round(uniform(min_val, max_val, size=n), precision)
+    
+    return generate
+
+def _vector_gaussian(config: Dict[str, Any], rng: Any, clock: Any) -> Callable:
+    """
+    Compile a vectorized generator of Gaussian values.
+    """
+    mean = config.get("mean", 0.0)
+    stddev = config.get("stddev", 1.0)
+    precision = config.get("precision", 4)
+    normal = rng.normal
+    
+    def generate(state: Dict[str, Any], count: int, n: int) -> Any:
+        return np.round(normal(mean, stddev, size=n), precision)
+    
+    return generate
+
+def _vector_choice(config: Dict[str, Any], rng: Any, clock: Any) -> Callable:
+    """
+    Compile a vectorized generator of choices.
+    """
+    values = list(config.get("values", []))
+    weights = config.get("weights", None)
+    
+    # Object array so materialized values keep their original Python types
+    choices = np.empty(len(values), dtype=object)
+    choices[:] = values
+    
+    if weights is None:
+        integers = rng.integers
+        
+        def generate(state: Dict[str, Any], count: int, n: int) -> Any:
+            return choices[integers(0, len(choices), size=n)]
+        
+        return generate
+    
+    cum_weights = np.cumsum(np.asarray(weights, dtype=float))
+    cum_weights /= cum_weights[-1]
+    last = len(choices) - 1
+    random = rng.random
+    
+    def generate(state: Dict[str, Any], count: int, n: int) -> Any:
+        indices = np.searchsorted(cum_weights, random(n), side="right")
+        return choices[np.minimum(indices, last)]
+    
+    return generate
+
+def _vector_sequence_int(config: Dict[str, Any], rng: Any, clock: Any) -> Callable:
+    """
+    Compile a vectorized generator of sequence integers.
+    """
+    start = config.get("start", 0)
+    step = config.get("step", 1)
+    state_key = f"sequence_{config.get('name', '_default')}"
+    
+    def generate(state: Dict[str, Any], count: int, n: int) -> Any:
+        current = state.get(state_key, start)
+        state[state_key] = current + n * step
+        return current + step * np.arange(n)
+    
+    return generate
+
+# Registry of vectorized generator compilers
+VECTOR_COMPILERS = {
+    "static": _vector_static,
+    "random_int": _vector_random_int,
+    "random_float": _vector_random_float,
+    "gaussian": _vector_gaussian,
+    "choice": _vector_choice,
+    "sequence_int": _vector_sequence_int,
+    "uuid": vector_uuid,
+    "ulid": vector_ulid,
+    "snowflake": vector_snowflake,
+}
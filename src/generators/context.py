@@ -0,0 +1,24 @@
+"""
+Resources shared by the generators of one compiled schema.
+"""
+import random
+from typing import Optional, Union
+
+from ..clock import WallClock, SimulationClock
+
+class GeneratorContext:
+    """
+    The random generator and clock a schema's fields are compiled against.
+    """
+    
+    def __init__(self, rng: Optional[random.Random] = None,
+                 clock: Optional[Union[WallClock, SimulationClock]] = None):
+        """
+        Initialize the context.
+        
+        Args:
+            rng: Random generator for every field of the schema
+            clock: Clock that timestamp fields read, defaults to wall time
+        """
+        self.rng = rng if rng is not None else random.Random()
+        self.clock = clock if clock is not None else WallClock()
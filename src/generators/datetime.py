@@ -1,36 +1,48 @@
 import datetime
-from typing import Dict, Any, Union
+import math
+import operator
+import re
+from typing import Dict, Any, Union, Callable, Tuple
+
+from .context import GeneratorContext
+
+# strftime directives, including %% for a literal percent sign
+_DIRECTIVE = re.compile(r"%.")
+
+# Timezone of timestamps without a `timezone` option: naive local time, as
+# timestamps have always been generated
+DEFAULT_TIMEZONE = "local"
+
+def _get_offset(config: Dict[str, Any]) -> datetime.timedelta:
+    """
+    Build the timedelta described by the optional offset config.
+    """
+    offset = config.get("offset")
+    if not isinstance(offset, dict):
+        return datetime.timedelta(0)
+    
+    return datetime.timedelta(
+        seconds=offset.get("seconds", 0),
+        minutes=offset.get("minutes", 0),
+        hours=offset.get("hours", 0),
+        days=offset.get("days", 0)
+    )
 
 def generate_timestamp(config: Dict[str, Any], state: Dict[str, Any], count: int) -> Union[str, int]:
     """
     Generate a timestamp.
     """
     timestamp_format = config.get("format", "iso")
-    timestamp_type = config.get("type", "utc")
+    timezone = config.get("timezone", DEFAULT_TIMEZONE)
     
     # Get current time
-    if timestamp_type == "utc":
+    if timezone == "utc":
         now = datetime.datetime.now(datetime.timezone.utc)
     else:
         now = datetime.datetime.now()
     
     # Apply optional offset
-    if "offset" in config:
-        offset = config["offset"]
-        if isinstance(offset, dict):
-            seconds = offset.get("seconds", 0)
-            minutes = offset.get("minutes", 0)
-            hours = offset.get("hours", 0)
-            days = offset.get("days", 0)
-            
-            delta = datetime.timedelta(
-                seconds=seconds,
-                minutes=minutes,
-                hours=hours,
-                days=days
-            )
-            
-            now = now + delta
+    now = now + _get_offset(config)
     
     # Format the timestamp
     if timestamp_format == "iso":
@@ -43,71 +55,103 @@ def generate_timestamp(config: Dict[str, Any], state: Dict[str, Any], count: int
     else:
         return now.isoformat()
 
-# data_stream_simulator/generators/stateful.py
-"""
-Stateful data generation functions for the Data Stream Simulator.
-"""
-import logging
-from typing import Dict, Any, Callable
-
-logger = logging.getLogger(__name__)
-
-def generate_dependent(config: Dict[str, Any], state: Dict[str, Any], count: int, record: Dict[str, Any]) -> Any:
+def compile_timestamp(config: Dict[str, Any], context: GeneratorContext) -> Callable:
     """
-    Generate a value dependent on another field in the same record.
+    Compile a timestamp generator that reads the context's clock.
     
-    Args:
-        config: Generator configuration
-        state: Current state
-        count: Current record count
-        record: Current record (partially filled)
-        
-    Returns:
-        Dependent value
+    The offset is applied once per second of clock time: the date and time
+    of the last second are kept already formatted, and records within the
+    same second only render their microseconds.
     """
-    field_name = config.get("field")
+    timestamp_format = config.get("format", "iso")
+    tz = datetime.timezone.utc if config.get("timezone", DEFAULT_TIMEZONE) == "utc" else None
+    delta = _get_offset(config)
+    seconds = delta.total_seconds()
+    clock_now = context.clock.now
     
-    if not field_name or field_name not in record:
-        logger.warning(f"Dependent field not found: {field_name}")
-        return None
+    if timestamp_format == "epoch":
+        def generate(state: Dict[str, Any], count: int, record: Dict[str, Any]) -> int:
+            return int(clock_now() + seconds)
+        
+        return generate
     
-    source_value = record[field_name]
+    if timestamp_format == "custom":
+        custom_format = config.get("custom_format", "%Y-%m-%d %H:%M:%S")
+        render = operator.methodcaller("strftime", custom_format)
+        prepare = _compile_strftime(custom_format)
+    else:
+        render = datetime.datetime.isoformat
+        prepare = _prepare_iso
+    cached_second = None
+    base = complete = None
     
-    # Apply transformation function if provided
-    if "func" in config:
-        func_str = config["func"]
-        try:
-            # Simple but unsafe eval - in production, use safer alternatives
-            func = eval(func_str)
-            return func(source_value)
-        except Exception as e:
-            logger.error(f"Error evaluating dependent function: {e}")
-            return None
+    def generate(state: Dict[str, Any], count: int, record: Dict[str, Any]) -> str:
+        nonlocal cached_second, base, complete
+        second, microsecond = _split_timestamp(clock_now())
+        if second != cached_second:
+            base = datetime.datetime.fromtimestamp(second, tz) + delta
+            complete = prepare(base)
+            cached_second = second
+        microsecond += base.microsecond
+        if microsecond >= 1000000:
+            # A sub-second offset carried into the next second
+            return render(base + datetime.timedelta(microseconds=microsecond - base.microsecond))
+        return complete(microsecond)
     
-    # If no function provided, just return the source value
-    return source_value
+    return generate
+
+def _split_timestamp(timestamp: float) -> Tuple[int, int]:
+    """
+    Split an epoch timestamp into whole seconds and microseconds, rounded
+    like datetime.fromtimestamp.
+    """
+    fraction, second = math.modf(timestamp)
+    microsecond = round(fraction * 1e6)
+    if microsecond >= 1000000:
+        return int(second) + 1, microsecond - 1000000
+    if microsecond < 0:
+        return int(second) - 1, microsecond + 1000000
+    return int(second), microsecond
 
-def generate_stateful(config: Dict[str, Any], state: Dict[str, Any], count: int) -> Any:
+def _prepare_iso(moment: datetime.datetime) -> Callable[[int], str]:
     """
-    Generate a value based on state.
+    Format a whole second in ISO 8601, returning a function that completes
+    it with the microseconds.
     """
-    state_key = config.get("state_key", "_default_stateful")
+    text = moment.replace(microsecond=0).isoformat()
+    prefix, suffix = text[:19], text[19:]
+    fractions = prefix + ".%06d" + suffix
     
-    # Initialize state if needed
-    if state_key not in state:
-        state[state_key] = config.get("initial", 0)
+    def complete(microsecond: int) -> str:
+        return fractions % microsecond if microsecond else text
     
-    # Get the current state value
-    current_value = state[state_key]
+    return complete
+
+def _compile_strftime(custom_format: str) -> Callable[[datetime.datetime], Callable[[int], str]]:
+    """
+    Compile a strftime format into a function like _prepare_iso. The format
+    is split at its %f directives, so only those are rendered per record.
+    """
+    pieces = []
+    start = 0
+    for match in _DIRECTIVE.finditer(custom_format):
+        if match.group() == "%f":
+            pieces.append(custom_format[start:match.start()])
+            start = match.end()
+    pieces.append(custom_format[start:])
     
-    # Apply update function if provided
-    if "update_func" in config:
-        func_str = config["update_func"]
-        try:
-            # Simple but unsafe eval - in production, use safer alternatives
-            func = eval(func_str)
-            state[state_key] = func(current_value, count)
-        except Exception as e:
-            logger.error(f"Error evaluating stateful update function: {e}")
+    def prepare(moment: datetime.datetime) -> Callable[[int], str]:
+        if len(pieces) == 1:
+            text = moment.strftime(custom_format)
+            return lambda microsecond: text
+        
+        # Rendered pieces are escaped so they can be joined with % formatting
+        fractions = "%06d".join(moment.strftime(piece).replace("%", "%%") for piece in pieces)
+        count = len(pieces) - 1
+        
+        def complete(microsecond: int) -> str:
+            return fractions % ((microsecond,) * count)
+        
+        return complete
     
-    return current_value
+    return prepare
@@ -0,0 +1,165 @@
+"""
+Restricted compilation of the lambda expressions used in generator configs.
+
+A `func` or `update_func` string is parsed once, checked against a
+whitelist of AST nodes and names, and compiled into a plain function.
+Only the lambda's own parameters, `random`, `math`, `state`, `count`,
+the other fields of the record and a few pure builtins are visible to it.
+"""
+import ast
+import functools
+import math
+import random
+from typing import Callable, Iterable, Optional, Tuple
+
+# Builtins that may be called from an expression
+SAFE_BUILTINS = {
+    "abs": abs,
+    "all": all,
+    "any": any,
+    "bool": bool,
+    "divmod": divmod,
+    "float": float,
+    "int": int,
+    "len": len,
+    "max": max,
+    "min": min,
+    "pow": pow,
+    "round": round,
+    "sorted": sorted,
+    "str": str,
+    "sum": sum,
+}
+
+# Modules that may be referenced from an expression
+SAFE_MODULES = {
+    "random": random,
+    "math": math,
+}
+
+# Names of the implicit parameters appended to every compiled lambda
+_RECORD = "_record"
+_STATE = "_state"
+_COUNT = "_count"
+
+# Context names rewritten to implicit parameters
+_CONTEXT_NAMES = {"state": _STATE, "count": _COUNT}
+
+# Attributes that could be used to reach interpreter internals
+_BLOCKED_ATTRIBUTES = {"format", "format_map", "mro"}
+
+_ALLOWED_NODES = (
+    ast.Name, ast.Load, ast.Constant, ast.Attribute, ast.Subscript, ast.Slice,
+    ast.Call, ast.keyword, ast.IfExp,
+    ast.BinOp, ast.UnaryOp, ast.BoolOp, ast.Compare,
+    ast.Tuple, ast.List, ast.Dict, ast.Set,
+    ast.JoinedStr, ast.FormattedValue,
+    ast.Add, ast.Sub, ast.Mult, ast.Div, ast.FloorDiv, ast.Mod, ast.Pow,
+    ast.BitAnd, ast.BitOr, ast.BitXor,
+    ast.UAdd, ast.USub, ast.Not, ast.And, ast.Or,
+    ast.Eq, ast.NotEq, ast.Lt, ast.LtE, ast.Gt, ast.GtE,
+    ast.In, ast.NotIn, ast.Is, ast.IsNot,
+)
+
+class _Rewriter(ast.NodeTransformer):
+    """
+    Validate an expression body and bind its free names.
+    """
+    
+    def __init__(self, params: Tuple[str, ...], fields: Tuple[str, ...]):
+        self.params = set(params)
+        self.fields = set(fields)
+        self.referenced_fields = set()
+    
+    def generic_visit(self, node: ast.AST) -> ast.AST:
+        if not isinstance(node, _ALLOWED_NODES):
+            raise ValueError(f"{type(node).__name__} is not allowed in expressions")
+        return super().generic_visit(node)
+    
+    def visit_Attribute(self, node: ast.Attribute) -> ast.AST:
+        if node.attr.startswith("_") or node.attr in _BLOCKED_ATTRIBUTES:
+            raise ValueError(f"access to attribute '{node.attr}' is not allowed")
+        return self.generic_visit(node)
+    
+    def visit_Name(self, node: ast.Name) -> ast.AST:
+        name = node.id
+        if name.startswith("_"):
+            raise ValueError(f"name '{name}' is not allowed")
+        if name in self.params:
+            return node
+        if name in _CONTEXT_NAMES:
+            return ast.copy_location(ast.Name(id=_CONTEXT_NAMES[name], ctx=ast.Load()), node)
+        if name in self.fields:
+            self.referenced_fields.add(name)
+            subscript = ast.Subscript(
+                value=ast.Name(id=_RECORD, ctx=ast.Load()),
+                slice=ast.Constant(value=name),
+                ctx=ast.Load()
+            )
+            return ast.copy_location(subscript, node)
+        if name in SAFE_MODULES or name in SAFE_BUILTINS:
+            return node
+        raise ValueError(f"name '{name}' is not defined")
+
+@functools.lru_cache(maxsize=1024)
+def _compile_cached(source: str, arity: int, fields: Tuple[str, ...], rng: Optional[random.Random]) -> Callable:
+    """
+    Compile an expression for a given arity and set of visible fields.
+    """
+    try:
+        tree = ast.parse(source.strip(), mode="eval")
+    except SyntaxError as e:
+        raise ValueError(f"invalid expression {source!r}: {e.msg}") from e
+    
+    func = tree.body
+    if not isinstance(func, ast.Lambda):
+        raise ValueError(f"expression {source!r} must be a lambda")
+    
+    args = func.args
+    if (args.vararg or args.kwarg or args.kwonlyargs or args.defaults
+            or getattr(args, "posonlyargs", None)):
+        raise ValueError(f"lambda {source!r} may only take plain positional parameters")
+    
+    params = tuple(arg.arg for arg in args.args)
+    if len(params) != arity:
+        raise ValueError(f"lambda {source!r} must take {arity} parameter(s), got {len(params)}")
+    for param in params:
+        if param.startswith("_"):
+            raise ValueError(f"parameter name '{param}' is not allowed")
+    
+    rewriter = _Rewriter(params, fields)
+    body = rewriter.visit(func.body)
+    
+    implicit = [ast.arg(arg=name) for name in (_RECORD, _STATE, _COUNT)]
+    func.args.args = list(args.args) + implicit
+    func.body = body
+    ast.fix_missing_locations(tree)
+    
+    namespace = {"__builtins__": dict(SAFE_BUILTINS)}
+    namespace.update(SAFE_MODULES)
+    if rng is not None:
+        namespace["random"] = rng
+    compiled = eval(compile(tree, "<expression>", "eval"), namespace)
+    compiled.fields = frozenset(rewriter.referenced_fields)
+    return compiled
+
+def compile_expression(source: str, arity: int, fields: Iterable[str] = (), rng: Optional[random.Random] = None) -> Callable:
+    """
+    Compile a lambda expression string into a restricted callable.
+    
+    The returned function takes the lambda's own `arity` arguments
+    followed by the record, the stream state and the record count,
+    and exposes the record fields it reads as its `fields` attribute.
+    Results are cached, so compiling the same expression twice is cheap.
+    
+    Args:
+        source: Lambda source, e.g. "lambda price: round(price * 1.1, 2)"
+        arity: Number of parameters the lambda must declare
+        fields: Record fields the expression may reference by name
+        rng: Random generator bound to `random`, defaults to the module
+    
+    Raises:
+        ValueError: If the expression is malformed or uses anything
+            outside the whitelist
+    """
+    return _compile_cached(source, arity, tuple(sorted(fields)), rng)
@@ -1,8 +1,30 @@
 import logging
-from typing import Dict, Any, Optional
+import queue
+import random
+import threading
+import weakref
+from typing import Dict, Any, Optional, Callable
+
+from .context import GeneratorContext
 
 logger = logging.getLogger(__name__)
 
+# Default fraction of a pool regenerated for every pool_size values drawn
+DEFAULT_REFRESH_RATIO = 0.1
+
+# Most values a refill thread generates ahead of the draws that use them
+_BUFFER_SIZE = 1000
+
+# Seconds a refill thread waits for room in a full buffer before checking
+# whether its pool still exists
+_REFILL_INTERVAL = 0.05
+
+# Put in a pool's buffer when the provider fails, ending the refreshes
+_FAILED = object()
+
+# Keys of a faker field that are not arguments of the provider
+_OPTIONS = {"type", "provider", "locale", "pool_size", "refresh_ratio"}
+
 # Lazy import Faker to avoid dependency issues if not used
 _faker = None
 
@@ -29,7 +51,7 @@ def generate_faker(config: Dict[str, Any], state: Dict[str, Any], count: int) ->
     if faker is None:
         return None
     
-    faker_type = config.get("type", "name")
+    faker_type = config.get("provider", "name")
     
     # Get the faker provider method
     faker_method = getattr(faker, faker_type, None)
@@ -40,8 +62,158 @@ def generate_faker(config: Dict[str, Any], state: Dict[str, Any], count: int) ->
     
     try:
         # Pass any additional parameters to the Faker method
-        params = {k: v for k, v in config.items() if k not in ["type"]}
+        params = {k: v for k, v in config.items() if k not in _OPTIONS}
         return faker_method(**params)
     except Exception as e:
         logger.error(f"Error generating fake data: {e}")
-        return None
\ No newline at end of file
+        return None
+
+class FakerPool:
+    """
+    A bounded pool of pre-generated Faker values, sampled in O(1).
+    
+    For every pool_size values drawn, refresh_ratio * pool_size values are
+    written over random slots, so the pool keeps changing. A background
+    thread generates the new values ahead into a bounded buffer, keeping the
+    provider off the hot path; which draws replace which slots depends only
+    on the draw count and the seeded generators, so a seeded stream draws
+    the same values however the thread is scheduled. Drawing waits for the
+    thread when the buffer is empty. The thread stops with the pool.
+    """
+    
+    def __init__(self, method: Callable, params: Dict[str, Any], size: int,
+                 refresh_ratio: float, rng: random.Random):
+        """
+        Fill the pool and start refreshing it.
+        
+        Args:
+            method: Bound Faker provider method
+            params: Arguments of the provider
+            size: Number of values in the pool
+            refresh_ratio: Fraction of the pool regenerated per size values drawn
+            rng: Random generator values are sampled with
+        """
+        self.method = method
+        self.params = params
+        self.size = size
+        self.refresh_ratio = refresh_ratio
+        self.values = [method(**params) for _ in range(size)]
+        self.drawn = 0
+        self.refreshed = 0
+        self._random = rng.random
+        self._slots = random.Random(rng.getrandbits(64))
+        self._buffer = None
+        if refresh_ratio > 0:
+            self._buffer = queue.Queue(max(1, min(_BUFFER_SIZE, int(size * refresh_ratio))))
+            threading.Thread(
+                target=_refill, args=(weakref.ref(self), method, params, self._buffer), name="faker-pool", daemon=True
+            ).start()
+    
+    def draw(self) -> Any:
+        """
+        Return a random value of the pool, first refreshing the slots due.
+        """
+        self.drawn += 1
+        if self._buffer is not None and self.drawn * self.refresh_ratio >= self.refreshed + 1:
+            self._refresh()
+        return self.values[int(self._random() * self.size)]
+    
+    def _refresh(self) -> None:
+        """
+        Write buffered values over random slots until the refreshes due by
+        the draw count are done, waiting for the refill thread if needed.
+        """
+        target = int(self.drawn * self.refresh_ratio)
+        randrange = self._slots.randrange
+        while self.refreshed < target:
+            value = self._buffer.get()
+            if value is _FAILED:
+                self._buffer = None
+                return
+            self.values[randrange(self.size)] = value
+            self.refreshed += 1
+
+def _refill(pool_ref: weakref.ref, method: Callable, params: Dict[str, Any], buffer: queue.Queue) -> None:
+    """
+    Generate values into a pool's buffer until the pool is garbage collected.
+    
+    Only this thread calls the provider once the pool is filled, so its
+    values come in the same order on every run with the same seed.
+    """
+    while pool_ref() is not None:
+        try:
+            value = method(**params)
+        except Exception as e:
+            logger.error(f"Error refreshing Faker pool, keeping its current values: {e}")
+            value = _FAILED
+        while True:
+            try:
+                buffer.put(value, timeout=_REFILL_INTERVAL)
+                break
+            except queue.Full:
+                if pool_ref() is None:
+                    return
+        if value is _FAILED:
+            return
+
+def _create_faker(locale: Any, seed: int) -> Any:
+    """
+    Create a seeded Faker instance for one field.
+    
+    Raises:
+        ValueError: If the locale is unknown
+    """
+    from faker import Faker
+    try:
+        faker = Faker(locale)
+    except AttributeError as e:
+        raise ValueError(f"unknown Faker locale: {locale}") from e
+    faker.seed_instance(seed)
+    return faker
+
+def compile_faker(config: Dict[str, Any], context: GeneratorContext) -> Callable:
+    """
+    Compile a Faker generator with the provider method resolved up front.
+    
+    Every field gets its own Faker instance, seeded from the context's rng
+    and created for the field's locale. With a pool_size, values are drawn
+    from a FakerPool instead of calling the provider for every record.
+    
+    Raises:
+        ValueError: If the provider, locale or pool settings are invalid
+    """
+    if _get_faker() is None:
+        def generate(state: Dict[str, Any], count: int, record: Dict[str, Any]) -> None:
+            return None
+        
+        return generate
+    
+    faker = _create_faker(config.get("locale"), context.rng.getrandbits(64))
+    faker_type = config.get("provider", "name")
+    faker_method = getattr(faker, faker_type, None)
+    if faker_method is None:
+        raise ValueError(f"unknown Faker provider: {faker_type}")
+    
+    params = {k: v for k, v in config.items() if k not in _OPTIONS}
+    
+    if "pool_size" in config:
+        size = config["pool_size"]
+        refresh_ratio = config.get("refresh_ratio", DEFAULT_REFRESH_RATIO)
+        if isinstance(size, bool) or not isinstance(size, int) or size <= 0:
+            raise ValueError(f"pool_size must be a positive integer, got {size}")
+        if isinstance(refresh_ratio, bool) or not isinstance(refresh_ratio, (int, float)) or not 0 <= refresh_ratio <= 1:
+            raise ValueError(f"refresh_ratio must be a number in [0, 1], got {refresh_ratio}")
+        try:
+            draw = FakerPool(faker_method, params, size, refresh_ratio, context.rng).draw
+        except Exception as e:
+            raise ValueError(f"cannot fill the pool of Faker provider {faker_type}: {e}") from e
+        
+        def generate(state: Dict[str, Any], count: int, record: Dict[str, Any]) -> Any:
+            return draw()
+        
+        return generate
+    
+    def generate(state: Dict[str, Any], count: int, record: Dict[str, Any]) -> Any:
+        return faker_method(**params)
+    
+    return generate
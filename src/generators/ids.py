@@ -0,0 +1,413 @@
+"""
+Unique ID generators: random UUIDs, and time-ordered UUIDv7, ULID and
+Snowflake IDs.
+
+Random bits come from the schema's random generator, so IDs repeat with
+the stream seed and continue from a checkpoint; batches read their
+entropy in one block from the NumPy generator and slice it into IDs.
+Time-ordered IDs take their millisecond timestamp from the stream clock,
+so backfilled IDs match the records' virtual time. Within a millisecond
+they increase by one instead of being redrawn, so the IDs of a stream
+are strictly increasing, as RFC 9562 describes for UUIDv7.
+"""
+import logging
+from typing import Dict, Any, Callable, List, Tuple
+
+from ..clock import parse_time
+from .context import GeneratorContext
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+logger = logging.getLogger(__name__)
+
+# Generator types producing IDs
+ID_TYPES = ("uuid", "ulid", "snowflake")
+
+# Representations of an ID: its usual text form, plain hex digits or raw bytes
+FORMATS = ("canonical", "hex", "bytes")
+
+# Supported UUID versions: 4 (random) and 7 (time-ordered)
+UUID_VERSIONS = (4, 7)
+
+# Default Snowflake epoch, the one Twitter introduced the format with
+DEFAULT_SNOWFLAKE_EPOCH = "2010-11-04T01:42:54.657Z"
+
+# Bits of a Snowflake ID: timestamp, worker and sequence within a millisecond
+SNOWFLAKE_TIME_BITS = 41
+SNOWFLAKE_WORKER_BITS = 10
+SNOWFLAKE_SEQUENCE_BITS = 12
+
+# Crockford's base32 alphabet of ULIDs, and every pair of its digits
+_CROCKFORD = "0123456789ABCDEFGHJKMNPQRSTVWXYZ"
+_CROCKFORD_PAIRS = [a + b for a in _CROCKFORD for b in _CROCKFORD]
+
+_MASK_62 = (1 << 62) - 1
+_MASK_64 = (1 << 64) - 1
+
+def id_kind(config: Dict[str, Any]) -> str:
+    """
+    Return what an ID field holds: "text", "int" (canonical Snowflake IDs)
+    or "bytes", for encoders and columnar outputs.
+    """
+    id_format = config.get("format", "canonical")
+    if id_format == "bytes":
+        return "bytes"
+    if config["type"] == "snowflake" and id_format == "canonical":
+        return "int"
+    return "text"
+
+def _format(config: Dict[str, Any]) -> str:
+    """
+    Return the configured format.
+    
+    Raises:
+        ValueError: If the format is unknown
+    """
+    id_format = config.get("format", "canonical")
+    if id_format not in FORMATS:
+        raise ValueError(f"format must be one of: {', '.join(FORMATS)}")
+    return id_format
+
+def _uuid_version(config: Dict[str, Any]) -> int:
+    """
+    Return the configured UUID version.
+    
+    Raises:
+        ValueError: If the version is not supported
+    """
+    version = config.get("version", 4)
+    if version not in UUID_VERSIONS:
+        raise ValueError(f"version must be one of: {', '.join(map(str, UUID_VERSIONS))}")
+    return version
+
+def _snowflake_layout(config: Dict[str, Any], clock: Any) -> Tuple[int, int]:
+    """
+    Return the epoch in milliseconds and the worker bits of a Snowflake field.
+    
+    Raises:
+        ValueError: If the worker_id or the epoch is invalid
+    """
+    worker_id = config.get("worker_id", 0)
+    if isinstance(worker_id, bool) or not isinstance(worker_id, int) or not 0 <= worker_id < 1 << SNOWFLAKE_WORKER_BITS:
+        raise ValueError(f"worker_id must be an integer in [0, {(1 << SNOWFLAKE_WORKER_BITS) - 1}], got {worker_id!r}")
+    epoch = int(parse_time(config.get("epoch", DEFAULT_SNOWFLAKE_EPOCH)) * 1000)
+    start_time = getattr(clock, "start_time", None)
+    if start_time is not None and start_time * 1000 < epoch:
+        raise ValueError("the clock starts before the Snowflake epoch")
+    return epoch, worker_id << SNOWFLAKE_SEQUENCE_BITS
+
+def _uuid_text(value: int) -> str:
+    """
+    Format a 128-bit value as a canonical UUID.
+    """
+    digits = "%032x" % value
+    return f"{digits[:8]}-{digits[8:12]}-{digits[12:16]}-{digits[16:20]}-{digits[20:]}"
+
+def _ulid_text(value: int) -> str:
+    """
+    Format a 128-bit value as a canonical ULID: 26 Crockford base32 digits.
+    """
+    pairs = _CROCKFORD_PAIRS
+    return "".join([
+        pairs[value >> 120], pairs[value >> 110 & 1023], pairs[value >> 100 & 1023],
+        pairs[value >> 90 & 1023], pairs[value >> 80 & 1023], pairs[value >> 70 & 1023],
+        pairs[value >> 60 & 1023], pairs[value >> 50 & 1023], pairs[value >> 40 & 1023],
+        pairs[value >> 30 & 1023], pairs[value >> 20 & 1023], pairs[value >> 10 & 1023],
+        pairs[value & 1023],
+    ])
+
+def _formatter(id_type: str, id_format: str) -> Callable[[int], Any]:
+    """
+    Return the function turning an ID's integer value into its format.
+    """
+    if id_type == "snowflake":
+        if id_format == "canonical":
+            return int
+        if id_format == "hex":
+            return "%016x".__mod__
+        return lambda value: value.to_bytes(8, "big")
+    if id_format == "canonical":
+        return _uuid_text if id_type == "uuid" else _ulid_text
+    if id_format == "hex":
+        return "%032x".__mod__
+    return lambda value: value.to_bytes(16, "big")
+
+class _Monotonic:
+    """
+    Millisecond timestamps and counters of time-ordered IDs.
+    
+    A new millisecond starts the counter at a fresh value; within a
+    millisecond, or if the clock goes back, the counter goes up by one,
+    and when it runs out of bits the next millisecond is borrowed.
+    """
+    
+    def __init__(self, bits: int, fresh: Callable[[int], int]):
+        """
+        Args:
+            bits: Bits of the counter
+            fresh: Returns the counter at the start of a millisecond, given bits
+        """
+        self.bits = bits
+        self.fresh = fresh
+        self.last_ms = -1
+        self.counter = 0
+    
+    def next(self, ms: int) -> Tuple[int, int]:
+        """
+        Return the timestamp and counter of the next ID.
+        """
+        if ms > self.last_ms:
+            self.last_ms = ms
+            self.counter = self.fresh(self.bits)
+        else:
+            self.counter += 1
+            if self.counter >> self.bits:
+                self.last_ms += 1
+                self.counter = self.fresh(self.bits)
+        return self.last_ms, self.counter
+    
+    def batch(self, ms: Any, fresh: Tuple[Any, Any]) -> Tuple[Any, Any, Any]:
+        """
+        Return the timestamps and counters of a batch of IDs, as NumPy arrays.
+        
+        Args:
+            ms: Millisecond timestamps of the records
+            fresh: High and low 64 bits of a fresh counter for every record
+        
+        Returns:
+            Timestamps, and the high and low 64 bits of the counters
+        """
+        n = len(ms)
+        ms = np.maximum.accumulate(np.maximum(ms, self.last_ms))
+        high, low = fresh
+        
+        # Records in the millisecond of the record before them continue its count
+        index = np.arange(n)
+        previous = np.empty(n, dtype=np.int64)
+        previous[0] = self.last_ms
+        previous[1:] = ms[:-1]
+        starts = ms != previous
+        first = np.maximum.accumulate(np.where(starts, index, 0))
+        offsets = (index - first).astype(np.uint64)
+        high = high[first]
+        low = low[first]
+        if not starts[0]:
+            # The first records continue the count of the previous batch
+            run = first == 0
+            offsets[run] += np.uint64(1)
+            high = np.where(run, np.uint64(self.counter >> 64), high)
+            low = np.where(run, np.uint64(self.counter & _MASK_64), low)
+        counted = low + offsets
+        high = high + (counted < low)
+        low = counted
+        
+        if self.bits < 64:
+            overflow = (low >> np.uint64(self.bits)).any()
+        else:
+            overflow = (high >> np.uint64(self.bits - 64)).any()
+        if overflow:
+            # Counters ran out of bits within a millisecond: count one by one
+            counters = [self.next(int(t)) for t in ms]
+            ms = np.array([t for t, _ in counters], dtype=np.int64)
+            high = np.array([c >> 64 for _, c in counters], dtype=np.uint64)
+            low = np.array([c & _MASK_64 for _, c in counters], dtype=np.uint64)
+            return ms, high, low
+        
+        self.last_ms = int(ms[-1])
+        self.counter = int(high[-1]) << 64 | int(low[-1])
+        return ms, high, low
+
+def compile_uuid(config: Dict[str, Any], context: GeneratorContext) -> Callable:
+    """
+    Compile a UUID generator: version 4 (random) or 7 (time-ordered).
+    
+    Raises:
+        ValueError: If the version or format is invalid
+    """
+    version = _uuid_version(config)
+    format_id = _formatter("uuid", _format(config))
+    getrandbits = context.rng.getrandbits
+    
+    if version == 4:
+        mask = ~(0xF << 76 | 0x3 << 62)
+        bits = 0x4 << 76 | 0x2 << 62
+        
+        def generate(state: Dict[str, Any], count: int, record: Dict[str, Any]) -> Any:
+            return format_id(getrandbits(128) & mask | bits)
+        
+        return generate
+    
+    now = context.clock.now
+    next_id = _Monotonic(74, getrandbits).next
+    
+    def generate(state: Dict[str, Any], count: int, record: Dict[str, Any]) -> Any:
+        ms, counter = next_id(int(now() * 1000))
+        return format_id(ms << 80 | 0x7 << 76 | counter >> 62 << 64 | 0x2 << 62 | counter & _MASK_62)
+    
+    return generate
+
+def compile_ulid(config: Dict[str, Any], context: GeneratorContext) -> Callable:
+    """
+    Compile a ULID generator.
+    
+    Raises:
+        ValueError: If the format is invalid
+    """
+    format_id = _formatter("ulid", _format(config))
+    now = context.clock.now
+    next_id = _Monotonic(80, context.rng.getrandbits).next
+    
+    def generate(state: Dict[str, Any], count: int, record: Dict[str, Any]) -> Any:
+        ms, counter = next_id(int(now() * 1000))
+        return format_id(ms << 80 | counter)
+    
+    return generate
+
+def compile_snowflake(config: Dict[str, Any], context: GeneratorContext) -> Callable:
+    """
+    Compile a Snowflake ID generator: a 41-bit millisecond timestamp since
+    the epoch, a 10-bit worker_id and a 12-bit sequence number.
+    
+    Raises:
+        ValueError: If the format, worker_id or epoch is invalid
+    """
+    format_id = _formatter("snowflake", _format(config))
+    epoch, worker = _snowflake_layout(config, context.clock)
+    now = context.clock.now
+    next_id = _Monotonic(SNOWFLAKE_SEQUENCE_BITS, lambda bits: 0).next
+    
+    def generate(state: Dict[str, Any], count: int, record: Dict[str, Any]) -> Any:
+        ms, sequence = next_id(int(now() * 1000) - epoch)
+        return format_id(ms << (SNOWFLAKE_WORKER_BITS + SNOWFLAKE_SEQUENCE_BITS) | worker | sequence)
+    
+    return generate
+
+def _format_column(id_type: str, id_format: str, high: Any, low: Any) -> Any:
+    """
+    Format a batch of 128-bit IDs, given as their high and low 64 bits.
+    """
+    n = len(high)
+    if id_format == "canonical" and id_type == "ulid":
+        digits = np.empty((n, 26), dtype=np.uint8)
+        digits[:, 0] = high >> np.uint64(61)
+        for j in range(1, 26):
+            shift = 125 - 5 * j
+            if shift >= 64:
+                group = high >> np.uint64(shift - 64)
+            elif shift <= 59:
+                group = low >> np.uint64(shift)
+            else:
+                group = high << np.uint64(64 - shift) | low >> np.uint64(shift)
+            digits[:, j] = group & np.uint64(31)
+        return _split(np.frombuffer(_CROCKFORD.encode(), dtype=np.uint8)[digits].tobytes().decode("ascii"), 26)
+    
+    raw = np.empty((n, 2), dtype=">u8")
+    raw[:, 0] = high
+    raw[:, 1] = low
+    if id_format == "bytes":
+        return _split(raw.tobytes(), 16)
+    digits = np.frombuffer(raw.tobytes().hex().encode(), dtype=np.uint8).reshape(n, 32)
+    if id_format == "hex":
+        return _split(digits.tobytes().decode("ascii"), 32)
+    text = np.full((n, 36), ord("-"), dtype=np.uint8)
+    text[:, :8] = digits[:, :8]
+    text[:, 9:13] = digits[:, 8:12]
+    text[:, 14:18] = digits[:, 12:16]
+    text[:, 19:23] = digits[:, 16:20]
+    text[:, 24:] = digits[:, 20:]
+    return _split(text.tobytes().decode("ascii"), 36)
+
+def _split(data: Any, width: int) -> List[Any]:
+    """
+    Cut a string or bytes into pieces of equal width.
+    """
+    return [data[i:i + width] for i in range(0, len(data), width)]
+
+def _entropy(rng: Any, n: int) -> Tuple[Any, Any]:
+    """
+    Read 128 random bits for each of n IDs in one block.
+    """
+    words = np.frombuffer(rng.bytes(16 * n), dtype=np.uint64).reshape(n, 2)
+    return words[:, 0], words[:, 1]
+
+def _milliseconds(clock: Any, n: int) -> Any:
+    """
+    Return the millisecond timestamps of the next n records.
+    """
+    return (np.asarray(clock.times(n), dtype=np.float64) * 1000).astype(np.int64)
+
+def _numpy_bits(rng: Any) -> Callable[[int], int]:
+    """
+    Return a getrandbits-like function drawing from a NumPy generator,
+    for counters that run out of bits within a batch.
+    """
+    def getrandbits(bits: int) -> int:
+        return int.from_bytes(rng.bytes((bits + 7) // 8), "big") >> (-bits % 8)
+    
+    return getrandbits
+
+def vector_uuid(config: Dict[str, Any], rng: Any, clock: Any) -> Callable:
+    """
+    Compile a vectorized UUID generator.
+    """
+    version = _uuid_version(config)
+    id_format = _format(config)
+    
+    if version == 4:
+        high_mask = np.uint64(~0xF000 & _MASK_64)
+        low_mask = np.uint64(_MASK_62)
+        
+        def generate(state: Dict[str, Any], count: int, n: int) -> List[Any]:
+            high, low = _entropy(rng, n)
+            return _format_column("uuid", id_format, high & high_mask | np.uint64(0x4000),
+                                  low & low_mask | np.uint64(0x2 << 62))
+        
+        return generate
+    
+    monotonic = _Monotonic(74, _numpy_bits(rng))
+    
+    def generate(state: Dict[str, Any], count: int, n: int) -> List[Any]:
+        high, low = _entropy(rng, n)
+        ms, high, low = monotonic.batch(_milliseconds(clock, n), (high & np.uint64(0x3FF), low))
+        high = ms.astype(np.uint64) << np.uint64(16) | np.uint64(0x7000) | (high << np.uint64(2) | low >> np.uint64(62))
+        return _format_column("uuid", id_format, high, low & np.uint64(_MASK_62) | np.uint64(0x2 << 62))
+    
+    return generate
+
+def vector_ulid(config: Dict[str, Any], rng: Any, clock: Any) -> Callable:
+    """
+    Compile a vectorized ULID generator.
+    """
+    id_format = _format(config)
+    monotonic = _Monotonic(80, _numpy_bits(rng))
+    
+    def generate(state: Dict[str, Any], count: int, n: int) -> List[Any]:
+        high, low = _entropy(rng, n)
+        ms, high, low = monotonic.batch(_milliseconds(clock, n), (high & np.uint64(0xFFFF), low))
+        return _format_column("ulid", id_format, ms.astype(np.uint64) << np.uint64(16) | high, low)
+    
+    return generate
+
+def vector_snowflake(config: Dict[str, Any], rng: Any, clock: Any) -> Callable:
+    """
+    Compile a vectorized Snowflake ID generator.
+    """
+    id_format = _format(config)
+    epoch, worker = _snowflake_layout(config, clock)
+    monotonic = _Monotonic(SNOWFLAKE_SEQUENCE_BITS, lambda bits: 0)
+    
+    def generate(state: Dict[str, Any], count: int, n: int) -> Any:
+        zeros = np.zeros(n, dtype=np.uint64)
+        ms, _, sequence = monotonic.batch(_milliseconds(clock, n) - epoch, (zeros, zeros))
+        ids = (ms << (SNOWFLAKE_WORKER_BITS + SNOWFLAKE_SEQUENCE_BITS) | worker) | sequence.astype(np.int64)
+        if id_format == "canonical":
+            return ids
+        raw = ids.astype(">u8")
+        if id_format == "bytes":
+            return _split(raw.tobytes(), 8)
+        return _split(raw.tobytes().hex(), 16)
+    
+    return generate
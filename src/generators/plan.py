@@ -0,0 +1,176 @@
+"""
+Compilation of stream schemas into reusable generation plans.
+"""
+import logging
+import random
+from typing import Dict, Any, Callable, List, Optional, Tuple, Union
+
+from ..clock import WallClock, SimulationClock
+
+from .basic import (
+    compile_static,
+    compile_random_int,
+    compile_random_float,
+    compile_sequence_int,
+    compile_choice,
+    compile_gaussian
+)
+from .datetime import compile_timestamp
+from .ids import compile_uuid, compile_ulid, compile_snowflake
+from .stateful import compile_dependent, compile_stateful
+from .faker import compile_faker
+from .context import GeneratorContext
+
+logger = logging.getLogger(__name__)
+
+# Registry of generator compilers, keyed like GENERATORS
+COMPILERS = {
+    "static": compile_static,
+    "random_int": compile_random_int,
+    "random_float": compile_random_float,
+    "sequence_int": compile_sequence_int,
+    "choice": compile_choice,
+    "uuid": compile_uuid,
+    "ulid": compile_ulid,
+    "snowflake": compile_snowflake,
+    "timestamp": compile_timestamp,
+    "gaussian": compile_gaussian,
+    "faker": compile_faker,
+    "dependent": compile_dependent,
+    "stateful": compile_stateful,
+}
+
+# Generator types whose expressions may read other record fields
+_EXPRESSION_TYPES = {"dependent", "stateful"}
+
+class SchemaPlan:
+    """
+    A schema compiled into an ordered list of bound field generators.
+    """
+    
+    def __init__(self, fields: List[Tuple[str, Callable]], clock: Optional[Union[WallClock, SimulationClock]] = None,
+                 rng: Optional[random.Random] = None):
+        """
+        Initialize the plan.
+        
+        Args:
+            fields: (field name, generator) pairs in execution order
+            clock: Clock the timestamp fields read, ticked once per record
+            rng: Random generator the field generators draw from
+        """
+        self.fields = fields
+        self.field_names = [name for name, _ in fields]
+        self.clock = clock if clock is not None else WallClock()
+        self.rng = rng
+    
+    def generate(self, state: Dict[str, Any], count: int) -> Dict[str, Any]:
+        """
+        Generate a complete record by running every field generator in order.
+        """
+        self.clock.tick()
+        record = {}
+        for field_name, generator in self.fields:
+            try:
+                record[field_name] = generator(state, count, record)
+            except Exception as e:
+                logger.error(f"Error generating field {field_name}: {e}")
+                record[field_name] = None
+        
+        return record
+
+def compile_schema(schema: Dict[str, Any], seed: Optional[int] = None,
+                   clock: Optional[Union[WallClock, SimulationClock]] = None) -> SchemaPlan:
+    """
+    Compile a schema into a SchemaPlan.
+    
+    Independent fields keep their schema order and are followed by
+    dependent fields in topological order, so a dependent field may
+    reference another dependent field.
+    
+    Args:
+        schema: Stream schema
+        seed: Seed for the plan's random generator
+        clock: Clock for timestamp fields, defaults to wall time
+    
+    Raises:
+        ValueError: If the schema is invalid
+    """
+    context = GeneratorContext(random.Random(seed), clock)
+    fields = []
+    dependents = {}
+    
+    for field_name, field_config in schema.items():
+        if not (isinstance(field_config, dict) and "type" in field_config):
+            # Simple static value
+            fields.append((field_name, compile_static({"value": field_config}, context)))
+            continue
+        
+        generator_type = field_config["type"]
+        if generator_type not in COMPILERS:
+            raise ValueError(f"Field '{field_name}' has unknown generator type: {generator_type}")
+        
+        if generator_type == "dependent":
+            dependents[field_name] = field_config
+            continue
+        
+        # Expressions may only read fields generated before this one
+        available = [name for name, _ in fields]
+        fields.append((field_name, _compile_field(field_name, field_config, available, context)))
+    
+    compiled = {}
+    for field_name, field_config in dependents.items():
+        _check_source(field_name, field_config, schema)
+        available = [name for name in schema if name != field_name]
+        compiled[field_name] = _compile_field(field_name, field_config, available, context)
+    
+    for field_name in _sort_dependents(compiled):
+        fields.append((field_name, compiled[field_name]))
+    
+    return SchemaPlan(fields, context.clock, context.rng)
+
+def _compile_field(field_name: str, field_config: Dict[str, Any], available: List[str], context: GeneratorContext) -> Callable:
+    """
+    Compile a single field, tagging any validation error with its name.
+    """
+    compiler = COMPILERS[field_config["type"]]
+    try:
+        if field_config["type"] in _EXPRESSION_TYPES:
+            return compiler(field_config, context, available)
+        return compiler(field_config, context)
+    except ValueError as e:
+        raise ValueError(f"Field '{field_name}': {e}") from e
+
+def _check_source(field_name: str, field_config: Dict[str, Any], schema: Dict[str, Any]) -> None:
+    """
+    Check that a dependent field's source field exists.
+    """
+    source = field_config.get("field")
+    if not source or source == field_name or source not in schema:
+        raise ValueError(f"Dependent field '{field_name}' references unknown field: {source}")
+
+def _sort_dependents(compiled: Dict[str, Callable]) -> List[str]:
+    """
+    Order dependent fields so every field they read is generated first.
+    """
+    order = []
+    done = set()
+    visiting = set()
+    
+    def visit(field_name: str) -> None:
+        if field_name in done:
+            return
+        if field_name in visiting:
+            raise ValueError(f"Dependent field '{field_name}' is part of a dependency cycle")
+        
+        visiting.add(field_name)
+        for source in sorted(compiled[field_name].depends_on):
+            if source in compiled:
+                visit(source)
+        visiting.discard(field_name)
+        done.add(field_name)
+        order.append(field_name)
+    
+    for field_name in compiled:
+        visit(field_name)
+    
+    return order
@@ -0,0 +1,200 @@
+"""
+Stateful data generation functions for the Data Stream Simulator.
+"""
+import logging
+import string
+from typing import Dict, Any, Callable, Iterable, List
+
+from ..state import KeyedState
+from .context import GeneratorContext
+from .expressions import compile_expression
+
+logger = logging.getLogger(__name__)
+
+def generate_dependent(config: Dict[str, Any], state: Dict[str, Any], count: int, record: Dict[str, Any]) -> Any:
+    """
+    Generate a value dependent on another field in the same record.
+    
+    Args:
+        config: Generator configuration
+        state: Current state
+        count: Current record count
+        record: Current record (partially filled)
+    
+    Returns:
+        Dependent value
+    """
+    field_name = config.get("field")
+    
+    if not field_name or field_name not in record:
+        logger.warning(f"Dependent field not found: {field_name}")
+        return None
+    
+    source_value = record[field_name]
+    
+    # Apply transformation function if provided
+    if "func" in config:
+        try:
+            func = compile_expression(config["func"], 1, record)
+            return func(source_value, record, state, count)
+        except Exception as e:
+            logger.error(f"Error evaluating dependent function: {e}")
+            return None
+    
+    # If no function provided, just return the source value
+    return source_value
+
+def generate_stateful(config: Dict[str, Any], state: Dict[str, Any], count: int) -> Any:
+    """
+    Generate a value based on state.
+    """
+    state_key = config.get("state_key", "_default_stateful")
+    
+    # Initialize state if needed
+    if state_key not in state:
+        state[state_key] = config.get("initial", 0)
+    
+    # Get the current state value
+    current_value = state[state_key]
+    
+    # Apply update function if provided
+    if "update_func" in config:
+        try:
+            func = compile_expression(config["update_func"], 2)
+            state[state_key] = func(current_value, count, {}, state, count)
+        except Exception as e:
+            logger.error(f"Error evaluating stateful update function: {e}")
+    
+    return current_value
+
+def compile_dependent(config: Dict[str, Any], context: GeneratorContext, fields: Iterable[str] = ()) -> Callable:
+    """
+    Compile a dependent field generator.
+    
+    The source field and any fields the func reads are listed in the
+    generator's `depends_on` attribute so the schema plan can order
+    dependents before running them.
+    
+    Args:
+        config: Generator configuration
+        context: Generator context; its rng is exposed to the func as `random`
+        fields: Record fields the func may reference by name
+    """
+    field_name = config.get("field")
+    
+    if "func" not in config:
+        def generate(state: Dict[str, Any], count: int, record: Dict[str, Any]) -> Any:
+            return record[field_name]
+        
+        generate.depends_on = {field_name}
+        return generate
+    
+    func = compile_expression(config["func"], 1, fields, context.rng)
+    
+    def generate(state: Dict[str, Any], count: int, record: Dict[str, Any]) -> Any:
+        return func(record[field_name], record, state, count)
+    
+    generate.depends_on = {field_name} | func.fields
+    return generate
+
+def compile_stateful(config: Dict[str, Any], context: GeneratorContext, fields: Iterable[str] = ()) -> Callable:
+    """
+    Compile a stateful generator.
+    
+    A state_key naming record fields, e.g. "price_{symbol}", keeps a
+    separate value for every combination of those fields' values.
+    
+    Args:
+        config: Generator configuration
+        context: Generator context; its rng is exposed to the update_func as `random`
+        fields: Record fields the update_func may reference by name
+    
+    Raises:
+        ValueError: If the state_key or the eviction settings are invalid
+    """
+    state_key = config.get("state_key", "_default_stateful")
+    initial = config.get("initial", 0)
+    key_fields = _key_fields(state_key, fields)
+    if key_fields:
+        return _compile_keyed(config, context, fields, state_key, key_fields)
+    if "ttl" in config or "max_entities" in config:
+        raise ValueError("ttl and max_entities need a state_key that names record fields")
+    
+    if "update_func" not in config:
+        def generate(state: Dict[str, Any], count: int, record: Dict[str, Any]) -> Any:
+            return state.setdefault(state_key, initial)
+        
+        return generate
+    
+    func = compile_expression(config["update_func"], 2, fields, context.rng)
+    
+    def generate(state: Dict[str, Any], count: int, record: Dict[str, Any]) -> Any:
+        current_value = state.get(state_key, initial)
+        try:
+            state[state_key] = func(current_value, count, record, state, count)
+        except Exception as e:
+            state[state_key] = current_value
+            logger.error(f"Error evaluating stateful update function: {e}")
+        return current_value
+    
+    return generate
+
+def _key_fields(state_key: str, fields: Iterable[str]) -> List[str]:
+    """
+    Return the record fields a state_key template names.
+    
+    Raises:
+        ValueError: If the template is invalid or names a field not yet generated
+    """
+    try:
+        names = [name for _, name, _, _ in string.Formatter().parse(state_key) if name is not None]
+    except ValueError as e:
+        raise ValueError(f"invalid state_key '{state_key}': {e}") from None
+    
+    available = set(fields)
+    for name in names:
+        if name not in available:
+            raise ValueError(f"state_key '{state_key}' references a field that is not generated before it: {name or '{}'}")
+    return list(dict.fromkeys(names))
+
+def _compile_keyed(config: Dict[str, Any], context: GeneratorContext, fields: Iterable[str],
+                   state_key: str, key_fields: List[str]) -> Callable:
+    """
+    Compile a stateful generator keeping one value per entity.
+    
+    Values live in a KeyedState column named after the state_key. Stateful
+    fields keyed by the same record fields share one KeyedState, stored in
+    the stream state under "_keyed:" and the field names.
+    """
+    initial = config.get("initial", 0)
+    ttl = config.get("ttl")
+    max_entities = config.get("max_entities")
+    if ttl is not None and not ttl > 0:
+        raise ValueError(f"ttl must be positive, got {ttl}")
+    if max_entities is not None and not (isinstance(max_entities, int) and max_entities > 0):
+        raise ValueError(f"max_entities must be a positive integer, got {max_entities}")
+    
+    table_key = "_keyed:" + ",".join(key_fields)
+    key_field = key_fields[0] if len(key_fields) == 1 else None
+    clock_now = context.clock.now
+    func = compile_expression(config["update_func"], 2, fields, context.rng) if "update_func" in config else None
+    
+    def generate(state: Dict[str, Any], count: int, record: Dict[str, Any]) -> Any:
+        table = state.get(table_key)
+        if table is None:
+            table = state[table_key] = KeyedState()
+        if state_key not in table.columns:
+            table.configure(ttl, max_entities)
+            table.add_column(state_key, initial)
+        
+        key = record[key_field] if key_field is not None else tuple([record[name] for name in key_fields])
+        row = table.row(key, clock_now() if table.ttl is not None else None)
+        current_value = table.columns[state_key][row]
+        if func is not None:
+            try:
+                table.set(state_key, row, func(current_value, count, record, state, count))
+            except Exception as e:
+                logger.error(f"Error evaluating stateful update function: {e}")
+        return current_value
+    
+    return generate
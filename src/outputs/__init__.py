@@ -1,11 +1,14 @@
 import logging
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 
 from .stdout import StdoutConnector
 from .file import FileConnector
+from .partitioned import PartitionedFileConnector
+from .columnar import ParquetConnector, ArrowConnector, COLUMNAR_TYPES
 from .kafka import KafkaConnector
 from .http import HttpConnector
-from mqtt import MqttConnector
+from .mqtt import MqttConnector
+from .queued import QueuedOutput, OVERFLOW_POLICIES
 
 logger = logging.getLogger(__name__)
 
@@ -13,19 +16,28 @@ logger = logging.getLogger(__name__)
 CONNECTOR_TYPES = {
     "stdout": StdoutConnector,
     "file": FileConnector,
+    "partitioned_file": PartitionedFileConnector,
+    "parquet": ParquetConnector,
+    "arrow": ArrowConnector,
     "kafka": KafkaConnector,
     "http": HttpConnector,
     "mqtt": MqttConnector
 }
 
-def create_output_connector(config: Dict[str, Any]):
+def create_output_connector(config: Dict[str, Any], clock: Optional[Any] = None):
     """
     Create an output connector based on configuration.
+    
+    Connector classes with a `clocked` attribute set are also given the
+    stream's clock.
     """
     connector_type = config.get("type")
     
     if connector_type in CONNECTOR_TYPES:
-        return CONNECTOR_TYPES[connector_type](config)
+        connector_class = CONNECTOR_TYPES[connector_type]
+        if getattr(connector_class, "clocked", False):
+            return connector_class(config, clock=clock)
+        return connector_class(config)
     else:
         logger.warning(f"Unknown output type: {connector_type}, falling back to stdout")
         return StdoutConnector(config)
\ No newline at end of file
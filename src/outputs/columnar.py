@@ -0,0 +1,386 @@
+"""
+Parquet and Arrow IPC outputs that receive whole batches of columns.
+"""
+import os
+import abc
+import logging
+import asyncio
+import collections
+import concurrent.futures
+from typing import Dict, Any, List, Optional, Tuple
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+except ImportError:
+    pa = None
+    pc = None
+
+from ..generators.datetime import DEFAULT_TIMEZONE
+from ..generators.ids import ID_TYPES, id_kind
+from .file import MAX_PENDING_WRITES
+
+logger = logging.getLogger(__name__)
+
+# Output types fed with column batches instead of encoded records
+COLUMNAR_TYPES = ("parquet", "arrow")
+
+# Errors raised by Arrow for values of the wrong type
+_CONVERSION_ERRORS = (TypeError, ValueError) + (
+    (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError) if pa is not None else ()
+)
+
+# Default number of rows per Parquet row group or Arrow record batch
+DEFAULT_ROW_GROUP_SIZE = 100000
+
+def arrow_fields(schema: Dict[str, Any], events: Optional[List[Dict[str, Any]]] = None) -> List[Tuple[str, Any, Any]]:
+    """
+    Derive Arrow types from a stream's schema.
+    
+    Args:
+        schema: Stream schema
+        events: Stream events, whose records may add values to dictionaries
+    
+    Returns:
+        (name, type, dictionary) per field. The type is None where it can only
+        be inferred from the data; dictionary holds the fixed values of a
+        dictionary-encoded string field, e.g. a choice of strings.
+    """
+    fields = []
+    for field_name, field_config in schema.items():
+        if not (isinstance(field_config, dict) and "type" in field_config):
+            field_config = {"type": "static", "value": field_config}
+        field_type, dictionary = _arrow_type(field_config)
+        if dictionary is not None:
+            injected = [
+                event["record"][field_name] for event in events or []
+                if isinstance(event.get("record", {}).get(field_name), str)
+            ]
+            if injected:
+                dictionary = pa.concat_arrays([dictionary, pa.array(injected, pa.string())]).unique()
+        fields.append((field_name, field_type, dictionary))
+    return fields
+
+def _arrow_type(config: Dict[str, Any]) -> Tuple[Any, Any]:
+    """
+    Return the Arrow type and dictionary of one generator.
+    """
+    generator_type = config["type"]
+    if generator_type in ("random_int", "sequence_int"):
+        return pa.int64(), None
+    if generator_type in ("random_float", "gaussian"):
+        return pa.float64(), None
+    if generator_type in ID_TYPES:
+        id_value = id_kind(config)
+        if id_value == "int":
+            return pa.int64(), None
+        if id_value == "bytes":
+            return pa.binary(8 if generator_type == "snowflake" else 16), None
+        return pa.string(), None
+    if generator_type == "timestamp":
+        timestamp_format = config.get("format", "iso")
+        if timestamp_format == "epoch":
+            return pa.timestamp("s", tz="UTC"), None
+        if timestamp_format == "custom":
+            return pa.string(), None
+        # ISO strings carry an offset in UTC and none in local time
+        utc = config.get("timezone", DEFAULT_TIMEZONE) == "utc"
+        return pa.timestamp("us", tz="UTC" if utc else None), None
+    if generator_type in ("choice", "static"):
+        values = config.get("values", []) if generator_type == "choice" else [config.get("value")]
+        try:
+            value_type = pa.array(values).type
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            return None, None
+        if value_type == pa.string():
+            dictionary = pa.array(values, pa.string()).unique()
+            return pa.dictionary(pa.int32(), pa.string()), dictionary
+        if value_type == pa.null():
+            return None, None
+        return value_type, None
+    
+    # faker, dependent and stateful values are inferred from the first batch
+    return None, None
+
+class ColumnarConnector(abc.ABC):
+    """
+    Base class of outputs that write batches of columns to an Arrow-based file.
+    
+    The scheduler hands over ColumnarBatch objects; vectorized streams pass
+    their generated NumPy columns straight through. Batches are collected
+    until row_group_size rows are waiting, then converted and written on a
+    dedicated writer thread in groups of exactly row_group_size rows.
+    Subclasses provide the format's writer.
+    """
+    
+    columnar = True
+    default_filename = "output.parquet"
+    default_compression = None
+    
+    def __init__(self, config: Dict[str, Any]):
+        """
+        Initialize the connector.
+        """
+        self.config = config
+        self.filename = config.get("filename", self.default_filename)
+        self.row_group_size = config.get("row_group_size", DEFAULT_ROW_GROUP_SIZE)
+        self.compression = config.get("compression", self.default_compression)
+        self.compression_level = config.get("compression_level")
+        self.fields = None
+        self.rows_written = 0
+        self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix="columnar-writer")
+        self._batches = []
+        self._rows = 0
+        self._pending = collections.deque()
+        self._carry = None
+        self._writer = None
+        self._sink = None
+        self._warned = set()
+        
+        if pa is None:
+            logger.warning("PyArrow not installed. Install with: pip install pyarrow")
+    
+    def set_schema(self, schema: Dict[str, Any], events: Optional[List[Dict[str, Any]]] = None) -> None:
+        """
+        Set the stream schema the column types are derived from.
+        """
+        if pa is not None:
+            self.fields = arrow_fields(schema, events)
+    
+    async def send(self, batch: Any) -> None:
+        """
+        Write a batch of records.
+        
+        Args:
+            batch: ColumnarBatch of records
+        """
+        await self.send_batch([batch])
+    
+    async def send_batch(self, batches: List[Any]) -> None:
+        """
+        Write several batches of records, a row group at a time.
+        """
+        if pa is None:
+            logger.error("PyArrow not installed, cannot write columnar output")
+            return
+        
+        self._batches.extend(batches)
+        self._rows += sum(len(batch) for batch in batches)
+        if self._rows >= self.row_group_size:
+            self._submit(self._write, self._take(), False)
+            while len(self._pending) > MAX_PENDING_WRITES:
+                await self._wait_oldest()
+    
+    async def close(self) -> None:
+        """
+        Write the remaining rows, finish the file and stop the writer thread.
+        """
+        if pa is None or self.executor is None:
+            return
+        
+        self._submit(self._write, self._take(), True)
+        while self._pending:
+            await self._wait_oldest()
+        self.executor.shutdown(wait=False)
+        self.executor = None
+        logger.info(f"Closed {self.filename} ({self.rows_written} rows)")
+    
+    def _take(self) -> List[Any]:
+        """
+        Remove and return the waiting batches.
+        """
+        batches = self._batches
+        self._batches = []
+        self._rows = 0
+        return batches
+    
+    def _submit(self, func: Any, *args: Any) -> None:
+        """
+        Queue a call on the writer thread.
+        """
+        loop = asyncio.get_running_loop()
+        self._pending.append(loop.run_in_executor(self.executor, func, *args))
+    
+    async def _wait_oldest(self) -> None:
+        """
+        Wait for the oldest pending write, logging its failure.
+        """
+        try:
+            await self._pending.popleft()
+        except Exception as e:
+            logger.error(f"Error writing to {self.filename}: {e}")
+    
+    def _write(self, batches: List[Any], final: bool) -> None:
+        """
+        Convert batches and write whole row groups on the writer thread.
+        
+        Rows short of a full row group are carried over to the next call,
+        or written as a last, smaller group when final.
+        """
+        if batches:
+            table = self._to_table(batches)
+            if self._carry is not None:
+                table = pa.concat_tables([self._carry, table])
+        else:
+            table = self._carry
+        
+        if table is not None:
+            rows = len(table) if final else len(table) // self.row_group_size * self.row_group_size
+            if rows:
+                if self._writer is None:
+                    self._open(table.schema)
+                self._write_table(table.slice(0, rows))
+                self.rows_written += rows
+            self._carry = table.slice(rows) if rows < len(table) else None
+        
+        if final and self._writer is not None:
+            self._writer.close()
+            if self._sink is not None:
+                self._sink.close()
+            self._writer = None
+    
+    def _open(self, schema: Any) -> None:
+        """
+        Create the file and its writer.
+        """
+        directory = os.path.dirname(self.filename)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._writer = self._create_writer(schema)
+        logger.info(f"Opened {self.filename} for output")
+    
+    @abc.abstractmethod
+    def _create_writer(self, schema: Any) -> Any:
+        """
+        Create the format's writer for schema.
+        """
+    
+    @abc.abstractmethod
+    def _write_table(self, table: Any) -> None:
+        """
+        Write a table of full row groups.
+        """
+    
+    def _to_table(self, batches: List[Any]) -> Any:
+        """
+        Convert ColumnarBatch objects into one Arrow table.
+        """
+        if self.fields is None:
+            # No schema was set: take the columns of the first batch
+            self.fields = [(name, None, None) for name in batches[0].columns]
+        
+        arrays = {}
+        for i, (name, field_type, dictionary) in enumerate(self.fields):
+            chunks = []
+            for batch in batches:
+                array = self._to_array(name, batch.columns.get(name), len(batch), field_type, dictionary)
+                if field_type is None:
+                    # Fix the type of an inferred field once seen
+                    field_type = pa.string() if array.type == pa.null() else array.type
+                    self.fields[i] = (name, field_type, dictionary)
+                    array = array.cast(field_type)
+                chunks.append(array)
+            arrays[name] = pa.chunked_array(chunks, field_type)
+        return pa.table(arrays)
+    
+    def _to_array(self, name: str, values: Any, size: int, field_type: Any, dictionary: Any) -> Any:
+        """
+        Convert one column to an Arrow array of field_type.
+        """
+        if values is None:
+            return pa.nulls(size, field_type if field_type is not None else pa.null())
+        
+        if dictionary is not None:
+            # Index into the fixed dictionary, so every batch shares it
+            try:
+                plain = pa.array(values, pa.string())
+            except _CONVERSION_ERRORS:
+                self._warn(name, "has values that are not strings, written as null")
+                plain = pa.array([value if isinstance(value, str) else None for value in values], pa.string())
+            indices = pc.index_in(plain, value_set=dictionary)
+            if indices.null_count > plain.null_count:
+                self._warn(name, "has values outside its choices, written as null")
+            return pa.DictionaryArray.from_arrays(indices, dictionary)
+        
+        try:
+            return self._convert(values, field_type)
+        except _CONVERSION_ERRORS:
+            self._warn(name, f"has values that are not {field_type}, written as null")
+            return self._convert([self._coerce(value, field_type) for value in values], field_type)
+    
+    def _convert(self, values: Any, field_type: Any) -> Any:
+        """
+        Convert values to an Arrow array of field_type, None to infer it.
+        """
+        if field_type is not None and pa.types.is_timestamp(field_type) and field_type.unit == "us":
+            # ISO 8601 strings, with an offset for UTC fields and without for local ones
+            return pa.array(values, pa.string()).cast(field_type)
+        return pa.array(values, field_type)
+    
+    def _coerce(self, value: Any, field_type: Any) -> Any:
+        """
+        Return value if it converts to field_type, otherwise None.
+        """
+        try:
+            self._convert([value], field_type)
+            return value
+        except _CONVERSION_ERRORS:
+            return None
+    
+    def _warn(self, name: str, message: str) -> None:
+        """
+        Log a conversion problem once per field.
+        """
+        if name not in self._warned:
+            self._warned.add(name)
+            logger.warning(f"Field '{name}' in {self.filename} {message}")
+    
+    def __del__(self):
+        """
+        Close the file when the connector is destroyed without close().
+        """
+        if getattr(self, "_writer", None) is not None:
+            try:
+                self._writer.close()
+            except Exception as e:
+                logger.error(f"Error closing {self.filename}: {e}")
+
+class ParquetConnector(ColumnarConnector):
+    """
+    Output connector that writes a Parquet file, one row group per
+    row_group_size records.
+    """
+    
+    default_filename = "output.parquet"
+    default_compression = "snappy"
+    
+    def _create_writer(self, schema: Any) -> Any:
+        import pyarrow.parquet as pq
+        
+        return pq.ParquetWriter(
+            self.filename,
+            schema,
+            compression=self.compression or "none",
+            compression_level=self.compression_level
+        )
+    
+    def _write_table(self, table: Any) -> None:
+        self._writer.write_table(table, row_group_size=self.row_group_size)
+
+class ArrowConnector(ColumnarConnector):
+    """
+    Output connector that writes an Arrow IPC file, or an IPC stream with
+    `ipc_format: stream`, one record batch per row_group_size records.
+    """
+    
+    default_filename = "output.arrow"
+    
+    def _create_writer(self, schema: Any) -> Any:
+        options = pa.ipc.IpcWriteOptions(compression=self.compression)
+        self._sink = pa.OSFile(self.filename, "wb")
+        if self.config.get("ipc_format", "file") == "stream":
+            return pa.ipc.new_stream(self._sink, schema, options=options)
+        return pa.ipc.new_file(self._sink, schema, options=options)
+    
+    def _write_table(self, table: Any) -> None:
+        self._writer.write_table(table, max_chunksize=self.row_group_size)
@@ -1,60 +1,425 @@
 import os
+import gzip
+import time
 import logging
 import asyncio
-from pathlib import Path
-from typing import Dict, Any, Optional, TextIO
+import collections
+import concurrent.futures
+from typing import Dict, Any, List, Optional, BinaryIO
 
 logger = logging.getLogger(__name__)
 
+# Default number of buffered bytes that triggers a write
+DEFAULT_FLUSH_BYTES = 1024 * 1024
+
+# Default seconds buffered records may wait before they are written
+DEFAULT_FLUSH_INTERVAL = 1.0
+
+# Writes handed to the writer thread before sending waits for the oldest
+MAX_PENDING_WRITES = 4
+
+# Supported compressions and the extension added to their file names
+COMPRESSIONS = {"gzip": ".gz", "zstd": ".zst"}
+
+def open_output_file(filename: str, append: bool = True, compression: Optional[str] = None,
+                     level: Optional[int] = None) -> BinaryIO:
+    """
+    Open a file for binary output, creating its directory if needed.
+    
+    Args:
+        filename: Path of the file
+        append: Append to an existing file instead of truncating it
+        compression: None, "gzip" or "zstd"
+        level: Compression level, or None for the codec's default
+    
+    Raises:
+        ImportError: If zstd compression is requested without the zstandard package
+    """
+    directory = os.path.dirname(filename)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    
+    mode = "ab" if append else "wb"
+    if compression == "gzip":
+        return gzip.open(filename, mode, compresslevel=level if level is not None else 6)
+    if compression == "zstd":
+        try:
+            import zstandard
+        except ImportError:
+            raise ImportError("zstandard not installed. Install with: pip install zstandard") from None
+        compressor = zstandard.ZstdCompressor(level=level if level is not None else 3)
+        return compressor.stream_writer(open(filename, mode), closefd=True)
+    return open(filename, mode)
+
+class BufferedFileWriter:
+    """
+    Buffers records on the event loop and writes them on a writer thread.
+    
+    Buffered records are written once flush_bytes have accumulated or
+    flush_interval seconds after the first of them, whichever comes first.
+    Blocking file I/O runs on the given single-thread executor, which may be
+    shared by several writers; at most MAX_PENDING_WRITES writes are pending
+    before writing waits, so a slow disk slows the caller down instead of
+    piling up memory. A failed write is raised by the next write() or
+    write_many() call, so the caller can count it.
+    
+    The file name is a template: `{date}` starts a new file when the local
+    date of the clock changes, and `{seq}` numbers the files started by size
+    (rotate_bytes, counted before compression) or age (rotate_interval)
+    rotation. A header, such as a CSV header line, starts every file that is
+    empty when opened.
+    """
+    
+    def __init__(self, template: str, executor: concurrent.futures.Executor, append: bool = True,
+                 compression: Optional[str] = None, compression_level: Optional[int] = None,
+                 flush_bytes: int = DEFAULT_FLUSH_BYTES, flush_interval: Optional[float] = DEFAULT_FLUSH_INTERVAL,
+                 rotate_bytes: Optional[int] = None, rotate_interval: Optional[float] = None, seq: int = 0,
+                 header: Optional[bytes] = None, clock: Optional[Any] = None):
+        """
+        Initialize the writer.
+        
+        Args:
+            seq: Number of the first {seq} file, e.g. to continue a closed writer
+            header: Bytes written at the start of every empty file
+            clock: Stream clock whose now() dates {date} files, wall time without one
+        
+        Raises:
+            ValueError: If the options are inconsistent or the template is invalid
+        """
+        if compression is not None and compression not in COMPRESSIONS:
+            raise ValueError(f"Unsupported file compression: {compression}")
+        try:
+            template.format(date="1970-01-01", seq=0)
+        except (KeyError, IndexError, AttributeError, ValueError) as e:
+            raise ValueError(
+                f"Invalid file name '{template}': only {{date}} and {{seq}} placeholders are allowed, "
+                f"other braces must be doubled ({type(e).__name__}: {e})"
+            ) from None
+        if (rotate_bytes or rotate_interval) and "{seq}" not in template:
+            raise ValueError("Rotating files need a {seq} placeholder in the filename")
+        
+        if compression is not None and not template.endswith(COMPRESSIONS[compression]):
+            template += COMPRESSIONS[compression]
+        
+        self.template = template
+        self.executor = executor
+        self.append = append
+        self.compression = compression
+        self.compression_level = compression_level
+        self.flush_bytes = flush_bytes
+        self.flush_interval = flush_interval
+        self.rotate_bytes = rotate_bytes
+        self.rotate_interval = rotate_interval
+        self.header = header
+        self.clock = clock
+        self.filename = None
+        self._dated = "{date}" in template
+        self._date = None
+        self.seq = seq
+        self._file_bytes = 0
+        self._opened_at = 0.0
+        self._chunks = []
+        self._buffered = 0
+        self._pending = collections.deque()
+        self._error = None
+        self._timer = None
+        self._file = None
+    
+    def open(self) -> None:
+        """
+        Open the first file right away, so a bad path fails before any record is written.
+        
+        Raises:
+            OSError: If the file or its directory cannot be created
+        """
+        self._open(self._next_filename(0))
+    
+    async def write(self, data: bytes) -> None:
+        """
+        Buffer one record, followed by a newline.
+        
+        Raises:
+            OSError: If an earlier write failed since the last call
+        """
+        self._raise_error()
+        self._chunks.append(data)
+        self._chunks.append(b"\n")
+        self._buffered += len(data) + 1
+        await self._buffered_more()
+    
+    async def write_many(self, batch: List[bytes]) -> None:
+        """
+        Buffer several records, each followed by a newline.
+        
+        Raises:
+            OSError: If an earlier write failed since the last call
+        """
+        self._raise_error()
+        data = b"\n".join(batch) + b"\n"
+        self._chunks.append(data)
+        self._buffered += len(data)
+        await self._buffered_more()
+    
+    async def flush(self) -> None:
+        """
+        Hand the buffered records to the writer thread.
+        """
+        self._hand_off()
+        while len(self._pending) > MAX_PENDING_WRITES:
+            await self._wait_oldest()
+    
+    async def close(self) -> None:
+        """
+        Write the remaining records and close the file.
+        """
+        self.begin_close()
+        await self.wait_closed()
+    
+    def begin_close(self) -> None:
+        """
+        Queue the remaining records and the closing of the file without waiting.
+        """
+        self._hand_off()
+        self._submit(self._close_file)
+    
+    async def wait_closed(self) -> None:
+        """
+        Wait until everything queued by begin_close() is done.
+        """
+        while self._pending:
+            await self._wait_oldest()
+    
+    def close_now(self) -> None:
+        """
+        Close the file from the calling thread, dropping buffered records.
+        
+        Only for use once no writes are pending, e.g. at interpreter exit.
+        """
+        if self._buffered:
+            logger.warning(f"Dropped {self._buffered} buffered bytes for {self.filename}")
+            self._chunks = []
+            self._buffered = 0
+        self._close_file()
+    
+    def _raise_error(self) -> None:
+        """
+        Raise the first error of the writes finished since the last call.
+        """
+        self._reap()
+        if self._error is not None:
+            error, self._error = self._error, None
+            raise error
+    
+    async def _buffered_more(self) -> None:
+        """
+        Flush a full buffer, or make sure a partial one is flushed in time.
+        """
+        if self._buffered >= self.flush_bytes:
+            await self.flush()
+        elif self._timer is None and self.flush_interval:
+            loop = asyncio.get_running_loop()
+            self._timer = loop.call_later(self.flush_interval, self._flush_later)
+    
+    def _flush_later(self) -> None:
+        """
+        Timer callback handing off records that waited flush_interval.
+        """
+        self._timer = None
+        self._hand_off()
+    
+    def _hand_off(self) -> None:
+        """
+        Queue the buffered records on the writer thread.
+        """
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self._chunks:
+            return
+        
+        chunk = b"".join(self._chunks)
+        self._chunks = []
+        self._buffered = 0
+        
+        filename = self._next_filename(len(chunk))
+        self._file_bytes += len(chunk)
+        self._submit(self._write_chunk, chunk, filename)
+    
+    def _next_filename(self, size: int) -> Optional[str]:
+        """
+        Return the name of a new file to start before writing size bytes,
+        or None to keep writing to the current one.
+        """
+        now = time.monotonic()
+        date = None
+        if self._dated:
+            t = self.clock.now() if self.clock is not None else time.time()
+            date = time.strftime("%Y-%m-%d", time.localtime(t))
+        
+        rotate = (
+            self.filename is None
+            or (self._dated and date != self._date)
+            or (self.rotate_bytes and self._file_bytes and self._file_bytes + size > self.rotate_bytes)
+            or (self.rotate_interval and now - self._opened_at >= self.rotate_interval)
+        )
+        if not rotate:
+            return None
+        
+        if self.filename is not None and "{seq}" in self.template:
+            self.seq += 1
+        self._date = date
+        self._file_bytes = 0
+        self._opened_at = now
+        self.filename = self.template.format(date=date, seq=self.seq)
+        return self.filename
+    
+    def _submit(self, func: Any, *args: Any) -> None:
+        """
+        Queue a call on the writer thread, first dropping finished calls.
+        """
+        self._reap()
+        loop = asyncio.get_running_loop()
+        self._pending.append(loop.run_in_executor(self.executor, func, *args))
+    
+    def _reap(self) -> None:
+        """
+        Drop the finished writes at the front of the queue, keeping their errors.
+        
+        Calls of one writer run in order, so finished writes are always at the front.
+        """
+        pending = self._pending
+        while pending and pending[0].done():
+            future = pending.popleft()
+            if not future.cancelled() and future.exception() is not None:
+                self._failed(future.exception())
+    
+    async def _wait_oldest(self) -> None:
+        """
+        Wait for the oldest pending write, keeping its failure.
+        """
+        try:
+            await self._pending.popleft()
+        except Exception as e:
+            self._failed(e)
+    
+    def _failed(self, error: Exception) -> None:
+        """
+        Log a failed write and keep the first error for the next write call.
+        """
+        logger.error(f"Error writing to file {self.filename}: {error}")
+        if self._error is None:
+            self._error = error
+    
+    def _write_chunk(self, chunk: bytes, filename: Optional[str]) -> None:
+        """
+        Write a chunk on the writer thread, starting a new file first if asked.
+        """
+        if filename is not None:
+            self._close_file()
+            self._open(filename)
+        self._file.write(chunk)
+    
+    def _open(self, filename: str) -> None:
+        """
+        Open a file, starting it with the header if it is empty.
+        """
+        # Compressed files are not empty once opened, so check before
+        empty = not self.append or not os.path.exists(filename) or os.path.getsize(filename) == 0
+        self._file = open_output_file(filename, self.append, self.compression, self.compression_level)
+        if self.header is not None and empty:
+            self._file.write(self.header)
+        logger.info(f"Opened file for output: {filename}")
+    
+    def _close_file(self) -> None:
+        """
+        Close the current file on the writer thread.
+        """
+        if self._file is not None:
+            file, self._file = self._file, None
+            file.close()
+            logger.info(f"Closed file: {self.filename}")
+
 class FileConnector:
     """
     Output connector that writes to a file.
+    
+    Records are buffered and written on a dedicated writer thread; see
+    BufferedFileWriter for the flush, rotation and compression options. A
+    `header` line in the configuration starts every empty file.
     """
     
-    def __init__(self, config: Dict[str, Any]):
+    # Takes the stream clock, which dates {date} files
+    clocked = True
+    
+    def __init__(self, config: Dict[str, Any], clock: Optional[Any] = None):
         """
         Initialize the file connector.
+        
+        Args:
+            config: Output configuration
+            clock: The stream's clock, e.g. a simulation clock backfilling past days
         """
         self.config = config
         self.filename = config.get("filename", "output.txt")
         self.append = config.get("append", True)
-        self.file_handle = None
-        
-        # Create directory if it doesn't exist
-        directory = os.path.dirname(self.filename)
-        if directory and not os.path.exists(directory):
-            os.makedirs(directory)
-        
-        # Open the file
-        mode = "a" if self.append else "w"
-        self.file_handle = open(self.filename, mode, encoding="utf-8")
-        
-        logger.info(f"Opened file for output: {self.filename}")
+        header = config.get("header")
+        self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix="file-writer")
+        self.writer = BufferedFileWriter(
+            self.filename,
+            self.executor,
+            append=self.append,
+            compression=config.get("compression"),
+            compression_level=config.get("compression_level"),
+            flush_bytes=config.get("flush_bytes", DEFAULT_FLUSH_BYTES),
+            flush_interval=config.get("flush_interval", DEFAULT_FLUSH_INTERVAL),
+            rotate_bytes=config.get("rotate_bytes"),
+            rotate_interval=config.get("rotate_interval"),
+            header=(header + "\n").encode("utf-8") if header is not None else None,
+            clock=clock
+        )
+        try:
+            self.writer.open()
+        except Exception:
+            self.executor.shutdown(wait=False)
+            raise
+        self._closed = False
     
-    async def send(self, data: str) -> None:
+    async def send(self, data: bytes) -> None:
         """
         Write data to the file.
+        
+        Raises:
+            OSError: If an earlier write to the file failed
+        """
+        await self.writer.write(data)
+    
+    async def send_batch(self, batch: List[bytes]) -> None:
+        """
+        Write several records to the file.
+        """
+        await self.writer.write_many(batch)
+    
+    async def close(self) -> None:
+        """
+        Write the remaining records, close the file and stop the writer thread.
         """
-        if self.file_handle is None:
-            logger.error("File handle is closed")
+        if self._closed:
             return
         
+        self._closed = True
         try:
-            # Write the data
-            self.file_handle.write(data + "\n")
-            self.file_handle.flush()
+            await self.writer.close()
         except Exception as e:
-            logger.error(f"Error writing to file: {e}")
+            logger.error(f"Error closing file: {e}")
+        self.executor.shutdown(wait=False)
     
     def __del__(self):
         """
-        Close the file when the connector is destroyed.
+        Close the file when the connector is destroyed without close().
         """
-        if self.file_handle is not None:
+        if not getattr(self, "_closed", True):
             try:
-                self.file_handle.close()
-                logger.info(f"Closed file: {self.filename}")
+                self.writer.close_now()
             except Exception as e:
                 logger.error(f"Error closing file: {e}")
-            
-            self.file_handle = None
+            self.executor.shutdown(wait=False)
@@ -1,81 +1,243 @@
+import gzip
 import logging
 import asyncio
-import aiohttp
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional
+
+from ..stats import ConnectorStats
 
 logger = logging.getLogger(__name__)
 
+# Ways of framing several records in one request body
+FRAMINGS = ("ndjson", "json_array")
+
+# Upper bound on the delay between retries, in seconds
+MAX_BACKOFF = 30.0
+
+# Bodies at least this large are compressed off the event loop
+_EXECUTOR_COMPRESS_SIZE = 64 * 1024
+
 class HttpConnector:
     """
     Output connector that sends data to an HTTP endpoint.
+    
+    Records are collected into batches of batch_size, sent as soon as a batch
+    is full or linger_ms after its first record, with up to `concurrency`
+    requests in flight. Requests answered with 429 or 5xx, and requests that
+    fail to connect, are retried with exponential backoff. Records count as
+    delivered in `stats` once their request succeeds, and as errors once it
+    has finally failed.
     """
     
-    def __init__(self, config: Dict[str, Any]):
+    acknowledged = True
+    
+    def __init__(self, config: Dict[str, Any], session: Optional[Any] = None):
         """
         Initialize the HTTP connector.
         
         Args:
             config: Output configuration
+            session: Session to use instead of an aiohttp session built from
+                the configuration, e.g. a stand-in for tests
         """
         self.config = config
         self.url = config.get("url", "http://localhost:8000")
         self.method = config.get("method", "POST").upper()
-        self.headers = config.get("headers", {"Content-Type": "application/json"})
-        self.session = None
+        self.batch_size = config.get("batch_size", 1)
+        self.linger = config.get("linger_ms", 0) / 1000.0
+        self.framing = config.get("framing", "ndjson")
+        self.compression = config.get("compression")
+        self.compression_level = config.get("compression_level", 6)
+        self.pool_limit = config.get("pool_limit", 100)
+        self.concurrency = config.get("concurrency", 1)
+        self.max_retries = config.get("max_retries", 3)
+        self.backoff = config.get("backoff_ms", 100) / 1000.0
+        self.timeout = config.get("timeout", 30.0)
+        
+        if self.framing not in FRAMINGS:
+            raise ValueError(f"HTTP framing must be one of: {', '.join(FRAMINGS)}")
+        if self.compression not in (None, "gzip"):
+            raise ValueError(f"Unsupported HTTP compression: {self.compression}")
+        if self.method == "GET" and self.batch_size != 1:
+            raise ValueError("HTTP GET outputs cannot batch records")
+        if self.method == "GET" and self.compression is not None:
+            raise ValueError("HTTP GET outputs send records in the query string and cannot compress them")
+        
+        default_type = "application/x-ndjson" if self.batch_size > 1 and self.framing == "ndjson" else "application/json"
+        self.headers = config.get("headers", {"Content-Type": default_type})
+        if self.compression == "gzip":
+            self.headers = dict(self.headers, **{"Content-Encoding": "gzip"})
         
-        # Create aiohttp session
-        self._create_session()
+        self.session = session
+        self.stats = ConnectorStats()
+        self._buffer = []
+        self._window = None
+        self._requests = set()
+        self._linger_handle = None
     
-    def _create_session(self) -> None:
+    async def _get_session(self) -> Any:
         """
-        Create aiohttp session.
+        Return the aiohttp session, creating it on the running loop.
         """
-        try:
-            self.session = aiohttp.ClientSession(headers=self.headers)
+        if self._window is None:
+            self._window = asyncio.Semaphore(self.concurrency)
+        if self.session is None:
+            import aiohttp
+            
+            connector = aiohttp.TCPConnector(limit=self.pool_limit)
+            timeout = aiohttp.ClientTimeout(total=self.timeout)
+            self.session = aiohttp.ClientSession(headers=self.headers, connector=connector, timeout=timeout)
             logger.info(f"Created HTTP session for endpoint: {self.url}")
-        except Exception as e:
-            logger.error(f"Error creating HTTP session: {e}")
+        return self.session
     
-    async def send(self, data: str) -> None:
+    async def send(self, data: bytes) -> None:
         """
-        Send data to HTTP endpoint.
+        Send data to the HTTP endpoint as part of the current batch.
         
         Args:
             data: Formatted data to send
         """
+        await self.send_batch([data])
+    
+    async def send_batch(self, batch: List[bytes]) -> None:
+        """
+        Add records to the current batch, sending every batch that fills up.
+        
+        Waits while `concurrency` requests are already in flight.
+        """
+        try:
+            await self._get_session()
+        except ImportError:
+            self.stats.errors += len(batch)
+            logger.error("aiohttp not installed. Install with: pip install aiohttp")
+            return
+        
+        self._buffer.extend(batch)
+        while len(self._buffer) >= self.batch_size:
+            await self._dispatch()
+        
+        if self._buffer and self._linger_handle is None:
+            if self.linger > 0:
+                loop = asyncio.get_running_loop()
+                self._linger_handle = loop.call_later(self.linger, self._linger_expired)
+            else:
+                await self._dispatch()
+    
+    async def close(self) -> None:
+        """
+        Send the last partial batch, wait for requests in flight and close
+        the aiohttp session.
+        """
         if self.session is None:
-            logger.error("HTTP session not initialized")
             return
         
+        if self._buffer:
+            await self._dispatch()
+        # A dispatch waiting for the window adds its request while others finish
+        while self._requests:
+            await asyncio.gather(*list(self._requests), return_exceptions=True)
+        
         try:
-            # Send the request
-            if self.method == "GET":
-                async with self.session.get(self.url, params={"data": data}) as response:
-                    await response.text()
-            else:  # Default to POST
-                async with self.session.post(self.url, data=data) as response:
-                    await response.text()
-            
-            logger.debug(f"Sent HTTP {self.method} request to {self.url}")
+            await self.session.close()
+            logger.info(f"Closed HTTP session ({self.stats.records} records sent, {self.stats.errors} failed)")
         except Exception as e:
-            logger.error(f"Error sending HTTP request: {e}")
+            logger.error(f"Error closing HTTP session: {e}")
+        
+        self.session = None
     
-    async def close(self) -> None:
+    def _linger_expired(self) -> None:
         """
-        Close the aiohttp session.
+        Send the current batch once it has waited linger_ms.
         """
-        if self.session is not None:
-            try:
-                await self.session.close()
-                logger.info("Closed HTTP session")
-            except Exception as e:
-                logger.error(f"Error closing HTTP session: {e}")
+        self._linger_handle = None
+        if self._buffer:
+            self._track(asyncio.ensure_future(self._dispatch()))
+    
+    async def _dispatch(self) -> None:
+        """
+        Start a request for the next batch once the concurrency window allows.
+        """
+        if self._linger_handle is not None:
+            self._linger_handle.cancel()
+            self._linger_handle = None
+        
+        batch = self._buffer[:self.batch_size]
+        del self._buffer[:self.batch_size]
+        if not batch:
+            return
+        
+        await self._window.acquire()
+        self._track(asyncio.ensure_future(self._request(batch)))
+    
+    def _track(self, task: asyncio.Future) -> None:
+        """
+        Keep a reference to a background task until it is done.
+        """
+        self._requests.add(task)
+        task.add_done_callback(self._requests.discard)
+    
+    def _frame(self, batch: List[bytes]) -> bytes:
+        """
+        Build a request body from a batch of records.
+        """
+        if self.batch_size == 1:
+            return batch[0]
+        if self.framing == "json_array":
+            return b"[" + b",".join(batch) + b"]"
+        return b"\n".join(batch) + b"\n"
+    
+    async def _request(self, batch: List[bytes]) -> None:
+        """
+        Send one batch, retrying on 429, 5xx and connection errors.
+        """
+        try:
+            body = self._frame(batch)
+            if self.compression == "gzip":
+                if len(body) >= _EXECUTOR_COMPRESS_SIZE:
+                    loop = asyncio.get_running_loop()
+                    body = await loop.run_in_executor(None, gzip.compress, body, self.compression_level)
+                else:
+                    body = gzip.compress(body, self.compression_level)
+            
+            for attempt in range(self.max_retries + 1):
+                delay = self.backoff * 2 ** attempt
+                try:
+                    if self.method == "GET":
+                        request = self.session.get(self.url, params={"data": body.decode("utf-8")})
+                    else:
+                        request = self.session.request(self.method, self.url, data=body)
+                    
+                    async with request as response:
+                        await response.read()
+                        if response.status < 400:
+                            self.stats.records += len(batch)
+                            self.stats.bytes += sum(map(len, batch))
+                            logger.debug(f"Sent HTTP {self.method} request with {len(batch)} records to {self.url}")
+                            return
+                        if response.status != 429 and response.status < 500:
+                            logger.error(f"HTTP {self.method} to {self.url} rejected with status {response.status}")
+                            break
+                        
+                        error = f"status {response.status}"
+                        retry_after = response.headers.get("Retry-After")
+                        if retry_after is not None and retry_after.isdigit():
+                            delay = float(retry_after)
+                except Exception as e:
+                    error = str(e) or type(e).__name__
+                
+                if attempt < self.max_retries:
+                    logger.debug(f"Retrying HTTP {self.method} to {self.url} after {error}")
+                    await asyncio.sleep(min(delay, MAX_BACKOFF))
+                else:
+                    logger.error(f"Error sending HTTP request after {attempt + 1} attempts: {error}")
             
-            self.session = None
+            self.stats.errors += len(batch)
+        finally:
+            self._window.release()
     
     def __del__(self):
         """
         Ensure the session is closed when the connector is destroyed.
         """
-        if self.session is not None and not self.session.closed:
-            logger.warning("HTTP session was not properly closed")
\ No newline at end of file
+        session = getattr(self, "session", None)
+        if session is not None and not session.closed:
+            logger.warning("HTTP session was not properly closed")
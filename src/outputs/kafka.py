@@ -1,25 +1,58 @@
 import logging
 import asyncio
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional
+
+from ..stats import ConnectorStats
 
 logger = logging.getLogger(__name__)
 
+# Default number of messages handed to the producer but not yet acknowledged
+DEFAULT_MAX_OUTSTANDING = 10000
+
+# Producer settings configurable directly on the output, with their defaults
+PRODUCER_SETTINGS = {
+    "linger_ms": ("linger_ms", 5),
+    "batch_size": ("batch_size", 64 * 1024),
+    "compression": ("compression_type", None),
+    "max_in_flight": ("max_in_flight_requests_per_connection", 5),
+    "acks": ("acks", 1),
+}
+
 class KafkaConnector:
     """
     Output connector that sends to a Kafka topic.
+    
+    Messages are handed to the producer without waiting for them: delivery
+    results arrive through callbacks, and a window of at most max_outstanding
+    unacknowledged messages applies backpressure once the broker falls behind.
+    Messages count as delivered or failed in `stats` as their results arrive.
     """
     
-    def __init__(self, config: Dict[str, Any]):
+    acknowledged = True
+    
+    def __init__(self, config: Dict[str, Any], producer: Optional[Any] = None):
         """
         Initialize the Kafka connector.
+        
+        Args:
+            config: Output configuration
+            producer: Producer to use instead of a KafkaProducer built from
+                the configuration, e.g. a stand-in for tests
         """
         self.config = config
-        self.producer = None
+        self.producer = producer
         self.topic = config.get("topic", "data-stream")
         self.bootstrap_servers = config.get("bootstrap_servers", "localhost:9092")
+        self.key_field = config.get("key_field")
+        self.keyed = self.key_field is not None
+        self.max_outstanding = config.get("max_outstanding", DEFAULT_MAX_OUTSTANDING)
+        self.stats = ConnectorStats()
+        self._window = None
+        self._loop = None
         
         # Lazy initialization of Kafka producer
-        self._initialize_producer()
+        if self.producer is None:
+            self._initialize_producer()
     
     def _initialize_producer(self) -> None:
         """
@@ -28,10 +61,15 @@ class KafkaConnector:
         try:
             from kafka import KafkaProducer
             
-            self.producer = KafkaProducer(
-                bootstrap_servers=self.bootstrap_servers,
-                value_serializer=lambda x: x.encode("utf-8")
-            )
+            # Records arrive already encoded, so no value_serializer is needed
+            settings = {"bootstrap_servers": self.bootstrap_servers}
+            for key, (setting, default) in PRODUCER_SETTINGS.items():
+                value = self.config.get(key, default)
+                if value is not None:
+                    settings[setting] = value
+            settings.update(self.config.get("producer_config", {}))
+            
+            self.producer = KafkaProducer(**settings)
             
             logger.info(f"Connected to Kafka bootstrap servers: {self.bootstrap_servers}")
         except ImportError:
@@ -39,25 +77,114 @@ class KafkaConnector:
         except Exception as e:
             logger.error(f"Error connecting to Kafka: {e}")
     
-    async def send(self, data: str) -> None:
+    def route(self, record: Dict[str, Any]) -> Optional[bytes]:
+        """
+        Return the message key for a record, taken from key_field.
+        """
+        value = record.get(self.key_field)
+        if value is None:
+            return None
+        return str(value).encode("utf-8")
+    
+    async def send(self, data: bytes, key: Optional[bytes] = None) -> None:
         """
-        Send data to Kafka topic.
+        Send data to the Kafka topic, waiting only while the window is full.
+        
+        Args:
+            data: Formatted data to send
+            key: Optional message key used for partitioning
         """
         if self.producer is None:
+            self.stats.errors += 1
             logger.error("Kafka producer not initialized")
             return
         
+        window = self._get_window()
+        await window.acquire()
         try:
-            # Send the data asynchronously
-            future = self.producer.send(self.topic, data)
-            
-            # Handle the result
-            loop = asyncio.get_event_loop()
-            await loop.run_in_executor(None, future.get, 10)  # 10 second timeout
-            
-            logger.debug(f"Sent message to Kafka topic: {self.topic}")
+            future = self.producer.send(self.topic, value=data, key=key)
         except Exception as e:
+            window.release()
+            self.stats.errors += 1
             logger.error(f"Error sending to Kafka: {e}")
+            return
+        
+        future.add_callback(self._on_delivery, len(data))
+        future.add_errback(self._on_error)
+    
+    async def send_batch(self, batch: List[bytes], keys: Optional[List[Optional[bytes]]] = None) -> None:
+        """
+        Send several records to the Kafka topic.
+        """
+        if keys is None:
+            for data in batch:
+                await self.send(data)
+        else:
+            for data, key in zip(batch, keys):
+                await self.send(data, key)
+    
+    async def close(self) -> None:
+        """
+        Wait for outstanding messages, then close the producer.
+        """
+        if self.producer is None:
+            return
+        
+        producer = self.producer
+        self.producer = None
+        loop = asyncio.get_running_loop()
+        try:
+            await loop.run_in_executor(None, producer.flush)
+            await loop.run_in_executor(None, producer.close)
+            logger.info(f"Closed Kafka producer ({self.stats.records} delivered, {self.stats.errors} failed)")
+        except Exception as e:
+            logger.error(f"Error closing Kafka producer: {e}")
+    
+    def _get_window(self) -> asyncio.Semaphore:
+        """
+        Return the outstanding-message window, created on the running loop.
+        """
+        if self._window is None:
+            self._loop = asyncio.get_running_loop()
+            self._window = asyncio.Semaphore(self.max_outstanding)
+        return self._window
+    
+    def _on_delivery(self, size: int, metadata: Any) -> None:
+        """
+        Delivery callback for a message of size bytes, called on the producer's I/O thread.
+        """
+        self._notify(None, size)
+    
+    def _on_error(self, error: Exception) -> None:
+        """
+        Delivery error callback, called on the producer's I/O thread.
+        """
+        self._notify(error, 0)
+    
+    def _notify(self, error: Optional[Exception], size: int) -> None:
+        """
+        Hand a delivery result over to the event loop.
+        """
+        try:
+            self._loop.call_soon_threadsafe(self._settle, error, size)
+        except RuntimeError:
+            # The loop is gone; the result can no longer be counted
+            pass
+    
+    def _settle(self, error: Optional[Exception], size: int) -> None:
+        """
+        Count a delivery result on the event loop and free its window slot.
+        """
+        self._window.release()
+        stats = self.stats
+        if error is None:
+            stats.records += 1
+            stats.bytes += size
+            return
+        
+        stats.errors += 1
+        if stats.errors == 1:
+            logger.error(f"Error delivering to Kafka topic {self.topic}: {error}")
     
     def __del__(self):
         """
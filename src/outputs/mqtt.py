@@ -1,31 +1,60 @@
 import logging
 import asyncio
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional
+
+from ..stats import ConnectorStats
 
 logger = logging.getLogger(__name__)
 
+# Default number of QoS 1/2 messages published but not yet acknowledged
+DEFAULT_MAX_INFLIGHT = 1000
+
+# paho's MQTT_ERR_NO_CONN return code
+_ERR_NO_CONN = 4
+
 class MqttConnector:
     """
     Output connector that publishes to an MQTT topic.
+    
+    paho's network loop runs on its own thread, so publishes are issued
+    directly from the event loop. For QoS 1 and 2 every message takes a slot
+    in a window of max_inflight messages until its on_publish callback
+    resolves the matching future. While the broker is unreachable sending
+    waits for paho to reconnect, leaving records buffered in the output queue.
+    Messages count as delivered in `stats` once published (QoS 0) or
+    acknowledged (QoS 1 and 2).
     """
     
-    def __init__(self, config: Dict[str, Any]):
+    acknowledged = True
+    
+    def __init__(self, config: Dict[str, Any], client: Optional[Any] = None):
         """
         Initialize the MQTT connector.
         
         Args:
             config: Output configuration
+            client: Client to use instead of a paho client built from the
+                configuration, e.g. a stand-in for tests
         """
         self.config = config
-        self.client = None
+        self.client = client
         self.topic = config.get("topic", "data-stream")
         self.broker = config.get("broker", "localhost")
         self.port = config.get("port", 1883)
         self.client_id = config.get("client_id", "data-simulator")
         self.qos = config.get("qos", 0)
+        self.max_inflight = config.get("max_inflight", DEFAULT_MAX_INFLIGHT)
+        self.stats = ConnectorStats()
+        self._loop = None
+        self._window = None
+        self._connected = None
+        self._pending = {}
         
         # Lazy initialization of MQTT client
-        self._initialize_client()
+        if self.client is None:
+            self._initialize_client()
+        if self.client is not None:
+            self._attach_callbacks()
     
     def _initialize_client(self) -> None:
         """
@@ -34,8 +63,11 @@ class MqttConnector:
         try:
             import paho.mqtt.client as mqtt
             
-            # Create client
-            self.client = mqtt.Client(client_id=self.client_id)
+            # Create client, with the current callback API where available
+            if hasattr(mqtt, "CallbackAPIVersion"):
+                self.client = mqtt.Client(mqtt.CallbackAPIVersion.VERSION2, client_id=self.client_id)
+            else:
+                self.client = mqtt.Client(client_id=self.client_id)
             
             # Set username and password if provided
             if "username" in self.config and "password" in self.config:
@@ -44,43 +76,190 @@ class MqttConnector:
                     self.config["password"]
                 )
             
-            # Connect to broker
-            self.client.connect(self.broker, self.port)
-            
-            # Start the loop in a separate thread
-            self.client.loop_start()
-            
-            logger.info(f"Connected to MQTT broker: {self.broker}:{self.port}")
+            self.client.max_inflight_messages_set(self.max_inflight)
+            self.client.reconnect_delay_set(
+                self.config.get("reconnect_min_delay", 1),
+                self.config.get("reconnect_max_delay", 30)
+            )
         except ImportError:
             logger.warning("Paho MQTT not installed. Install with: pip install paho-mqtt")
         except Exception as e:
-            logger.error(f"Error connecting to MQTT broker: {e}")
+            logger.error(f"Error creating MQTT client: {e}")
+    
+    def _attach_callbacks(self) -> None:
+        """
+        Route the client's callbacks to the event loop.
+        """
+        self.client.on_connect = self._on_connect
+        self.client.on_disconnect = self._on_disconnect
+        self.client.on_publish = self._on_publish
+    
+    async def _start(self) -> None:
+        """
+        Connect on the running loop; paho keeps reconnecting on its own thread.
+        """
+        self._loop = asyncio.get_running_loop()
+        self._window = asyncio.Semaphore(self.max_inflight)
+        self._connected = asyncio.Event()
+        
+        # Connect in the background so a missing broker does not block startup
+        self.client.connect_async(self.broker, self.port)
+        self.client.loop_start()
     
-    async def send(self, data: str) -> None:
+    async def send(self, data: bytes) -> None:
         """
-        Publish data to MQTT topic.
+        Publish data to the MQTT topic.
         
         Args:
             data: Formatted data to publish
         """
+        await self.send_batch([data])
+    
+    async def send_batch(self, batch: List[bytes]) -> None:
+        """
+        Publish several records to the MQTT topic.
+        
+        Args:
+            batch: Formatted records to publish
+        """
         if self.client is None:
+            self.stats.errors += len(batch)
             logger.error("MQTT client not initialized")
             return
         
-        try:
-            # Run the publish in the default executor
-            loop = asyncio.get_event_loop()
-            await loop.run_in_executor(
-                None,
-                self.client.publish,
-                self.topic,
-                data,
-                self.qos
-            )
+        if self._loop is None:
+            await self._start()
+        
+        for data in batch:
+            try:
+                await self.publish(data)
+            except RuntimeError as e:
+                self.stats.errors += 1
+                if self.stats.errors == 1:
+                    logger.error(f"Error publishing to MQTT topic {self.topic}: {e}")
+    
+    async def publish(self, data: bytes) -> asyncio.Future:
+        """
+        Publish one record once connected and a window slot is free.
+        
+        Returns:
+            Future resolved when the broker acknowledges the message;
+            already resolved for QoS 0
+        """
+        while True:
+            if not self._connected.is_set():
+                await self._connected.wait()
+            
+            if self.qos > 0:
+                await self._window.acquire()
             
-            logger.debug(f"Published message to MQTT topic: {self.topic}")
+            info = self.client.publish(self.topic, data, self.qos)
+            if info.rc == 0:
+                break
+            if self.qos > 0 and info.rc == _ERR_NO_CONN:
+                # paho keeps QoS 1/2 messages and sends them after reconnecting
+                self._connected.clear()
+                break
+            
+            if self.qos > 0:
+                self._window.release()
+            if info.rc != _ERR_NO_CONN:
+                raise RuntimeError(f"MQTT publish failed with code {info.rc}")
+            
+            # A QoS 0 message is lost without a connection: wait and publish it again
+            self._connected.clear()
+            logger.debug("MQTT connection lost, waiting for reconnect")
+        
+        future = self._loop.create_future()
+        if self.qos == 0:
+            self.stats.records += 1
+            self.stats.bytes += len(data)
+            future.set_result(info.mid)
+        else:
+            self._pending[info.mid] = (future, len(data))
+        
+        return future
+    
+    async def close(self) -> None:
+        """
+        Wait for unacknowledged messages, then disconnect from the broker.
+        """
+        if self.client is None:
+            return
+        
+        client = self.client
+        self.client = None
+        if self._pending:
+            try:
+                await asyncio.wait_for(
+                    asyncio.gather(*[future for future, _ in self._pending.values()], return_exceptions=True),
+                    self.config.get("close_timeout", 10.0)
+                )
+            except asyncio.TimeoutError:
+                self.stats.errors += len(self._pending)
+                logger.warning(f"{len(self._pending)} MQTT messages were not acknowledged")
+        
+        try:
+            client.disconnect()
+            client.loop_stop()
+            logger.info(f"Disconnected from MQTT broker ({self.stats.records} messages delivered)")
         except Exception as e:
-            logger.error(f"Error publishing to MQTT: {e}")
+            logger.error(f"Error disconnecting from MQTT broker: {e}")
+    
+    def _call_soon(self, callback: Any, *args: Any) -> None:
+        """
+        Run a callback on the event loop from paho's network thread.
+        """
+        if self._loop is None:
+            return
+        try:
+            self._loop.call_soon_threadsafe(callback, *args)
+        except RuntimeError:
+            # The loop is gone; nothing is waiting any more
+            pass
+    
+    def _on_connect(self, client: Any, userdata: Any, flags: Any, reason_code: Any, *args: Any) -> None:
+        """
+        Connection callback; reason_code is an int in paho 1 and a ReasonCode in paho 2.
+        """
+        if getattr(reason_code, "is_failure", reason_code != 0):
+            logger.error(f"MQTT broker {self.broker}:{self.port} refused connection: {reason_code}")
+            return
+        
+        logger.info(f"Connected to MQTT broker: {self.broker}:{self.port}")
+        self._call_soon(self._connected.set)
+    
+    def _on_disconnect(self, client: Any, userdata: Any, *args: Any) -> None:
+        """
+        Disconnection callback; paho reconnects on its own.
+        """
+        if self.client is not None:
+            logger.warning(f"Disconnected from MQTT broker {self.broker}:{self.port}, reconnecting")
+        self._call_soon(self._connected.clear)
+    
+    def _on_publish(self, client: Any, userdata: Any, mid: int, *args: Any) -> None:
+        """
+        Publish callback, called once the broker has acknowledged a message.
+        """
+        self._call_soon(self._acknowledge, mid)
+    
+    def _acknowledge(self, mid: int) -> None:
+        """
+        Resolve the future of an acknowledged message on the event loop.
+        """
+        if self.qos == 0:
+            return
+        
+        pending = self._pending.pop(mid, None)
+        if pending is None:
+            return
+        
+        future, size = pending
+        self._window.release()
+        self.stats.records += 1
+        self.stats.bytes += size
+        if not future.done():
+            future.set_result(mid)
     
     def __del__(self):
         """
@@ -92,4 +271,4 @@ class MqttConnector:
                 self.client.disconnect()
                 logger.info("Disconnected from MQTT broker")
             except Exception as e:
-                logger.error(f"Error disconnecting from MQTT broker: {e}")
\ No newline at end of file
+                logger.error(f"Error disconnecting from MQTT broker: {e}")
@@ -0,0 +1,275 @@
+"""
+File output that splits records into directories by field values and time.
+"""
+import time
+import string
+import logging
+import collections
+import concurrent.futures
+from typing import Dict, Any, List, Optional, Tuple
+
+from ..clock import parse_time
+from .file import BufferedFileWriter, DEFAULT_FLUSH_INTERVAL
+
+logger = logging.getLogger(__name__)
+
+# Default path template
+DEFAULT_PARTITION_PATH = "output/dt={date}/part-{seq}.txt"
+
+# Default number of partition files kept open at once
+DEFAULT_MAX_OPEN_FILES = 128
+
+# Default buffered bytes per partition that trigger a write
+DEFAULT_PARTITION_FLUSH_BYTES = 256 * 1024
+
+# Resolved paths cached before the cache is cleared
+PATH_CACHE_SIZE = 65536
+
+# Value used for a missing or empty partition field, as in Hive
+DEFAULT_PARTITION = "__HIVE_DEFAULT_PARTITION__"
+
+# Placeholders filled from the record's time, in UTC
+TIME_PARTS = {
+    "date": "%Y-%m-%d",
+    "year": "%Y",
+    "month": "%m",
+    "day": "%d",
+    "hour": "%H",
+}
+
+class PartitionedFileConnector:
+    """
+    Output connector that writes each record to a file chosen by its contents.
+    
+    The path template may reference record fields by name, the record's time
+    through {date}, {year}, {month}, {day} and {hour}, and {seq} for rotated
+    files, e.g. "output/dt={date}/device={device_id}/part-{seq}.json".
+    
+    Every partition has its own BufferedFileWriter, all of them sharing one
+    writer thread. At most max_open_files partitions stay open; the least
+    recently used one is flushed and closed to make room for another, and is
+    appended to if it is written again.
+    """
+    
+    def __init__(self, config: Dict[str, Any]):
+        """
+        Initialize the partitioned file connector.
+        
+        Raises:
+            ValueError: If the path template is invalid
+        """
+        self.config = config
+        self.path = config.get("path", DEFAULT_PARTITION_PATH)
+        self.time_field = config.get("time_field")
+        self.default_partition = config.get("default_partition", DEFAULT_PARTITION)
+        self.max_open_files = config.get("max_open_files", DEFAULT_MAX_OPEN_FILES)
+        self.append = config.get("append", True)
+        self.keyed = True
+        self.writer_options = {
+            "compression": config.get("compression"),
+            "compression_level": config.get("compression_level"),
+            "flush_bytes": config.get("flush_bytes", DEFAULT_PARTITION_FLUSH_BYTES),
+            "flush_interval": config.get("flush_interval", DEFAULT_FLUSH_INTERVAL),
+            "rotate_bytes": config.get("rotate_bytes"),
+            "rotate_interval": config.get("rotate_interval"),
+            "header": (config["header"] + "\n").encode("utf-8") if config.get("header") is not None else None,
+        }
+        self.parts = self._compile(self.path)
+        self.placeholders = [(kind == "time", name) for _, kind, name, _ in self.parts if kind != "literal"]
+        self.uses_time = any(is_time for is_time, _ in self.placeholders)
+        self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix="partition-writer")
+        self.writers = collections.OrderedDict()
+        self.opened = 0
+        self.evicted = 0
+        self._seqs = {}
+        self._paths = {}
+        self._closing = collections.deque()
+        self._time_bucket = None
+        self._time_values = None
+        self._warned = False
+    
+    def _compile(self, path: str) -> List[Tuple[str, str, Optional[str], str]]:
+        """
+        Split the path template into (literal, kind, name, format_spec) parts.
+        """
+        parts = []
+        try:
+            for literal, name, format_spec, _ in string.Formatter().parse(path):
+                literal = literal.replace("{", "{{").replace("}", "}}")
+                if name is None:
+                    parts.append((literal, "literal", None, ""))
+                elif name == "seq":
+                    parts.append((literal + "{seq}", "literal", None, ""))
+                elif not name:
+                    raise ValueError("placeholders must be named")
+                elif name in TIME_PARTS:
+                    parts.append((literal, "time", name, format_spec))
+                else:
+                    parts.append((literal, "field", name, format_spec))
+        except ValueError as e:
+            raise ValueError(f"Invalid partitioned_file path '{path}': {e}") from None
+        return parts
+    
+    def route(self, record: Dict[str, Any]) -> bytes:
+        """
+        Return the file template a record belongs to.
+        """
+        times = self._times(record) if self.uses_time else None
+        values = tuple([times[name] if is_time else record.get(name) for is_time, name in self.placeholders])
+        try:
+            path = self._paths.get(values)
+        except TypeError:
+            # Unhashable values are formatted every time
+            return self._format(values)
+        
+        if path is None:
+            if len(self._paths) >= PATH_CACHE_SIZE:
+                self._paths.clear()
+            path = self._paths[values] = self._format(values)
+        return path
+    
+    def _format(self, values: Tuple[Any, ...]) -> bytes:
+        """
+        Fill the path template with placeholder values.
+        """
+        pieces = []
+        values = iter(values)
+        for literal, kind, name, format_spec in self.parts:
+            pieces.append(literal)
+            if kind != "literal":
+                pieces.append(self._escape(next(values), format_spec))
+        return "".join(pieces).encode("utf-8")
+    
+    def _times(self, record: Dict[str, Any]) -> Dict[str, str]:
+        """
+        Return the time placeholders for a record, cached per hour.
+        """
+        if self.time_field is None:
+            t = time.time()
+        else:
+            try:
+                t = parse_time(record.get(self.time_field))
+            except ValueError:
+                if not self._warned:
+                    self._warned = True
+                    logger.warning(f"Field '{self.time_field}' is not a time, using {self.default_partition}")
+                return dict.fromkeys(TIME_PARTS, None)
+        
+        bucket = int(t // 3600)
+        if bucket != self._time_bucket:
+            utc = time.gmtime(bucket * 3600)
+            self._time_values = {name: time.strftime(fmt, utc) for name, fmt in TIME_PARTS.items()}
+            self._time_bucket = bucket
+        return self._time_values
+    
+    def _escape(self, value: Any, format_spec: str) -> str:
+        """
+        Turn a value into a single path component.
+        """
+        if value is None:
+            return self.default_partition
+        text = format(value, format_spec) if format_spec else str(value)
+        if text in ("", ".", ".."):
+            return self.default_partition
+        return text.replace("/", "%2F").replace("{", "{{").replace("}", "}}")
+    
+    async def send(self, data: bytes, key: bytes) -> None:
+        """
+        Write data to the partition given by key.
+        """
+        writer = await self._writer(key)
+        await writer.write(data)
+    
+    async def send_batch(self, batch: List[bytes], keys: List[bytes]) -> None:
+        """
+        Write several records, grouped by partition.
+        """
+        groups = {}
+        for data, key in zip(batch, keys):
+            group = groups.get(key)
+            if group is None:
+                groups[key] = [data]
+            else:
+                group.append(data)
+        
+        for key, group in groups.items():
+            writer = await self._writer(key)
+            await writer.write_many(group)
+    
+    async def _writer(self, key: bytes) -> BufferedFileWriter:
+        """
+        Return the open writer of a partition, evicting the least recently used.
+        """
+        writer = self.writers.get(key)
+        if writer is not None:
+            self.writers.move_to_end(key)
+            return writer
+        
+        while len(self.writers) >= self.max_open_files:
+            self._evict()
+        while len(self._closing) > self.max_open_files:
+            await self._closing.popleft().wait_closed()
+        
+        # Only the first file of a partition in this run truncates old data
+        seq = self._seqs.get(key)
+        writer = BufferedFileWriter(
+            key.decode("utf-8"),
+            self.executor,
+            append=self.append or seq is not None,
+            seq=seq or 0,
+            **self.writer_options
+        )
+        self.writers[key] = writer
+        self.opened += 1
+        return writer
+    
+    def _evict(self) -> None:
+        """
+        Start closing the least recently used partition.
+        
+        The writer thread runs calls in order, so reopening the partition
+        right away still appends after its last records.
+        """
+        self._begin_close(*self.writers.popitem(last=False))
+        self.evicted += 1
+    
+    def _begin_close(self, key: bytes, writer: BufferedFileWriter) -> None:
+        """
+        Start closing a partition's writer, remembering its file number.
+        
+        Appending partitions that never rotated reopen as they started, so
+        only the others are remembered; without append every partition is,
+        so reopening it cannot truncate what this run wrote.
+        """
+        if writer.seq or not self.append:
+            self._seqs[key] = writer.seq
+        else:
+            self._seqs.pop(key, None)
+        writer.begin_close()
+        self._closing.append(writer)
+    
+    async def close(self) -> None:
+        """
+        Flush and close every partition and stop the writer thread.
+        """
+        while self.writers:
+            self._begin_close(*self.writers.popitem(last=False))
+        while self._closing:
+            writer = self._closing.popleft()
+            try:
+                await writer.wait_closed()
+            except Exception as e:
+                logger.error(f"Error closing partition {writer.filename}: {e}")
+        
+        self.executor.shutdown(wait=False)
+        logger.info(f"Closed partitioned output {self.path} ({self.opened} partition files opened, {self.evicted} evictions)")
+    
+    def __del__(self):
+        """
+        Close open partitions when the connector is destroyed without close().
+        """
+        for writer in getattr(self, "writers", {}).values():
+            try:
+                writer.close_now()
+            except Exception as e:
+                logger.error(f"Error closing partition {writer.filename}: {e}")
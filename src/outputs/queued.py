@@ -0,0 +1,352 @@
+"""
+Bounded per-connector queues that decouple generation from slow outputs.
+"""
+import asyncio
+import logging
+import struct
+import tempfile
+from typing import Dict, Any, Callable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Default number of records buffered in memory per connector
+DEFAULT_QUEUE_SIZE = 10000
+
+# What to do with a record when a connector's queue is full
+OVERFLOW_POLICIES = ("block", "drop_oldest", "drop_newest", "spill")
+
+# Most queued records handed to a connector at once
+SEND_BATCH = 1000
+
+# Seconds to wait for queued records to be delivered on shutdown
+DRAIN_TIMEOUT = 10.0
+
+# Bytes of spilled records kept in memory before they are written to disk
+SPILL_BUFFER = 1 << 20
+
+_LENGTH = struct.Struct(">I")
+
+# Length written for a missing key in a keyed spill file
+_NO_KEY = 0xFFFFFFFF
+
+class SpillFile:
+    """
+    A FIFO of records on disk for output that does not fit in memory.
+    
+    Records are appended length-prefixed to an anonymous temporary file,
+    which is truncated whenever it has been read back completely. A keyed
+    spill file stores (data, key) pairs. Pushed records collect in memory
+    until SPILL_BUFFER bytes are waiting; the file is only written and read
+    in the default executor, one operation at a time, so the event loop never
+    waits on the disk.
+    """
+    
+    def __init__(self, directory: Optional[str] = None, keyed: bool = False):
+        """
+        Initialize the spill file.
+        
+        Args:
+            directory: Directory for the temporary file, defaults to the system one
+            keyed: Whether records are (data, key) pairs
+        """
+        self._file = tempfile.TemporaryFile(dir=directory)
+        self.keyed = keyed
+        self._read_pos = 0
+        self._write_pos = 0
+        self._on_disk = 0
+        self._tail = []
+        self._tail_bytes = 0
+        self._lock = asyncio.Lock()
+        self.pending = 0
+    
+    @property
+    def full(self) -> bool:
+        """Whether enough records wait in memory to be written out."""
+        return self._tail_bytes >= SPILL_BUFFER
+    
+    def push(self, item: Any) -> None:
+        """
+        Append a record, in memory until the next flush.
+        """
+        self._tail.append(item)
+        self._tail_bytes += len(item[0]) if self.keyed else len(item)
+        self.pending += 1
+    
+    async def flush(self) -> None:
+        """
+        Write the records waiting in memory to the file.
+        """
+        async with self._lock:
+            if not self._tail:
+                return
+            items = self._tail
+            self._tail = []
+            self._tail_bytes = 0
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(None, self._write, items)
+            self._on_disk += len(items)
+    
+    async def pop_batch(self, limit: int) -> List[Any]:
+        """
+        Remove and return up to limit of the oldest records.
+        """
+        async with self._lock:
+            if not self._on_disk:
+                # Nothing was written out, so the oldest records are in memory
+                items = self._tail[:limit]
+                del self._tail[:limit]
+                self._tail_bytes -= sum(len(item[0]) if self.keyed else len(item) for item in items)
+            else:
+                count = min(limit, self._on_disk)
+                loop = asyncio.get_running_loop()
+                items = await loop.run_in_executor(None, self._read, count, count == self._on_disk)
+                self._on_disk -= count
+            self.pending -= len(items)
+            return items
+    
+    def _write(self, items: List[Any]) -> None:
+        """
+        Append records to the file; runs in the executor.
+        """
+        chunks = []
+        for item in items:
+            if self.keyed:
+                data, key = item
+                chunks.append(_LENGTH.pack(_NO_KEY if key is None else len(key)))
+                if key is not None:
+                    chunks.append(key)
+            else:
+                data = item
+            chunks.append(_LENGTH.pack(len(data)))
+            chunks.append(data)
+        self._file.seek(self._write_pos)
+        self._file.write(b"".join(chunks))
+        self._write_pos = self._file.tell()
+    
+    def _read(self, count: int, rewind: bool) -> List[Any]:
+        """
+        Read the oldest count records; runs in the executor.
+        
+        Args:
+            count: Number of records to read
+            rewind: Whether these are the last records, so the file can be truncated
+        """
+        self._file.seek(self._read_pos)
+        items = []
+        for _ in range(count):
+            if self.keyed:
+                (length,) = _LENGTH.unpack(self._file.read(_LENGTH.size))
+                key = None if length == _NO_KEY else self._file.read(length)
+            (length,) = _LENGTH.unpack(self._file.read(_LENGTH.size))
+            data = self._file.read(length)
+            items.append((data, key) if self.keyed else data)
+        self._read_pos = self._file.tell()
+        
+        if rewind:
+            self._file.seek(0)
+            self._file.truncate()
+            self._read_pos = self._write_pos = 0
+        
+        return items
+    
+    def close(self) -> None:
+        """
+        Close and delete the file.
+        """
+        self._file.close()
+
+class QueuedOutput:
+    """
+    Feeds an output connector from its own bounded queue and consumer task.
+    
+    Generation only enqueues records, so a slow connector delays nothing but
+    itself. When the queue is full the overflow policy decides: block waits
+    for space, drop_oldest and drop_newest discard a record, and spill writes
+    it to a temporary file that is read back once the queue has drained.
+    
+    Connectors with a `keyed` attribute set also get a key for every record
+    from their route(record) method, passed on as send(data, key) and
+    send_batch(batch, keys). Connectors with a `columnar` attribute set are
+    fed ColumnarBatch items instead of encoded records; those count as their
+    number of rows and cannot spill. Connectors with an `acknowledged`
+    attribute set deliver in the background: they get the ConnectorStats as
+    their `stats` attribute and count records delivered or failed themselves
+    once the results arrive.
+    """
+    
+    def __init__(self, connector: Any, stats: Any, label: str):
+        """
+        Initialize the queue.
+        
+        Args:
+            connector: The output connector to feed
+            stats: ConnectorStats updated as records are delivered or dropped
+            label: Name of the connector in log messages
+        """
+        config = connector.config
+        self.connector = connector
+        self.stats = stats
+        self.label = label
+        self.overflow = config.get("overflow", "block")
+        self.keyed = getattr(connector, "keyed", False)
+        self.columnar = getattr(connector, "columnar", False)
+        self.acknowledged = getattr(connector, "acknowledged", False)
+        if self.acknowledged:
+            connector.stats = stats
+        if self.columnar and self.overflow == "spill":
+            raise ValueError(f"Output {label} writes column batches, which cannot spill")
+        self.queue = asyncio.Queue(config.get("queue_size", DEFAULT_QUEUE_SIZE))
+        self.spill = SpillFile(config.get("spill_dir"), self.keyed) if self.overflow == "spill" else None
+        self._task = None
+        self._warned = False
+        stats.depth = self.depth
+    
+    def depth(self) -> int:
+        """
+        Return the number of records waiting to be sent.
+        """
+        spilled = self.spill.pending if self.spill is not None else 0
+        return self.queue.qsize() + spilled
+    
+    def start(self) -> None:
+        """
+        Start the consumer task on the running loop.
+        """
+        self._task = asyncio.create_task(self._consume())
+    
+    async def put(self, data: bytes, record: Optional[Dict[str, Any]] = None) -> None:
+        """
+        Enqueue a formatted record, applying the overflow policy if full.
+        
+        Args:
+            data: The encoded record
+            record: The record itself, for connectors that route by key
+        """
+        queue = self.queue
+        spill = self.spill
+        if self.keyed:
+            data = (data, self.connector.route(record) if record is not None else None)
+        
+        # Once records spill, later ones follow them to keep their order
+        if spill is not None and spill.pending:
+            await self._spill(data)
+            return
+        
+        if not queue.full():
+            queue.put_nowait(data)
+            return
+        
+        if self.overflow == "block":
+            await queue.put(data)
+        elif self.overflow == "drop_oldest":
+            queue.get_nowait()
+            queue.task_done()
+            queue.put_nowait(data)
+            self._dropped()
+        elif self.overflow == "drop_newest":
+            self._dropped()
+        else:
+            await self._spill(data)
+    
+    async def close(self, timeout: float = DRAIN_TIMEOUT) -> None:
+        """
+        Wait for queued records to be sent, then stop the consumer.
+        """
+        if self._task is not None:
+            try:
+                await asyncio.wait_for(self._drain(), timeout)
+            except asyncio.TimeoutError:
+                logger.warning(f"Output {self.label} still had {self.depth()} records queued at shutdown")
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        
+        if self.spill is not None:
+            self.spill.close()
+    
+    async def _drain(self) -> None:
+        """
+        Wait until the queue and the spill file are empty.
+        """
+        while True:
+            await self.queue.join()
+            if self.spill is None or not self.spill.pending:
+                return
+            await asyncio.sleep(0.01)
+    
+    async def _consume(self) -> None:
+        """
+        Send records from the queue, then from the spill file, until cancelled.
+        
+        Records that are already waiting are handed over together to the
+        connector's send_batch, when it has one.
+        """
+        queue = self.queue
+        spill = self.spill
+        send = self.connector.send
+        send_batch = getattr(self.connector, "send_batch", None)
+        keyed = self.keyed
+        
+        while True:
+            if queue.empty() and spill is not None and spill.pending:
+                # Yield between reads so a long backlog cannot hog the loop
+                await asyncio.sleep(0)
+                batch = await spill.pop_batch(SEND_BATCH)
+                from_queue = 0
+            else:
+                batch = [await queue.get()]
+                while len(batch) < SEND_BATCH and not queue.empty():
+                    batch.append(queue.get_nowait())
+                from_queue = len(batch)
+            
+            try:
+                if keyed:
+                    keys = [key for _, key in batch]
+                    batch = [data for data, _ in batch]
+                if self.columnar:
+                    # Bytes are only known once the file is written
+                    await self._send(send_batch, (batch,), sum(map(len, batch)), 0)
+                elif send_batch is not None and len(batch) > 1:
+                    args = (batch, keys) if keyed else (batch,)
+                    await self._send(send_batch, args, len(batch), sum(map(len, batch)))
+                else:
+                    for i, data in enumerate(batch):
+                        args = (data, keys[i]) if keyed else (data,)
+                        await self._send(send, args, 1, len(data))
+            finally:
+                for _ in range(from_queue):
+                    queue.task_done()
+    
+    async def _send(self, send: Callable, args: Tuple, count: int, size: int) -> None:
+        """
+        Send one record or batch, counting it as delivered or failed.
+        
+        Acknowledged connectors count their deliveries themselves, so only a
+        send that raises is counted for them.
+        """
+        try:
+            await send(*args)
+            if not self.acknowledged:
+                self.stats.records += count
+                self.stats.bytes += size
+        except Exception as e:
+            self.stats.errors += count
+            logger.error(f"Error sending to output {self.label}: {e}")
+    
+    async def _spill(self, data: Any) -> None:
+        """
+        Add a record to the spill file, writing it out once enough are waiting.
+        """
+        self.spill.push(data)
+        self.stats.spilled += 1
+        if self.spill.full:
+            await self.spill.flush()
+    
+    def _dropped(self) -> None:
+        """
+        Count a dropped record, warning the first time.
+        """
+        self.stats.dropped += 1
+        if not self._warned:
+            self._warned = True
+            logger.warning(f"Output {self.label} queue is full, dropping records ({self.overflow})")
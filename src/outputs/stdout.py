@@ -1,6 +1,6 @@
 import sys
 import logging
-from typing import Dict, Any
+from typing import Dict, Any, List
 
 logger = logging.getLogger(__name__)
 
@@ -15,8 +15,28 @@ class StdoutConnector:
         """
         self.config = config
     
-    async def send(self, data: str) -> None:
+    async def send(self, data: bytes) -> None:
         """
         Send data to stdout.
         """
-        print(data, flush=True)
+        self._write(data + b"\n")
+    
+    async def send_batch(self, batch: List[bytes]) -> None:
+        """
+        Send several records to stdout with a single write.
+        """
+        self._write(b"\n".join(batch) + b"\n")
+    
+    def _write(self, data: bytes) -> None:
+        """
+        Write bytes to stdout, bypassing the text layer where possible.
+        """
+        buffer = getattr(sys.stdout, "buffer", None)
+        if buffer is None:
+            sys.stdout.write(data.decode("utf-8"))
+            sys.stdout.flush()
+            return
+        
+        sys.stdout.flush()
+        buffer.write(data)
+        buffer.flush()
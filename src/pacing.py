@@ -0,0 +1,232 @@
+"""
+Deadline-based pacing of record generation.
+"""
+import asyncio
+import math
+import random
+import time
+from typing import Dict, Any, Optional, Union
+
+from .clock import MAX_SPEED
+from .rate_profile import ArrivalTimes, RateProfile
+
+# Default upper bound on records emitted per wake-up
+DEFAULT_MAX_BATCH = 1000
+
+# Rate value that disables pacing
+UNTHROTTLED = "max"
+
+class Pacer:
+    """
+    Paces a stream against absolute deadlines on the event loop's monotonic clock.
+    
+    Each record has a deadline one interval after the previous one, so the
+    time spent generating and sending records never delays later records and
+    timing error does not build up. Every wake-up reports how many records
+    are due, which lets high rates be served with one sleep per batch rather
+    than one per record.
+    """
+    
+    def __init__(self, rate: float, jitter: float = 0.0, max_batch: int = DEFAULT_MAX_BATCH,
+                 rng: Optional[random.Random] = None):
+        """
+        Initialize the pacer.
+        
+        Args:
+            rate: Records per second
+            jitter: Random variation of each interval (0.1 = ±10%)
+            max_batch: Maximum number of records reported per wake-up
+            rng: Random generator for the jitter
+        """
+        self.interval = 1.0 / rate
+        self.jitter = jitter
+        self._uniform = (rng or random).uniform
+        self.max_batch = max_batch
+        self._start = None
+        self._emitted = 0
+        self._next = None
+    
+    async def wait(self) -> int:
+        """
+        Wait until at least one record is due.
+        
+        Returns:
+            Number of records due now, at most max_batch
+        """
+        loop = asyncio.get_running_loop()
+        now = loop.time()
+        
+        if self._next is None:
+            self._begin(now)
+        
+        if self._next > now:
+            await asyncio.sleep(self._next - now)
+        else:
+            # Behind schedule: still give other streams a turn
+            await asyncio.sleep(0)
+        
+        due = 0
+        while due == 0:
+            due = self._take_due(loop.time())
+            if due == 0:
+                # Woken within the clock resolution of the deadline
+                await asyncio.sleep(self._next - loop.time())
+        
+        return due
+    
+    def _begin(self, now: float) -> None:
+        """
+        Start the schedule with a record due now.
+        """
+        self._start = self._next = now
+    
+    def _take_due(self, now: float) -> int:
+        """
+        Count the records whose deadline has passed and advance the schedule.
+        """
+        if self._next > now:
+            return 0
+        
+        if self.jitter <= 0:
+            # Deadlines are exact multiples of the interval from the start
+            due = min(int((now - self._next) / self.interval) + 1, self.max_batch)
+            self._emitted += due
+            self._next = self._start + self._emitted * self.interval
+            return due
+        
+        # Each interval varies, so walk the deadlines one by one
+        interval = self.interval
+        jitter = self.jitter
+        uniform = self._uniform
+        next_deadline = self._next
+        due = 0
+        while next_deadline <= now and due < self.max_batch:
+            due += 1
+            next_deadline += interval * (1 + uniform(-jitter, jitter))
+        
+        self._emitted += due
+        self._next = next_deadline
+        return due
+
+class ProfilePacer(Pacer):
+    """
+    Paces a stream whose rate follows a rate profile.
+    
+    Deadlines come from the profile's arrival times, looked up one record
+    at a time from precompiled pieces of the profile. Once the rate stays
+    at zero, no more records are due and the stream ends.
+    """
+    
+    def __init__(self, profile_config: Dict[str, Any], rate: float, speed: float = 1.0,
+                 origin: Optional[float] = None, max_batch: int = DEFAULT_MAX_BATCH,
+                 rng: Optional[random.Random] = None):
+        """
+        Initialize the pacer.
+        
+        Args:
+            profile_config: The stream's rate_profile section
+            rate: The stream's rate
+            speed: Profile seconds per real second
+            origin: Epoch time at which the profile starts, defaults to the
+                wall time of the first record
+            max_batch: Maximum number of records reported per wake-up
+            rng: Random generator for Poisson arrivals
+        """
+        super().__init__(rate, max_batch=max_batch)
+        self.profile_config = profile_config
+        self.rate = rate
+        self.speed = speed
+        self.origin = origin
+        self.rng = rng
+        self._arrivals = None
+    
+    async def wait(self) -> int:
+        """
+        Wait until at least one record is due.
+        
+        Returns:
+            Number of records due now, at most max_batch; 0 once the
+            profile produces no more records
+        """
+        if self._next is None:
+            self._begin(asyncio.get_running_loop().time())
+        if self._next == math.inf:
+            return 0
+        return await super().wait()
+    
+    def _begin(self, now: float) -> None:
+        """
+        Compile the profile from the start time and schedule the first record.
+        """
+        origin = self.origin if self.origin is not None else time.time()
+        self._arrivals = ArrivalTimes(RateProfile(self.profile_config, self.rate, origin), self.rng)
+        self._start = now
+        self._next = now + self._arrivals.next() / self.speed
+    
+    def _take_due(self, now: float) -> int:
+        """
+        Count the records whose deadline has passed and advance the schedule.
+        """
+        next_deadline = self._next
+        arrivals = self._arrivals.next
+        start = self._start
+        speed = self.speed
+        due = 0
+        while next_deadline <= now and due < self.max_batch:
+            due += 1
+            next_deadline = start + arrivals() / speed
+        
+        self._emitted += due
+        self._next = next_deadline
+        return due
+
+class UnthrottledPacer:
+    """
+    Reports a full batch on every wake-up, so a stream runs as fast as
+    generation and its slowest connector allow.
+    """
+    
+    def __init__(self, max_batch: int = DEFAULT_MAX_BATCH):
+        """
+        Initialize the pacer.
+        
+        Args:
+            max_batch: Number of records reported per wake-up
+        """
+        self.max_batch = max_batch
+    
+    async def wait(self) -> int:
+        """
+        Yield to other tasks, then report a full batch as due.
+        """
+        await asyncio.sleep(0)
+        return self.max_batch
+
+def create_pacer(stream_config: Dict[str, Any], speed: Optional[Union[float, str]] = None,
+                 origin: Optional[float] = None, rng: Optional[random.Random] = None) -> Union[Pacer, UnthrottledPacer]:
+    """
+    Create the pacer for a stream configuration.
+    
+    Args:
+        stream_config: Stream configuration
+        speed: Simulation clock speed, or None when the stream runs on wall time.
+            On a simulation clock the jitter and Poisson arrivals are applied
+            to the virtual timestamps, so records are paced evenly at
+            rate * speed, or along the rate profile.
+        origin: Start time of the simulation clock
+        rng: Random generator for jitter and Poisson arrivals on wall time
+    """
+    max_batch = stream_config.get("max_batch", DEFAULT_MAX_BATCH)
+    if stream_config["rate"] == UNTHROTTLED or speed == MAX_SPEED:
+        return UnthrottledPacer(max_batch)
+    
+    profile_config = stream_config.get("rate_profile")
+    if profile_config is not None:
+        if speed is not None:
+            return ProfilePacer(dict(profile_config, arrivals="uniform"), stream_config["rate"], speed, origin, max_batch)
+        return ProfilePacer(profile_config, stream_config["rate"], max_batch=max_batch, rng=rng)
+    
+    if speed is not None:
+        return Pacer(stream_config["rate"] * speed, max_batch=max_batch)
+    
+    return Pacer(stream_config["rate"], jitter=stream_config.get("jitter", 0.0), max_batch=max_batch, rng=rng)
@@ -0,0 +1,341 @@
+"""
+Time-varying record rates.
+
+A stream's rate_profile shapes its rate over time with a schedule of
+constant rates and linear ramps, a periodic (e.g. daily) cosine curve and
+periodic bursts, multiplied together. The profile is compiled into pieces
+over which the rate is linear, and the time of each record is found by
+inverting the expected record count of its piece in closed form, so no
+expression is evaluated per record.
+"""
+import bisect
+import copy
+import heapq
+import logging
+import math
+import random
+from typing import Dict, Any, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# How records are spread over time: evenly, or as a Poisson process
+ARRIVALS = ("uniform", "poisson")
+
+# Linear pieces one period of the cosine curve is approximated with
+CURVE_PIECES = 96
+
+# Consecutive zero-rate pieces after which a profile is taken to have ended
+MAX_IDLE_PIECES = 100000
+
+def _number(value: Any, name: str, positive: bool = False) -> float:
+    """
+    Check a numeric setting.
+    
+    Raises:
+        ValueError: If value is not a non-negative (or positive) number
+    """
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or value < 0 or (positive and value == 0):
+        raise ValueError(f"{name} must be a {'positive' if positive else 'non-negative'} number, got {value!r}")
+    return float(value)
+
+class _Schedule:
+    """
+    Piecewise rates: constant segments and linear ramps, optionally repeated.
+    """
+    
+    def __init__(self, segments: Optional[List[Dict[str, Any]]], repeat: bool, rate: float):
+        """
+        Args:
+            segments: Segments with a duration and either a rate or from and to rates
+            repeat: Start over after the last segment instead of keeping its final rate
+            rate: Rate without segments
+        """
+        self.ends = []
+        self.rates = []
+        self.repeat = repeat
+        if not segments:
+            self.final = rate
+            return
+        if not isinstance(segments, list):
+            raise ValueError("segments must be a list")
+        
+        end = 0.0
+        for i, segment in enumerate(segments):
+            if not isinstance(segment, dict):
+                raise ValueError(f"segment {i} must be a dictionary")
+            end += _number(segment.get("duration"), f"segment {i} duration", positive=True)
+            if "rate" in segment:
+                start_rate = end_rate = _number(segment["rate"], f"segment {i} rate")
+            elif "from" in segment and "to" in segment:
+                start_rate = _number(segment["from"], f"segment {i} from")
+                end_rate = _number(segment["to"], f"segment {i} to")
+            else:
+                raise ValueError(f"segment {i} needs a rate, or from and to rates")
+            self.ends.append(end)
+            self.rates.append((start_rate, end_rate))
+        self.final = self.rates[-1][1]
+    
+    @property
+    def end(self) -> float:
+        """
+        Time from which the rate stays at zero, or infinity.
+        """
+        if not self.ends:
+            return 0.0 if self.final == 0 else math.inf
+        if self.repeat:
+            return 0.0 if all(rate == (0, 0) for rate in self.rates) else math.inf
+        return self.ends[-1] if self.final == 0 else math.inf
+    
+    def breakpoints(self) -> Iterator[float]:
+        """
+        Yield the times at which segments end.
+        """
+        if not self.ends:
+            return
+        cycle = 0.0
+        while True:
+            for end in self.ends:
+                yield cycle + end
+            if not self.repeat:
+                return
+            cycle += self.ends[-1]
+    
+    def rate(self, t: float, inside: float) -> float:
+        """
+        Return the rate at t of the segment containing inside.
+        """
+        if not self.ends:
+            return self.final
+        period = self.ends[-1]
+        cycle = 0.0
+        if inside >= period:
+            if not self.repeat:
+                return self.final
+            cycle = (inside // period) * period
+        i = bisect.bisect_right(self.ends, inside - cycle)
+        start = cycle + (self.ends[i - 1] if i > 0 else 0.0)
+        start_rate, end_rate = self.rates[i]
+        if start_rate == end_rate:
+            return start_rate
+        return start_rate + (end_rate - start_rate) * (t - start) / (cycle + self.ends[i] - start)
+
+class _Curve:
+    """
+    A periodic factor 1 + amplitude * cos(2 pi (time - peak) / period), on
+    the stream clock's absolute time so peaks fall at a time of day.
+    """
+    
+    def __init__(self, config: Dict[str, Any], origin: float):
+        """
+        Args:
+            config: Curve settings: period, amplitude and peak, all in seconds
+                except the amplitude
+            origin: Epoch time at which the stream starts
+        """
+        if not isinstance(config, dict):
+            raise ValueError("curve must be a dictionary")
+        self.period = _number(config.get("period", 86400), "curve period", positive=True)
+        self.amplitude = _number(config.get("amplitude", 0.5), "curve amplitude")
+        if self.amplitude > 1:
+            raise ValueError(f"curve amplitude must be at most 1, got {self.amplitude}")
+        self.peak = _number(config.get("peak", 0), "curve peak")
+        self.origin = origin
+        self.step = self.period / CURVE_PIECES
+    
+    def breakpoints(self) -> Iterator[float]:
+        """
+        Yield the ends of the pieces approximating the curve.
+        """
+        t = self.step - (self.origin % self.step)
+        while True:
+            yield t
+            t += self.step
+    
+    def rate(self, t: float, inside: float) -> float:
+        """
+        Return the factor at t.
+        """
+        return 1.0 + self.amplitude * math.cos(2 * math.pi * (self.origin + t - self.peak) / self.period)
+
+class _Bursts:
+    """
+    A factor applied for duration seconds every interval seconds.
+    """
+    
+    def __init__(self, config: Dict[str, Any]):
+        """
+        Args:
+            config: Burst settings: every, duration, factor and start, the
+                time of the first burst
+        """
+        if not isinstance(config, dict):
+            raise ValueError("bursts must be a dictionary")
+        self.every = _number(config.get("every"), "bursts every", positive=True)
+        self.duration = _number(config.get("duration"), "bursts duration", positive=True)
+        if self.duration >= self.every:
+            raise ValueError("bursts duration must be shorter than every")
+        self.factor = _number(config.get("factor", 50), "bursts factor")
+        self.start = _number(config.get("start", 0), "bursts start")
+    
+    def breakpoints(self) -> Iterator[float]:
+        """
+        Yield the times at which bursts start and end.
+        """
+        t = self.start
+        while True:
+            yield t
+            yield t + self.duration
+            t += self.every
+    
+    def rate(self, t: float, inside: float) -> float:
+        """
+        Return the factor of the burst or gap containing inside.
+        """
+        if inside >= self.start and (inside - self.start) % self.every < self.duration:
+            return self.factor
+        return 1.0
+
+class RateProfile:
+    """
+    A stream's rate over time, in seconds since the stream started.
+    """
+    
+    def __init__(self, config: Dict[str, Any], rate: float, origin: float = 0.0):
+        """
+        Compile a rate_profile section.
+        
+        Args:
+            config: The rate_profile section
+            rate: The stream's rate, used when the profile has no segments
+            origin: Epoch time at which the stream starts, for the curve
+        
+        Raises:
+            ValueError: If the section is invalid
+        """
+        if not isinstance(config, dict):
+            raise ValueError("rate_profile must be a dictionary")
+        self.arrivals = config.get("arrivals", "uniform")
+        if self.arrivals not in ARRIVALS:
+            raise ValueError(f"arrivals must be one of: {', '.join(ARRIVALS)}")
+        self.components = [_Schedule(config.get("segments"), bool(config.get("repeat", False)), rate)]
+        if "curve" in config:
+            self.components.append(_Curve(config["curve"], origin))
+        if "bursts" in config:
+            self.components.append(_Bursts(config["bursts"]))
+        # The other components multiply the schedule, so they cannot lift a zero rate
+        self.end = self.components[0].end
+    
+    def rate(self, t: float, inside: float) -> float:
+        """
+        Return the rate at t of the piece containing inside.
+        """
+        value = 1.0
+        for component in self.components:
+            value *= component.rate(t, inside)
+        return value
+    
+    def pieces(self) -> Iterator[Tuple[float, float, float, float]]:
+        """
+        Yield (start, end, start rate, end rate) of consecutive pieces over
+        which the rate is linear; the last piece may end at infinity, and
+        has a zero rate once the profile has ended.
+        """
+        start = 0.0
+        for end in heapq.merge(*(component.breakpoints() for component in self.components)):
+            if start >= self.end:
+                yield start, math.inf, 0.0, 0.0
+                return
+            if end <= start:
+                continue
+            middle = (start + end) / 2
+            yield start, end, self.rate(start, middle), self.rate(end, middle)
+            start = end
+        final = self.rate(start, start + 1.0)
+        yield start, math.inf, final, final
+
+class ArrivalTimes:
+    """
+    Times of successive records under a rate profile.
+    
+    With uniform arrivals record k comes when the expected record count
+    reaches k - 1; with Poisson arrivals the expected count advances by an
+    exponentially distributed step per record, which makes the arrivals a
+    Poisson process with the profile's rate. position is the expected
+    count reached so far, and may be set to continue from a checkpoint.
+    """
+    
+    def __init__(self, profile: RateProfile, rng: Optional[random.Random] = None):
+        """
+        Initialize the arrival times.
+        
+        Args:
+            profile: The stream's rate profile
+            rng: Random generator for Poisson arrivals
+        """
+        self._pieces = profile.pieces()
+        self._expovariate = (rng or random).expovariate if profile.arrivals == "poisson" else None
+        self.position = 0.0
+        self._start = self._end = 0.0
+        self._start_rate = self._end_rate = 0.0
+        self._before = self._after = 0.0
+        self._idle = 0
+    
+    def next(self) -> float:
+        """
+        Return the time of the next record in seconds since the stream
+        started, or infinity if the rate stays at zero.
+        """
+        if self._expovariate is not None:
+            self.position += self._expovariate(1.0)
+            target = self.position
+        else:
+            target = self.position
+            self.position += 1.0
+        
+        # Records never fall into pieces with a zero rate
+        while target > self._after or self._end == self._start or self._start_rate == self._end_rate == 0:
+            if not self._advance():
+                return math.inf
+        
+        # Solve r0 x + slope x^2 / 2 = count for the offset x into the piece
+        count = target - self._before
+        if count <= 0:
+            return self._start
+        start_rate = self._start_rate
+        slope = (self._end_rate - start_rate) / (self._end - self._start) if self._end != math.inf else 0.0
+        return self._start + 2 * count / (start_rate + math.sqrt(max(0.0, start_rate * start_rate + 2 * slope * count)))
+    
+    def _advance(self) -> bool:
+        """
+        Move on to the next piece; returns False after the last one.
+        """
+        piece = next(self._pieces, None)
+        if piece is None:
+            return False
+        self._start, self._end, self._start_rate, self._end_rate = piece
+        if self._start_rate == 0 and self._end_rate == 0:
+            self._idle += 1
+            if self._idle > MAX_IDLE_PIECES:
+                logger.warning(f"Rate profile stayed at zero for {MAX_IDLE_PIECES} pieces, ending the stream")
+                self._pieces = iter(())
+                return False
+        else:
+            self._idle = 0
+        self._before = self._after
+        if self._end == math.inf:
+            self._after = math.inf if self._start_rate > 0 else self._before
+        else:
+            self._after += (self._start_rate + self._end_rate) / 2 * (self._end - self._start)
+        return True
+
+def scale_rate_profile(config: Dict[str, Any], factor: float) -> Dict[str, Any]:
+    """
+    Return a copy of a rate_profile section with every segment rate
+    multiplied by factor, for a shard running part of a stream.
+    """
+    config = copy.deepcopy(config)
+    for segment in config.get("segments") or []:
+        for key in ("rate", "from", "to"):
+            if key in segment:
+                segment[key] = segment[key] * factor
+    return config
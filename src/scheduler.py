@@ -1,44 +1,210 @@
 import asyncio
 import logging
-import time
-from typing import Dict, Any, List, Callable, Union, Optional
 import random
+from typing import Dict, Any, List, Callable, Union, Optional, Tuple
 
-from .generators import create_record
+from .generators import compile_schema, compile_batch, ColumnarBatch
 from .state import StateManager
-from .formatters import format_record
-from .outputs import create_output_connector
-from .events import check_events
+from .checkpoint import Checkpointer, snapshot_state
+from .formatters import compile_encoder, encoder_key
+from .formatters.csv_format import csv_header
+from .outputs import create_output_connector, QueuedOutput
+from .events import EventIndex
+from .config import get_limit, get_clock
+from .clock import create_clock
+from .pacing import create_pacer
+from .stats import StreamStats
 
 logger = logging.getLogger(__name__)
 
+# Seconds a stream waits after a batch fails to generate, so a persistent
+# error neither spins an unthrottled stream nor floods the log
+ERROR_BACKOFF = 1.0
+
+# Outputs whose files start with the CSV header only when they are empty
+FILE_HEADER_TYPES = ("file", "partitioned_file")
+
+def _file_header(output_config: Dict[str, Any], schema: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Return an output's configuration with its CSV header moved from the
+    encoder, which puts it before the first record of a run, to the file
+    writer, which only writes it to empty files.
+    """
+    options = output_config.get("csv") or {}
+    if output_config.get("type") in FILE_HEADER_TYPES and output_config.get("format") == "csv" and options.get("header"):
+        return dict(output_config, csv=dict(options, header=False), header=csv_header(schema))
+    return output_config
+
 class Scheduler:
     """
     Manages the timing and execution of data generation and output.
     """
     
-    def __init__(self, config: Dict[str, Any]):
+    def __init__(self, config: Dict[str, Any], resume: bool = False):
         """
         Initialize the scheduler.
         
         Args:
             config: Configuration dictionary
+            resume: Continue every stream from its checkpoint, if it has one
+        
+        Raises:
+            ValueError: If the configuration or a checkpoint is invalid
         """
         self.config = config
+        self.checkpointer = Checkpointer(config["checkpoint"]) if "checkpoint" in config else None
+        self.record_counts = {}
         self.state_managers = {}
+        self.plans = {}
+        self.batch_plans = {}
+        self.clocks = {}
+        self.event_indexes = {}
         self.output_connectors = {}
+        self.output_queues = {}
+        self.output_groups = {}
+        self.connector_stats = {}
+        self.stats = {}
         self.running = False
         
         # Initialize state managers for each stream
         for stream_name, stream_config in config["streams"].items():
             initial_state = stream_config.get("initial_state", {})
-            self.state_managers[stream_name] = StateManager(initial_state)
+            try:
+                self.state_managers[stream_name] = StateManager(initial_state, stream_config.get("windows"))
+            except ValueError as e:
+                raise ValueError(f"Stream '{stream_name}' {e}") from e
+            self.stats[stream_name] = StreamStats()
+            seed = stream_config.get("seed")
+            
+            # Timestamps follow wall time, or a simulation clock advanced per record
+            clock_config = get_clock(config, stream_config)
+            clock_rng = random.Random(f"{seed}/clock") if seed is not None else None
+            clock = create_clock(clock_config, stream_config["rate"], stream_config.get("jitter", 0.0), clock_rng,
+                                 stream_config.get("rate_profile"))
+            self.clocks[stream_name] = clock
             
-            # Initialize output connectors for each stream
+            # Compile the schema once so each record only runs the plan
+            try:
+                self.plans[stream_name] = compile_schema(stream_config["schema"], seed, clock)
+            except ValueError as e:
+                raise ValueError(f"Stream '{stream_name}' schema is invalid: {e}") from e
+            
+            # Events are looked up in a schedule of upcoming firings
+            if stream_config.get("events"):
+                events_rng = random.Random(f"{seed}/events") if seed is not None else None
+                try:
+                    self.event_indexes[stream_name] = EventIndex(stream_config["events"], events_rng)
+                except ValueError as e:
+                    raise ValueError(f"Stream '{stream_name}' {e}") from e
+            
+            # Vectorized streams generate each due batch column by column
+            if stream_config.get("vectorized", False):
+                try:
+                    self.batch_plans[stream_name] = compile_batch(stream_config["schema"], seed, clock)
+                except ImportError as e:
+                    logger.warning(f"Stream '{stream_name}' falls back to per-record generation: {e}")
+            
+            # Initialize output connectors for each stream, each fed by its own queue
             self.output_connectors[stream_name] = []
-            for output_config in stream_config["outputs"]:
-                connector = create_output_connector(output_config)
+            self.output_queues[stream_name] = []
+            self.connector_stats[stream_name] = []
+            for i, output_config in enumerate(stream_config["outputs"]):
+                connector = create_output_connector(_file_header(output_config, stream_config["schema"]), clock)
+                if getattr(connector, "columnar", False):
+                    connector.set_schema(stream_config["schema"], stream_config.get("events"))
                 self.output_connectors[stream_name].append(connector)
+                label = f"{output_config['type']}[{i}]"
+                connector_stats = self.stats[stream_name].add_connector(label)
+                self.connector_stats[stream_name].append(connector_stats)
+                self.output_queues[stream_name].append(QueuedOutput(connector, connector_stats, f"{stream_name}.{label}"))
+            
+            # Compile one encoder per format and format options, shared by its outputs
+            groups = {}
+            for output in self.output_queues[stream_name]:
+                if output.columnar:
+                    continue
+                key = encoder_key(output.connector.config)
+                if key not in groups:
+                    output_format = output.connector.config["format"]
+                    try:
+                        encoder = compile_encoder(
+                            output_format,
+                            stream_config["schema"],
+                            output.connector.config.get(output_format),
+                            stream_config.get("events")
+                        )
+                    except ValueError as e:
+                        raise ValueError(f"Stream '{stream_name}' {output_format} output is invalid: {e}") from e
+                    groups[key] = (encoder, [])
+                groups[key][1].append(output)
+            self.output_groups[stream_name] = list(groups.values())
+    
+            if resume and self.checkpointer is not None:
+                self._restore(stream_name)
+    
+    def _restore(self, stream_name: str) -> None:
+        """
+        Continue a stream from its checkpoint: its state, record count,
+        clock and random generators.
+        """
+        try:
+            checkpoint = self.checkpointer.load(stream_name)
+        except ValueError as e:
+            raise ValueError(f"Stream '{stream_name}' {e}") from e
+        if checkpoint is None:
+            logger.warning(f"No checkpoint for stream {stream_name}, starting from the beginning")
+            return
+        
+        self.state_managers[stream_name].restore(checkpoint["state"])
+        self.record_counts[stream_name] = checkpoint["record_count"]
+        self.clocks[stream_name].restore(checkpoint["clock"])
+        self.plans[stream_name].rng.setstate(checkpoint["random"])
+        batch_plan = self.batch_plans.get(stream_name)
+        if batch_plan is not None and "batch_random" in checkpoint:
+            batch_plan.plan.rng.setstate(checkpoint["batch_random"][0])
+            batch_plan.rng.bit_generator.state = checkpoint["batch_random"][1]
+        event_index = self.event_indexes.get(stream_name)
+        if event_index is not None:
+            saved = checkpoint.get("events")
+            if saved is not None and saved.events == event_index.events:
+                self.event_indexes[stream_name] = saved
+            else:
+                # The events changed; schedule them from the restored count
+                self.event_indexes[stream_name] = EventIndex(event_index.events, event_index.rng, checkpoint["record_count"])
+        logger.info(f"Resuming stream {stream_name} after {checkpoint['record_count']} records")
+    
+    def _take_checkpoints(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Copy the state of every stream that produced records since its last checkpoint.
+        """
+        checkpoints = {}
+        for stream_name, state_manager in self.state_managers.items():
+            record_count = self.record_counts.get(stream_name, 0)
+            if not self.checkpointer.changed(stream_name, record_count):
+                continue
+            checkpoint = {
+                "record_count": record_count,
+                "state": snapshot_state(state_manager.state),
+                "clock": self.clocks[stream_name].snapshot(),
+                "random": self.plans[stream_name].rng.getstate(),
+            }
+            batch_plan = self.batch_plans.get(stream_name)
+            if batch_plan is not None:
+                checkpoint["batch_random"] = (batch_plan.plan.rng.getstate(), batch_plan.rng.bit_generator.state)
+            if stream_name in self.event_indexes:
+                checkpoint["events"] = self.event_indexes[stream_name].snapshot()
+            checkpoints[stream_name] = checkpoint
+        return checkpoints
+    
+    async def _checkpoint_periodically(self) -> None:
+        """
+        Save checkpoints every interval, skipping a turn while the last ones
+        are still being written.
+        """
+        while True:
+            await asyncio.sleep(self.checkpointer.interval)
+            if not self.checkpointer.busy:
+                await self.checkpointer.save(self._take_checkpoints())
     
     async def run(self):
         """
@@ -46,6 +212,11 @@ class Scheduler:
         """
         self.running = True
         
+        # Start delivering from the output queues
+        for outputs in self.output_queues.values():
+            for output in outputs:
+                output.start()
+        
         # Create tasks for each stream
         tasks = []
         for stream_name, stream_config in self.config["streams"].items():
@@ -55,6 +226,9 @@ class Scheduler:
             tasks.append(task)
         
         logger.info(f"Starting {len(tasks)} simulation streams")
+        checkpoints = None
+        if self.checkpointer is not None:
+            checkpoints = asyncio.create_task(self._checkpoint_periodically())
         
         # Wait for all tasks to complete (or for cancellation)
         try:
@@ -65,6 +239,43 @@ class Scheduler:
             for task in tasks:
                 task.cancel()
             await asyncio.gather(*tasks, return_exceptions=True)
+        
+        self.running = False
+        if checkpoints is not None:
+            # Save where every stream stopped
+            checkpoints.cancel()
+            await asyncio.gather(checkpoints, return_exceptions=True)
+            await self.checkpointer.wait()
+            await self.checkpointer.save(self._take_checkpoints())
+        for stats in self.stats.values():
+            stats.stop()
+        await self.close()
+    
+    async def close(self) -> None:
+        """
+        Deliver queued records, then close every output connector that supports it.
+        """
+        for outputs in self.output_queues.values():
+            for output in outputs:
+                await output.close()
+        
+        for connectors in self.output_connectors.values():
+            for connector in connectors:
+                close = getattr(connector, "close", None)
+                if close is None:
+                    continue
+                try:
+                    result = close()
+                    if asyncio.iscoroutine(result):
+                        await result
+                except Exception as e:
+                    logger.error(f"Error closing output connector: {e}")
+    
+    def snapshot_stats(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Return the counters of every stream as plain dicts.
+        """
+        return {stream_name: stats.snapshot() for stream_name, stats in self.stats.items()}
     
     async def _run_stream(self, stream_name: str, stream_config: Dict[str, Any]):
         """
@@ -76,65 +287,198 @@ class Scheduler:
         """
         logger.info(f"Starting stream: {stream_name}")
         state_manager = self.state_managers[stream_name]
+        plan = self.plans[stream_name]
+        batch_plan = self.batch_plans.get(stream_name)
+        stats = self.stats[stream_name]
+        clock = self.clocks[stream_name]
         
-        # Calculate the time between records
-        rate = stream_config["rate"]  # records per second
-        base_interval = 1.0 / rate
+        # Pace records against absolute deadlines, or not at all for rate: max.
+        # On a simulation clock, speed scales the pace or disables it.
+        clock_config = get_clock(self.config, stream_config)
+        speed = clock_config.get("speed", 1.0) if clock_config is not None else None
+        seed = stream_config.get("seed")
+        arrivals_rng = random.Random(f"{seed}/arrivals") if seed is not None else None
+        pacer = create_pacer(stream_config, speed, getattr(clock, "start_time", None), arrivals_rng)
         
-        # Get optional jitter configuration
-        jitter = stream_config.get("jitter", 0.0)  # Default: no jitter
+        # Each record is encoded once per output group; columnar outputs take whole batches instead
+        output_groups = self.output_groups[stream_name]
+        columnar_outputs = [output for output in self.output_queues[stream_name] if output.columnar]
+        event_index = self.event_indexes.get(stream_name)
         
-        # Count for sequence tracking
-        record_count = 0
+        # Vectorized batches go to columnar-only streams without building rows
+        columns_only = batch_plan is not None and columnar_outputs and not output_groups and event_index is None
+        
+        debug = logger.isEnabledFor(logging.DEBUG)
+        
+        # Optional limits on the number of records and the run time
+        limit = get_limit(self.config, stream_config, "count")
+        duration = get_limit(self.config, stream_config, "duration")
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + duration if duration is not None else None
+        stats.start()
+        
+        # Count for sequence tracking, continued from a checkpoint
+        record_count = self.record_counts.get(stream_name, 0)
         
         while self.running:
-            start_time = time.time()
+            # Wait until the next batch of records is due
+            due = await pacer.wait()
             
-            try:
-                # Generate a record
-                record_count += 1
-                
-                # Check if we should inject an event
-                events = stream_config.get("events", [])
-                event_record = None
-                if events:
-                    event_record = check_events(events, record_count, state_manager.state)
-                
+            if deadline is not None and loop.time() >= deadline:
+                break
+            if limit is not None:
+                due = min(due, limit - record_count)
+            
+            # Stop once the simulation clock passes its end_time
+            due = clock.reserve(due)
+            if due <= 0:
+                break
+            
+            batch = None
+            records = None
+            events = None
+            if batch_plan is not None:
+                try:
+                    if columns_only:
+                        batch = batch_plan.generate(state_manager.state, record_count + 1, due)
+                    else:
+                        batch, records, events = self._generate_batch(
+                            batch_plan, event_index, clock, state_manager.state, record_count, due)
+                except Exception as e:
+                    stats.errors += 1
+                    logger.error(f"Error generating batch in stream {stream_name}: {e}")
+                    await asyncio.sleep(ERROR_BACKOFF)
+                    continue
+            
+            if columns_only:
+                record_count += due
+                self.record_counts[stream_name] = record_count
+                state_manager.update_batch(batch)
+                for output in columnar_outputs:
+                    await output.put(batch)
+                stats.records += due
+                if limit is not None and record_count >= limit:
+                    break
+                continue
+            
+            rows = []
+            for i in range(due):
+                try:
+                    # Generate a record
+                    record_count += 1
+                    
+                    # Check if we should inject an event
+                    event_record = None
+                    if events is not None:
+                        event_record = events.get(i)
+                    elif event_index is not None:
+                        event_record = event_index.check(record_count)
+                    
+                    if event_record is not None:
+                        record = event_record
+                        if records is None:
+                            # The event takes this record's slot on the clock
+                            clock.tick()
+                        if debug:
+                            logger.debug(f"[{stream_name}] Injecting event: {record}")
+                    elif records is not None:
+                        record = records[i]
+                        if debug:
+                            logger.debug(f"[{stream_name}] Generated record: {record}")
+                    else:
+                        # Generate a normal record
+                        record = plan.generate(state_manager.state, record_count)
+                        if debug:
+                            logger.debug(f"[{stream_name}] Generated record: {record}")
+                    
+                    # Update state if needed
+                    state_manager.update(record)
+                    rows.append(record)
+                except Exception as e:
+                    stats.errors += 1
+                    logger.error(f"Error in stream {stream_name}: {e}")
+                    # Continue with next record
+            self.record_counts[stream_name] = record_count
+            
+            # Encode the records of this wake-up once per output group and
+            # queue them for every output of the group
+            for encode, group_outputs in output_groups:
+                for data, record in self._encode_rows(encode, rows, stream_name):
+                    for output in group_outputs:
+                        await output.put(data, record)
+                        stats.bytes += len(data)
+            stats.records += len(rows)
+            
+            # Hand the records of this wake-up to columnar outputs as one batch,
+            # reusing generated columns unless events replaced or dropped rows
+            if rows and columnar_outputs:
+                if records is None or len(rows) != due or any(
+                        row is not record for row, record in zip(rows, records)):
+                    batch = ColumnarBatch.from_rows(rows, plan.field_names)
+                for output in columnar_outputs:
+                    await output.put(batch)
+            
+            if limit is not None and record_count >= limit:
+                break
+        
+        stats.stop()
+        logger.info(f"Stream {stream_name} finished after {record_count} records")
+    
+    def _generate_batch(self, batch_plan: Any, event_index: Optional[EventIndex], clock: Any, state: Dict[str, Any],
+                        record_count: int, due: int) -> Tuple[Optional[ColumnarBatch], List[Any], Dict[int, Any]]:
+        """
+        Generate the due records column by column, leaving the slots of
+        injected events to them.
+        
+        Records are generated in runs between events, so sequences and other
+        stateful fields only advance for generated records, and each event
+        takes its own slot on the clock as it does on the per-record path.
+        
+        Returns:
+            The batch, or None if events split it; the records, None in event
+            slots; and the event records by slot
+        """
+        events = {}
+        if event_index is not None:
+            for i in range(due):
+                event_record = event_index.check(record_count + 1 + i)
                 if event_record is not None:
-                    record = event_record
-                    logger.debug(f"[{stream_name}] Injecting event: {record}")
-                else:
-                    # Generate a normal record
-                    record = create_record(
-                        stream_config["schema"],
-                        state_manager.state,
-                        record_count
-                    )
-                    logger.debug(f"[{stream_name}] Generated record: {record}")
-                
-                # Update state if needed
-                state_manager.update(record)
-                
-                # Format and send the record to all outputs
-                for connector in self.output_connectors[stream_name]:
-                    output_format = connector.config["format"]
-                    formatted_record = format_record(record, output_format)
-                    await connector.send(formatted_record)
-                
-                # Calculate time to sleep
-                if jitter > 0:
-                    # Add random jitter within the specified range
-                    interval = base_interval * (1 + random.uniform(-jitter, jitter))
-                else:
-                    interval = base_interval
-                
-                elapsed = time.time() - start_time
-                sleep_time = max(0, interval - elapsed)
-                
-                # Sleep until next record
-                await asyncio.sleep(sleep_time)
-                
+                    events[i] = event_record
+        
+        if not events:
+            batch = batch_plan.generate(state, record_count + 1, due)
+            return batch, batch.rows(), events
+        
+        records = []
+        start = 0
+        for slot in sorted(events) + [due]:
+            if slot > start:
+                records.extend(batch_plan.generate(state, record_count + 1 + start, slot - start).rows())
+            if slot < due:
+                clock.tick()
+                records.append(None)
+            start = slot + 1
+        return None, records, events
+    
+    def _encode_rows(self, encode: Callable, rows: List[Dict[str, Any]], stream_name: str) -> List[Any]:
+        """
+        Encode records with one call, or one at a time if that fails so a
+        single bad record only loses itself and counts as one error.
+        
+        Returns:
+            (encoded record, record) pairs
+        """
+        try:
+            return list(zip(encode.encode_many(rows), rows))
+        except Exception as e:
+            logger.warning(f"Error encoding a batch of {len(rows)} records in stream {stream_name}, "
+                           f"encoding them one at a time: {e}")
+        
+        encoded = []
+        for record in rows:
+            try:
+                encoded.append((encode(record), record))
             except Exception as e:
+                self.stats[stream_name].errors += 1
                 logger.error(f"Error in stream {stream_name}: {e}")
-                # Continue with next record
-                await asyncio.sleep(base_interval)
\ No newline at end of file
+        return encoded
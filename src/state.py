@@ -1,18 +1,532 @@
-from typing import Dict, Any
+import copy
+import heapq
+import logging
+from array import array
+from typing import Dict, Any, Hashable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Share of entities evicted at once when a KeyedState is full
+EVICT_FRACTION = 0.1
 
 class StateManager:
     """
     Manages state for a simulation stream.
     """
     
-    def __init__(self, initial_state: Dict[str, Any] = None):
-        """Initialize the state manager."""
-        self.state = initial_state or {}
+    def __init__(self, initial_state: Dict[str, Any] = None, windows: Dict[str, Dict[str, Any]] = None):
+        """
+        Initialize the state manager.
+        
+        Args:
+            initial_state: Initial state values
+            windows: Rolling window settings by name; each window is put in
+                the state under its name
+        
+        Raises:
+            ValueError: If a window's settings are invalid
+        """
+        self.state = dict(initial_state or {})
+        self.windows = {}
+        for name, window_config in (windows or {}).items():
+            if not isinstance(window_config, dict):
+                raise ValueError(f"window '{name}' must be a dictionary")
+            if name in self.state:
+                raise ValueError(f"window '{name}' has the name of an initial_state value")
+            try:
+                window = RollingWindow(window_config.get("field"), window_config.get("size"),
+                                       window_config.get("by"), window_config.get("max_entities"))
+            except ValueError as e:
+                raise ValueError(f"window '{name}' is invalid: {e}") from None
+            self.state[name] = window
+            self.windows[name] = window
     
     def update(self, record: Dict[str, Any]) -> None:
         """Update the state based on a generated record."""
-        # Process state update rules (if any)
-        # For now, just store the last record
         self.state["_last_record"] = record
+        for window in self.windows.values():
+            window.push(record)
+    
+    def update_batch(self, batch: Any) -> None:
+        """
+        Update the state based on a batch of records, reading the windowed
+        fields column by column.
+        """
+        self.state["_last_record"] = batch.row(-1)
+        for window in self.windows.values():
+            window.extend(batch.columns)
+    
+    def restore(self, state: Dict[str, Any]) -> None:
+        """
+        Continue from a saved state. Values and windows the saved state
+        lacks keep their initial values.
+        """
+        restored = dict(self.state)
+        restored.update(state)
+        for name, window in self.windows.items():
+            if isinstance(restored[name], RollingWindow):
+                self.windows[name] = restored[name]
+            else:
+                restored[name] = window
+        self.state = restored
+
+class KeyedState:
+    """
+    State of many entities, such as devices or stock symbols, stored by column.
+    
+    Every entity gets a row number from a single dict; each named value is a
+    column holding one entry per row, an array of doubles or 64-bit integers
+    when the initial value is a float or int. A million entities with a few
+    numeric values each take tens of megabytes rather than a dict entry and
+    a boxed number per entity and value.
+    
+    Entities not used for ttl seconds, or the least recently used ones once
+    there are max_entities, are dropped and start over from the initial
+    values when they come back.
+    """
+    
+    def __init__(self, ttl: Optional[float] = None, max_entities: Optional[int] = None):
+        """
+        Initialize the store.
+        
+        Args:
+            ttl: Seconds an entity may go unused before it is dropped
+            max_entities: Most entities kept at once
+        """
+        self.ids = {}
+        self.columns = {}
+        self.types = {}
+        self.initial = {}
+        self.widths = {}
+        self.free = []
+        self.rows = 0
+        self.ttl = None
+        self.max_entities = None
+        self.last_used = None
+        self.uses = 0
+        self.next_sweep = None
+        self.evicted = 0
+        self.configure(ttl, max_entities)
+    
+    def configure(self, ttl: Optional[float] = None, max_entities: Optional[int] = None) -> None:
+        """
+        Enable eviction by idle time or entity count, unless already set.
+        """
+        if ttl is not None and self.ttl is None:
+            self.ttl = ttl
+        if max_entities is not None and self.max_entities is None:
+            self.max_entities = max_entities
+        if (self.ttl is not None or self.max_entities is not None) and self.last_used is None:
+            self.last_used = array("d", bytes(8 * self.rows))
+    
+    def __len__(self) -> int:
+        return len(self.ids)
+    
+    def snapshot(self) -> "KeyedState":
+        """
+        Return a copy to save while this store keeps changing; objects in
+        list columns are shared.
+        """
+        snapshot = copy.copy(self)
+        snapshot.ids = dict(self.ids)
+        snapshot.columns = {name: column[:] for name, column in self.columns.items()}
+        snapshot.types = dict(self.types)
+        snapshot.initial = dict(self.initial)
+        snapshot.widths = dict(self.widths)
+        snapshot.free = list(self.free)
+        if self.last_used is not None:
+            snapshot.last_used = self.last_used[:]
+        return snapshot
+    
+    def add_column(self, name: str, initial: Any, width: int = 1) -> None:
+        """
+        Add a value kept for every entity, starting at initial.
+        
+        A column of width w holds w values per entity, those of row r at
+        r * w to r * w + w - 1; get and set only handle columns of width 1.
+        """
+        if name in self.columns:
+            return
+        value_type = type(initial)
+        if value_type is float:
+            column = array("d", [initial]) * (self.rows * width)
+        elif value_type is int:
+            column = array("q", [initial]) * (self.rows * width)
+        else:
+            column = [initial] * (self.rows * width)
+        self.columns[name] = column
+        self.types[name] = value_type
+        self.initial[name] = initial
+        self.widths[name] = width
+    
+    def row(self, key: Hashable, now: Optional[float] = None) -> int:
+        """
+        Return the row of an entity, adding it if it is new.
         
-        # Additional state updates would be implemented here, based on configuration
\ No newline at end of file
+        Args:
+            key: Entity key
+            now: Current time, needed when a ttl is set
+        """
+        row = self.ids.get(key)
+        if row is None:
+            row = self._add(key)
+        if self.last_used is not None:
+            if self.ttl is not None:
+                self.last_used[row] = now
+                if self.next_sweep is None:
+                    self.next_sweep = now + self.ttl
+                elif now >= self.next_sweep:
+                    self._sweep(now)
+            else:
+                self.uses += 1
+                self.last_used[row] = self.uses
+        return row
+    
+    def get(self, name: str, row: int) -> Any:
+        """
+        Return an entity's value.
+        """
+        return self.columns[name][row]
+    
+    def set(self, name: str, row: int, value: Any) -> None:
+        """
+        Set an entity's value, turning the column into a list if the value
+        does not fit its array.
+        """
+        column = self.columns[name]
+        if type(value) is not self.types[name] and type(column) is not list:
+            column = self._to_list(name)
+        try:
+            column[row] = value
+        except OverflowError:
+            self._to_list(name)[row] = value
+    
+    def _to_list(self, name: str) -> List[Any]:
+        """
+        Store a column as a list of objects.
+        """
+        column = self.columns[name] = list(self.columns[name])
+        return column
+    
+    def _blank(self, name: str, column: Any) -> Any:
+        """
+        Return the initial values of a row of a column wider than 1.
+        """
+        blank = [self.initial[name]] * self.widths[name]
+        return array(column.typecode, blank) if type(column) is array else blank
+    
+    def _add(self, key: Hashable) -> int:
+        """
+        Give a new entity a row, with every value at its initial value.
+        """
+        if self.max_entities is not None and len(self.ids) >= self.max_entities:
+            self._evict_oldest()
+        
+        if self.free:
+            row = self.free.pop()
+            for name, column in self.columns.items():
+                width = self.widths[name]
+                if width == 1:
+                    column[row] = self.initial[name]
+                else:
+                    column[row * width:(row + 1) * width] = self._blank(name, column)
+        else:
+            row = self.rows
+            self.rows += 1
+            for name, column in self.columns.items():
+                if self.widths[name] == 1:
+                    column.append(self.initial[name])
+                else:
+                    column.extend(self._blank(name, column))
+            if self.last_used is not None:
+                self.last_used.append(0.0)
+        self.ids[key] = row
+        return row
+    
+    def _remove(self, keys: List[Hashable]) -> None:
+        """
+        Drop entities, keeping their rows for new ones.
+        """
+        for key in keys:
+            row = self.ids.pop(key)
+            self.free.append(row)
+            for name, column in self.columns.items():
+                if type(column) is list:
+                    # Release objects held by the row
+                    width = self.widths[name]
+                    column[row * width:(row + 1) * width] = [None] * width
+        self.evicted += len(keys)
+    
+    def _sweep(self, now: float) -> None:
+        """
+        Drop entities unused for longer than the ttl; runs once per ttl.
+        """
+        cutoff = now - self.ttl
+        last_used = self.last_used
+        self._remove([key for key, row in self.ids.items() if last_used[row] < cutoff])
+        self.next_sweep = now + self.ttl
+    
+    def _evict_oldest(self) -> None:
+        """
+        Drop the least recently used entities to make room for new ones.
+        """
+        count = max(1, int(self.max_entities * EVICT_FRACTION))
+        last_used = self.last_used
+        oldest = heapq.nsmallest(count, self.ids.items(), key=lambda item: last_used[item[1]])
+        self._remove([key for key, _ in oldest])
+
+class RollingWindow:
+    """
+    The last size values of a record field, for the whole stream or for
+    every entity named by the by field, with rolling aggregates.
+    
+    Values of each entity are kept in a ring buffer within one array of
+    doubles. The mean and variance are updated as values enter and leave
+    (Welford's method), and recomputed from the buffer every time it wraps
+    around so rounding errors do not build up. Minimum and maximum come
+    from monotonic queues of buffer positions, ring buffers in arrays as
+    well. Every aggregate is read in O(1), and memory is fixed per entity;
+    max_entities bounds the number of entities.
+    
+    Generators read a window from the state by name, passing the entity key
+    when the window has a by field: state["recent"].mean() or
+    state["recent_by_device"].max(device_id).
+    """
+    
+    def __init__(self, field: str, size: int, by: Optional[str] = None, max_entities: Optional[int] = None):
+        """
+        Initialize the window.
+        
+        Args:
+            field: Record field whose numeric values are kept
+            size: Number of values kept
+            by: Record field naming the entity, for a window per entity
+            max_entities: Most entities kept at once
+        
+        Raises:
+            ValueError: If the settings are invalid
+        """
+        if not isinstance(field, str):
+            raise ValueError("field must be the name of a record field")
+        if not isinstance(size, int) or isinstance(size, bool) or size <= 0:
+            raise ValueError(f"size must be a positive integer, got {size}")
+        if by is not None and not isinstance(by, str):
+            raise ValueError("by must be the name of a record field")
+        if max_entities is not None and not (isinstance(max_entities, int) and max_entities > 0):
+            raise ValueError(f"max_entities must be a positive integer, got {max_entities}")
+        if max_entities is not None and by is None:
+            raise ValueError("max_entities needs a by field")
+        
+        self.field = field
+        self.size = size
+        self.by = by
+        self.table = KeyedState(max_entities=max_entities)
+        self.table.add_column("values", 0.0, size)
+        self.table.add_column("max_queue", 0, size)
+        self.table.add_column("min_queue", 0, size)
+        # Per entity: next buffer position, number of values, and the start
+        # and length of the maximum and minimum queues
+        self.table.add_column("counters", 0, 6)
+        # Per entity: mean and sum of squared deviations
+        self.table.add_column("moments", 0.0, 2)
+    
+    def snapshot(self) -> "RollingWindow":
+        """
+        Return a copy to save while this window keeps changing.
+        """
+        snapshot = copy.copy(self)
+        snapshot.table = self.table.snapshot()
+        return snapshot
+    
+    def push(self, record: Dict[str, Any]) -> None:
+        """
+        Add a record's value; records without a numeric value are skipped.
+        """
+        value = record.get(self.field)
+        if type(value) is not float and type(value) is not int or value != value:
+            return
+        if self.by is None:
+            key = None
+        elif self.by in record:
+            key = record[self.by]
+        else:
+            return
+        self._push(self.table.row(key), float(value))
+    
+    def extend(self, columns: Dict[str, Any]) -> None:
+        """
+        Add the values of a batch of records, given as columns.
+        """
+        if self.field not in columns or (self.by is not None and self.by not in columns):
+            return
+        values = _to_list(columns[self.field])
+        keys = _to_list(columns[self.by]) if self.by is not None else [None] * len(values)
+        row = self.table.row
+        for key, value in zip(keys, values):
+            if (type(value) is float or type(value) is int) and value == value:
+                self._push(row(key), float(value))
+    
+    def _push(self, row: int, value: float) -> None:
+        """
+        Add a value to an entity's buffer and update its aggregates.
+        """
+        size = self.size
+        columns = self.table.columns
+        values = columns["values"]
+        max_queue = columns["max_queue"]
+        min_queue = columns["min_queue"]
+        counters = columns["counters"]
+        moments = columns["moments"]
+        base = row * size
+        c = row * 6
+        m = row * 2
+        head, count, max_start, max_length, min_start, min_length = counters[c:c + 6]
+        mean = moments[m]
+        
+        if count == size:
+            # The value at head leaves the window, from the front of a queue if it is there
+            old = values[base + head]
+            if max_length and max_queue[base + max_start] == head:
+                max_start = (max_start + 1) % size
+                max_length -= 1
+            if min_length and min_queue[base + min_start] == head:
+                min_start = (min_start + 1) % size
+                min_length -= 1
+            new_mean = mean + (value - old) / size
+            moments[m + 1] = max(0.0, moments[m + 1] + (value - old) * (value - new_mean + old - mean))
+            moments[m] = new_mean
+        else:
+            count += 1
+            delta = value - mean
+            mean += delta / count
+            moments[m] = mean
+            moments[m + 1] += delta * (value - mean)
+        values[base + head] = value
+        
+        # Drop queued values the new one outlasts, then queue it
+        while max_length and values[base + max_queue[base + (max_start + max_length - 1) % size]] <= value:
+            max_length -= 1
+        max_queue[base + (max_start + max_length) % size] = head
+        max_length += 1
+        while min_length and values[base + min_queue[base + (min_start + min_length - 1) % size]] >= value:
+            min_length -= 1
+        min_queue[base + (min_start + min_length) % size] = head
+        min_length += 1
+        
+        head += 1
+        if head == size:
+            head = 0
+            if count == size:
+                self._recompute(row)
+        counters[c:c + 6] = array("q", (head, count, max_start, max_length, min_start, min_length))
+    
+    def _recompute(self, row: int) -> None:
+        """
+        Recompute an entity's mean and variance from its full buffer.
+        """
+        base = row * self.size
+        window = self.table.columns["values"][base:base + self.size]
+        mean = sum(window) / self.size
+        moments = self.table.columns["moments"]
+        moments[row * 2] = mean
+        moments[row * 2 + 1] = sum((value - mean) ** 2 for value in window)
+    
+    def _row(self, key: Hashable) -> Optional[int]:
+        """
+        Return the row of an entity with values, or None.
+        """
+        row = self.table.ids.get(key)
+        if row is None or self.table.columns["counters"][row * 6 + 1] == 0:
+            return None
+        return row
+    
+    def count(self, key: Hashable = None) -> int:
+        """
+        Return the number of values in the window.
+        """
+        row = self._row(key)
+        return 0 if row is None else self.table.columns["counters"][row * 6 + 1]
+    
+    def mean(self, key: Hashable = None, default: Any = None) -> Any:
+        """
+        Return the mean of the window, or default if it is empty.
+        """
+        row = self._row(key)
+        return default if row is None else self.table.columns["moments"][row * 2]
+    
+    def sum(self, key: Hashable = None) -> float:
+        """
+        Return the sum of the window.
+        """
+        row = self._row(key)
+        return 0.0 if row is None else self.table.columns["moments"][row * 2] * self.table.columns["counters"][row * 6 + 1]
+    
+    def variance(self, key: Hashable = None, default: Any = None) -> Any:
+        """
+        Return the sample variance of the window, or default if it holds
+        fewer than two values.
+        """
+        row = self._row(key)
+        if row is None:
+            return default
+        count = self.table.columns["counters"][row * 6 + 1]
+        return default if count < 2 else self.table.columns["moments"][row * 2 + 1] / (count - 1)
+    
+    def stdev(self, key: Hashable = None, default: Any = None) -> Any:
+        """
+        Return the sample standard deviation of the window, or default if it
+        holds fewer than two values.
+        """
+        variance = self.variance(key)
+        return default if variance is None else variance ** 0.5
+    
+    def min(self, key: Hashable = None, default: Any = None) -> Any:
+        """
+        Return the smallest value in the window, or default if it is empty.
+        """
+        return self._queue_front(key, "min_queue", 4, default)
+    
+    def max(self, key: Hashable = None, default: Any = None) -> Any:
+        """
+        Return the largest value in the window, or default if it is empty.
+        """
+        return self._queue_front(key, "max_queue", 2, default)
+    
+    def last(self, key: Hashable = None, default: Any = None) -> Any:
+        """
+        Return the newest value in the window, or default if it is empty.
+        """
+        row = self._row(key)
+        if row is None:
+            return default
+        head = self.table.columns["counters"][row * 6]
+        return self.table.columns["values"][row * self.size + (head - 1) % self.size]
+    
+    def values(self, key: Hashable = None) -> List[float]:
+        """
+        Return the values in the window, oldest first; takes O(size).
+        """
+        row = self._row(key)
+        if row is None:
+            return []
+        head, count = self.table.columns["counters"][row * 6:row * 6 + 2]
+        base = row * self.size
+        window = self.table.columns["values"][base:base + self.size].tolist()
+        return window[head:] + window[:head] if count == self.size else window[:count]
+    
+    def _queue_front(self, key: Hashable, queue: str, offset: int, default: Any) -> Any:
+        """
+        Return the value at the front of an entity's minimum or maximum queue.
+        """
+        row = self._row(key)
+        if row is None:
+            return default
+        base = row * self.size
+        start = self.table.columns["counters"][row * 6 + offset]
+        return self.table.columns["values"][base + self.table.columns[queue][base + start]]
+
+def _to_list(column: Any) -> List[Any]:
+    """
+    Return a column's values as a list, converting NumPy arrays.
+    """
+    return column.tolist() if hasattr(column, "tolist") else list(column)
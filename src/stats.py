@@ -0,0 +1,154 @@
+"""
+Runtime statistics for simulation streams.
+"""
+import time
+from typing import Dict, Any, Iterable, List, Optional
+
+# Snapshot keys combined with max() instead of summed when merging
+_MAX_KEYS = {"elapsed"}
+
+class ConnectorStats:
+    """
+    Counters for a single output connector of a stream.
+    """
+    
+    def __init__(self):
+        """Initialize the counters."""
+        self.records = 0
+        self.bytes = 0
+        self.errors = 0
+        self.dropped = 0
+        self.spilled = 0
+        self.depth = None
+    
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Return the counters as a plain, picklable dict.
+        """
+        return {
+            "records": self.records,
+            "bytes": self.bytes,
+            "errors": self.errors,
+            "dropped": self.dropped,
+            "spilled": self.spilled,
+            "queued": self.depth() if self.depth is not None else 0,
+        }
+
+class StreamStats:
+    """
+    Counters for a single stream.
+    """
+    
+    def __init__(self):
+        """Initialize the counters."""
+        self.records = 0
+        self.errors = 0
+        self.bytes = 0
+        self.connectors = {}
+        self._started = None
+        self._stopped = None
+    
+    def add_connector(self, label: str) -> ConnectorStats:
+        """
+        Register a connector and return its counters.
+        """
+        stats = ConnectorStats()
+        self.connectors[label] = stats
+        return stats
+    
+    def start(self) -> None:
+        """Mark the stream as started."""
+        self._started = time.monotonic()
+    
+    def stop(self) -> None:
+        """Mark the stream as stopped, keeping the first stop time."""
+        if self._stopped is None:
+            self._stopped = time.monotonic()
+    
+    @property
+    def elapsed(self) -> float:
+        """Seconds the stream has been running."""
+        if self._started is None:
+            return 0.0
+        end = self._stopped if self._stopped is not None else time.monotonic()
+        return end - self._started
+    
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Return the counters as a plain, picklable dict.
+        """
+        return {
+            "records": self.records,
+            "errors": self.errors,
+            "bytes": self.bytes,
+            "elapsed": self.elapsed,
+            "connectors": {
+                label: stats.snapshot() for label, stats in self.connectors.items()
+            },
+        }
+
+def merge_snapshots(snapshots: Iterable[Dict[str, Dict[str, Any]]]) -> Dict[str, Dict[str, Any]]:
+    """
+    Combine per-stream snapshots reported by several schedulers.
+    
+    Counters are summed, elapsed times take the maximum and nested
+    connector counters are merged the same way.
+    
+    Args:
+        snapshots: Mappings of stream name to StreamStats snapshot
+    
+    Returns:
+        Mapping of stream name to the combined counters
+    """
+    totals = {}
+    for snapshot in snapshots:
+        for stream_name, counters in snapshot.items():
+            _merge_into(totals.setdefault(stream_name, {}), counters)
+    
+    return totals
+
+def _merge_into(totals: Dict[str, Any], counters: Dict[str, Any]) -> None:
+    """
+    Merge one set of counters into running totals.
+    """
+    for key, value in counters.items():
+        if isinstance(value, dict):
+            nested = totals.setdefault(key, {})
+            for label, nested_counters in value.items():
+                _merge_into(nested.setdefault(label, {}), nested_counters)
+        elif key in _MAX_KEYS:
+            totals[key] = max(totals.get(key, 0), value)
+        else:
+            totals[key] = totals.get(key, 0) + value
+
+def format_summary(totals: Dict[str, Dict[str, Any]]) -> List[str]:
+    """
+    Format per-stream and per-connector totals as summary lines.
+    """
+    lines = []
+    for stream_name, counters in totals.items():
+        elapsed = counters.get("elapsed", 0.0)
+        lines.append(
+            f"Stream {stream_name}: {counters['records']} records, "
+            f"{counters.get('bytes', 0)} bytes, {_rate(counters['records'], elapsed)} records/s, "
+            f"{counters.get('errors', 0)} errors in {elapsed:.2f}s"
+        )
+        for label, connector in counters.get("connectors", {}).items():
+            line = (
+                f"  {label}: {connector['records']} records, {connector['bytes']} bytes, "
+                f"{_rate(connector['records'], elapsed)} records/s"
+            )
+            for key in ("errors", "dropped", "spilled", "queued"):
+                if connector.get(key):
+                    line += f", {connector[key]} {key}"
+            lines.append(line)
+    
+    return lines
+
+def _rate(records: int, elapsed: Optional[float]) -> str:
+    """
+    Format a records-per-second figure.
+    """
+    if not elapsed:
+        return "n/a"
+    return f"{records / elapsed:.1f}"
@@ -0,0 +1,402 @@
+"""
+Multi-process execution of a simulation across worker processes.
+
+Streams are spread over the workers, and streams fast enough to be worth
+splitting are sharded: each shard runs a fraction of the stream's rate
+with its own seed and a disjoint, interleaved range of sequence_int values.
+Streams with stateful fields or windows are never sharded, since shards
+cannot share their state.
+"""
+import asyncio
+import copy
+import logging
+import math
+import multiprocessing
+import os
+import queue
+import signal
+import time
+from typing import Dict, Any, List, Optional
+
+from .clock import MAX_SPEED
+from .config import get_limit, get_clock, has_stream_state
+from .formatters.csv_format import csv_header
+from .outputs.columnar import COLUMNAR_TYPES
+from .outputs.partitioned import DEFAULT_PARTITION_PATH
+from .pacing import UNTHROTTLED
+from .rate_profile import scale_rate_profile
+from .stats import merge_snapshots
+
+logger = logging.getLogger(__name__)
+
+# Streams below this rate are never split automatically
+MIN_SHARD_RATE = 1000.0
+
+# Seconds between stats reports from each worker
+STATS_INTERVAL = 1.0
+
+# Seconds between aggregated stats log lines in the parent
+LOG_INTERVAL = 10.0
+
+def plan_shards(config: Dict[str, Any], workers: int) -> List[Dict[str, Any]]:
+    """
+    Split a configuration into one configuration per worker.
+    
+    A stream is split into `shards` pieces when it sets that key, or
+    automatically when its rate is at least MIN_SHARD_RATE and above an
+    even share of the total rate; streams with rate: max are split across
+    every worker. Streams with state are only split when they ask to, which
+    validation refuses. Shards are then assigned to the least loaded worker,
+    largest first.
+    
+    Args:
+        config: Full simulator configuration
+        workers: Number of worker processes
+    
+    Returns:
+        Worker configurations; workers left without streams are omitted
+    """
+    streams = {}
+    for stream_name, stream_config in config["streams"].items():
+        # Resolve global limits and clocks before they are split between shards
+        stream_config = dict(stream_config)
+        for key in ("count", "duration"):
+            value = get_limit(config, stream_config, key)
+            if value is not None:
+                stream_config[key] = value
+        clock_config = get_clock(config, stream_config)
+        if clock_config is not None:
+            stream_config["clock"] = clock_config
+        streams[stream_name] = stream_config
+    
+    total_rate = sum(_load(stream_config) for stream_config in streams.values()
+                     if _load(stream_config) != math.inf)
+    fair_share = total_rate / workers
+    
+    shards = []
+    for stream_name, stream_config in streams.items():
+        rate = _load(stream_config)
+        count = stream_config.get("shards")
+        if count is None:
+            count = 1
+            if has_stream_state(stream_config):
+                if rate == math.inf or (rate >= MIN_SHARD_RATE and rate > fair_share):
+                    logger.info(f"Stream {stream_name} keeps state across records, so it runs unsharded")
+            elif rate == math.inf:
+                count = workers
+            elif rate >= MIN_SHARD_RATE and rate > fair_share:
+                count = min(workers, math.ceil(rate / fair_share))
+        
+        base_seed = stream_config.get("seed")
+        if base_seed is None:
+            base_seed = int.from_bytes(os.urandom(4), "big")
+        
+        for index in range(count):
+            shard_config = _shard_stream(stream_config, index, count, base_seed)
+            if shard_config is not None:
+                shards.append((stream_name, shard_config))
+    
+    loads = [0.0] * workers
+    worker_streams = [{} for _ in range(workers)]
+    for stream_name, shard_config in sorted(shards, key=lambda shard: -_load(shard[1])):
+        worker = loads.index(min(loads))
+        loads[worker] += _load(shard_config)
+        worker_streams[worker][_shard_name(stream_name, shard_config)] = shard_config
+    
+    worker_configs = []
+    for streams_for_worker in worker_streams:
+        if streams_for_worker:
+            worker_config = {key: value for key, value in config.items() if key != "streams"}
+            worker_config["streams"] = streams_for_worker
+            worker_configs.append(worker_config)
+    
+    return worker_configs
+
+def _load(stream_config: Dict[str, Any]) -> float:
+    """
+    Weight of a stream or shard when balancing workers: the rate at which
+    it actually produces records.
+    """
+    rate = stream_config["rate"]
+    speed = stream_config.get("clock", {}).get("speed", 1.0)
+    if rate == UNTHROTTLED or speed == MAX_SPEED:
+        return math.inf
+    return rate * speed
+
+def _shard_stream(stream_config: Dict[str, Any], index: int, count: int, base_seed: int) -> Optional[Dict[str, Any]]:
+    """
+    Build the configuration of one shard of a stream.
+    
+    Returns:
+        The shard configuration, or None if the shard has no records to emit
+    """
+    shard_config = copy.deepcopy(stream_config)
+    shard_config["seed"] = base_seed + index
+    shard_config["shard"] = {"index": index, "count": count}
+    shard_config.pop("shards", None)
+    
+    if count == 1:
+        return shard_config
+    
+    if stream_config["rate"] != UNTHROTTLED:
+        shard_config["rate"] = stream_config["rate"] / count
+        if "rate_profile" in stream_config:
+            shard_config["rate_profile"] = scale_rate_profile(stream_config["rate_profile"], 1 / count)
+    
+    # Split a record limit so the shards emit exactly the requested total
+    if "count" in stream_config:
+        total = stream_config["count"]
+        shard_config["count"] = total // count + (1 if index < total % count else 0)
+        if shard_config["count"] == 0:
+            return None
+    
+    # Interleave sequences and give Snowflake IDs a worker per shard so IDs stay unique across shards
+    for field_config in shard_config["schema"].values():
+        if isinstance(field_config, dict) and field_config.get("type") == "sequence_int":
+            step = field_config.get("step", 1)
+            field_config["start"] = field_config.get("start", 0) + index * step
+            field_config["step"] = step * count
+        elif isinstance(field_config, dict) and field_config.get("type") == "snowflake":
+            field_config["worker_id"] = field_config.get("worker_id", 0) * count + index
+    
+    # Shards share plain file outputs, which run_workers truncates up front;
+    # compressed, rotating, partitioned and columnar files cannot be, so each shard gets its own
+    for output_config in shard_config["outputs"]:
+        if output_config.get("type") == "partitioned_file":
+            output_config["path"] = _shard_filename(output_config.get("path", DEFAULT_PARTITION_PATH), index)
+            continue
+        if output_config.get("type") in COLUMNAR_TYPES:
+            filename = output_config.get("filename", f"output.{output_config['type']}")
+            output_config["filename"] = _shard_filename(filename, index)
+            continue
+        if output_config.get("type") != "file":
+            continue
+        if output_config.get("compression") or _rotates(output_config):
+            output_config["filename"] = _shard_filename(output_config.get("filename", "output.txt"), index)
+            continue
+        if not output_config.get("append", True):
+            output_config["append"] = True
+            output_config["truncate"] = True
+        if output_config.get("format") == "csv" and output_config.get("csv", {}).get("header"):
+            # The header of a shared file is written once, up front
+            output_config["csv"] = dict(output_config["csv"], header=False)
+            output_config["header"] = csv_header(shard_config["schema"])
+    
+    # A one-off event should fire once, not once per shard
+    if index > 0 and "events" in shard_config:
+        shard_config["events"] = [
+            event for event in shard_config["events"] if "at_count" not in event
+        ]
+    
+    return shard_config
+
+def _rotates(output_config: Dict[str, Any]) -> bool:
+    """
+    Whether a file output starts new files as it runs.
+    """
+    return bool(
+        output_config.get("rotate_bytes")
+        or output_config.get("rotate_interval")
+        or "{date}" in output_config.get("filename", "")
+    )
+
+def _shard_filename(filename: str, index: int) -> str:
+    """
+    Give a shard its own file, e.g. events-{seq}.json.gz -> events-{seq}-0.json.gz.
+    """
+    directory, name = os.path.split(filename)
+    stem, dot, extension = name.partition(".")
+    return os.path.join(directory, f"{stem}-{index}{dot}{extension}")
+
+def _shard_name(stream_name: str, shard_config: Dict[str, Any]) -> str:
+    """
+    Name a shard so several shards of a stream can share a worker.
+    """
+    shard = shard_config["shard"]
+    if shard["count"] == 1:
+        return stream_name
+    return f"{stream_name}#{shard['index']}"
+
+def _stream_name(shard_name: str) -> str:
+    """
+    Map a shard name back to the stream it belongs to.
+    """
+    return shard_name.split("#", 1)[0]
+
+def _raise_interrupt() -> None:
+    """
+    Signal handler that stops the running event loop like Ctrl+C.
+    """
+    raise KeyboardInterrupt
+
+def _worker_main(index: int, config: Dict[str, Any], stats_queue: Any, resume: bool = False) -> None:
+    """
+    Entry point of a worker process.
+    """
+    from .scheduler import Scheduler
+    
+    # The parent handles shutdown; workers only stop when told to
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, lambda signum, frame: _raise_interrupt())
+    
+    scheduler = Scheduler(config, resume)
+    
+    async def report() -> None:
+        while True:
+            await asyncio.sleep(STATS_INTERVAL)
+            stats_queue.put((index, scheduler.snapshot_stats(), False))
+    
+    async def run() -> None:
+        reporter = asyncio.create_task(report())
+        try:
+            await scheduler.run()
+        finally:
+            reporter.cancel()
+    
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        stats_queue.put((index, scheduler.snapshot_stats(), True))
+
+def run_workers(config: Dict[str, Any], workers: int, resume: bool = False) -> Dict[str, Dict[str, Any]]:
+    """
+    Run the simulation across worker processes until every stream
+    reaches its limits or the run is interrupted.
+    
+    The parent supervises the workers: it aggregates their stats, logs
+    the combined rate of every stream and stops all workers as soon as
+    one of them fails, since a restarted worker would repeat the IDs
+    it already emitted.
+    
+    Args:
+        config: Full simulator configuration
+        workers: Number of worker processes
+        resume: Continue every shard from its checkpoint
+    
+    Returns:
+        Final per-stream totals
+    
+    Raises:
+        RuntimeError: If a worker process fails
+    """
+    worker_configs = plan_shards(config, workers)
+    _prepare_shared_files(worker_configs)
+    stats_queue = multiprocessing.Queue()
+    processes = []
+    for index, worker_config in enumerate(worker_configs):
+        process = multiprocessing.Process(
+            target=_worker_main,
+            args=(index, worker_config, stats_queue, resume),
+            name=f"stream-sim-worker-{index}",
+            daemon=True
+        )
+        process.start()
+        processes.append(process)
+        logger.info(f"Started worker {index} with streams: {', '.join(worker_config['streams'])}")
+    
+    previous_handler = signal.signal(signal.SIGTERM, lambda signum, frame: _raise_interrupt())
+    latest = {}
+    finished = set()
+    failed = None
+    last_log = time.monotonic()
+    last_totals = {}
+    
+    try:
+        while len(finished) < len(processes):
+            _drain_stats(stats_queue, latest, finished, timeout=STATS_INTERVAL)
+            
+            for index, process in enumerate(processes):
+                if index not in finished and not process.is_alive():
+                    # Collect the final report the worker may have sent
+                    _drain_stats(stats_queue, latest, finished, timeout=0)
+                    if index not in finished or process.exitcode != 0:
+                        failed = index
+                        break
+            if failed is not None:
+                logger.error(f"Worker {failed} exited with code {processes[failed].exitcode}, stopping all workers")
+                break
+            
+            now = time.monotonic()
+            if now - last_log >= LOG_INTERVAL:
+                totals = _totals(latest)
+                _log_rates(totals, last_totals, now - last_log)
+                last_totals = totals
+                last_log = now
+    except KeyboardInterrupt:
+        logger.info("Stopping workers")
+    finally:
+        signal.signal(signal.SIGTERM, previous_handler)
+        # Workers that sent their final report are already shutting down
+        for index, process in enumerate(processes):
+            if index not in finished and process.is_alive():
+                process.terminate()
+        deadline = time.monotonic() + 5.0
+        for process in processes:
+            process.join(max(0.0, deadline - time.monotonic()))
+            if process.is_alive():
+                process.kill()
+        _drain_stats(stats_queue, latest, finished, timeout=0)
+    
+    totals = _totals(latest)
+    
+    if failed is not None:
+        raise RuntimeError(f"Worker {failed} failed")
+    
+    return totals
+
+def _prepare_shared_files(worker_configs: List[Dict[str, Any]]) -> None:
+    """
+    Truncate file outputs shared by shards that must not append to old data,
+    and write the CSV header of shared files that are empty.
+    """
+    for worker_config in worker_configs:
+        for stream_config in worker_config["streams"].values():
+            for output_config in stream_config["outputs"]:
+                truncate = output_config.pop("truncate", False)
+                header = output_config.pop("header", None)
+                if not truncate and header is None:
+                    continue
+                filename = output_config.get("filename", "output.txt")
+                directory = os.path.dirname(filename)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                with open(filename, "w" if truncate else "a", encoding="utf-8") as f:
+                    if header is not None and f.tell() == 0:
+                        f.write(header + "\n")
+
+def _drain_stats(stats_queue: Any, latest: Dict[int, Dict[str, Any]], finished: set, timeout: float) -> None:
+    """
+    Read every pending stats report, waiting up to timeout for the first.
+    """
+    block = timeout > 0
+    while True:
+        try:
+            index, snapshot, final = stats_queue.get(block, timeout if block else None)
+        except queue.Empty:
+            return
+        latest[index] = snapshot
+        if final:
+            finished.add(index)
+        block = False
+
+def _totals(latest: Dict[int, Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    """
+    Sum the latest worker reports per stream, folding shards together.
+    """
+    return merge_snapshots(
+        {_stream_name(shard_name): counters}
+        for snapshot in latest.values()
+        for shard_name, counters in snapshot.items()
+    )
+
+def _log_rates(totals: Dict[str, Dict[str, Any]], previous: Dict[str, Dict[str, Any]], elapsed: float) -> None:
+    """
+    Log the combined rate of every stream since the previous log line.
+    """
+    for stream_name, counters in totals.items():
+        before = previous.get(stream_name, {}).get("records", 0)
+        rate = (counters["records"] - before) / elapsed
+        logger.info(f"Stream {stream_name}: {rate:.1f} records/s ({counters['records']} total)")
@@ -0,0 +1,65 @@
+import io
+import struct
+import uuid
+
+import pytest
+
+fastavro = pytest.importorskip("fastavro")
+
+from src.formatters.avro_format import avro_schema, compile_avro
+from src.generators.plan import compile_schema
+
+SCHEMA = {
+    "id": {"type": "sequence_int", "start": -3},
+    "big": {"type": "random_int", "min": -(1 << 62), "max": 1 << 62},
+    "price": {"type": "gaussian", "mean": 0, "stddev": 1e6},
+    "level": {"type": "choice", "values": ["LOW", "HIGH"]},
+    "city": {"type": "choice", "values": ["São Paulo", "東京"]},
+    "flag": {"type": "choice", "values": [True, False]},
+    "key": {"type": "uuid"},
+    "raw": {"type": "ulid", "format": "bytes"},
+    "snowflake": {"type": "snowflake"},
+    "at": {"type": "timestamp", "format": "epoch"},
+    "mixed": {"type": "dependent", "field": "id", "func": "lambda id: [None, True, id, id / 2, str(id)][id % 5]"},
+    "site": "north",
+}
+
+EVENTS = [{"record": {"level": "CRITICAL", "id": None}}]
+
+def decode(data, schema):
+    return fastavro.schemaless_reader(io.BytesIO(data), fastavro.parse_schema(schema))
+
+def normalize(record):
+    return {name: str(value) if isinstance(value, uuid.UUID) else value for name, value in record.items()}
+
+def test_records_decode_with_a_reference_reader():
+    plan = compile_schema(SCHEMA, seed=4)
+    encode = compile_avro(SCHEMA, {}, EVENTS)
+    records = [plan.generate({}, i) for i in range(50)]
+    for record, data in zip(records, encode.encode_many(records)):
+        assert normalize(decode(data, encode.schema)) == record
+
+def test_event_records_leave_fields_null():
+    encode = compile_avro(SCHEMA, {}, EVENTS)
+    decoded = decode(encode({"level": "CRITICAL"}), encode.schema)
+    assert decoded["level"] == "CRITICAL"
+    assert all(value is None for name, value in decoded.items() if name != "level")
+
+def test_schema_types():
+    fields = {field["name"]: field["type"] for field in avro_schema(SCHEMA, events=EVENTS)["fields"]}
+    assert fields["level"][1]["symbols"] == ["LOW", "HIGH", "CRITICAL"]
+    assert fields["city"] == ["null", "string"]
+    assert fields["key"] == ["null", {"type": "string", "logicalType": "uuid"}]
+    assert fields["raw"] == ["null", "bytes"]
+    assert fields["snowflake"] == ["null", "long"]
+
+def test_confluent_wire_format_prefixes_the_schema_id():
+    encode = compile_avro({"n": 1}, {"wire_format": "confluent", "schema_id": 42})
+    data = encode({"n": 1})
+    assert data[:5] == b"\x00" + struct.pack(">I", 42)
+    assert decode(data[5:], encode.schema) == {"n": 1}
+
+def test_unknown_enum_values_are_rejected():
+    encode = compile_avro({"level": {"type": "choice", "values": ["LOW"]}}, {})
+    with pytest.raises(ValueError, match="enum"):
+        encode({"level": "HIGH"})
@@ -0,0 +1,107 @@
+import asyncio
+import json
+import subprocess
+import sys
+
+import pytest
+import yaml
+
+from src.checkpoint import Checkpointer, snapshot_state
+from src.scheduler import Scheduler
+from src.state import KeyedState, RollingWindow
+
+def stream_config(tmp_path, count, vectorized=False):
+    return {
+        "checkpoint": {"path": str(tmp_path / "checkpoints")},
+        "streams": {"ticks": {
+            "rate": 1000,
+            "count": count,
+            "seed": 7,
+            "vectorized": vectorized,
+            "clock": {"start_time": "2024-01-01T00:00:00Z", "speed": "max"},
+            "windows": {"recent": {"field": "price", "size": 5, "by": "symbol"}},
+            "schema": {
+                "id": {"type": "sequence_int"},
+                "at": {"type": "timestamp", "format": "epoch"},
+                "symbol": {"type": "choice", "values": ["a", "b", "c"]},
+                "noise": {"type": "gaussian", "mean": 0, "stddev": 1},
+                "price": {"type": "stateful", "state_key": "price_{symbol}", "initial": 100.0,
+                          "update_func": "lambda price, count: round(price + random.uniform(-1, 1), 2)"},
+                "avg": {"type": "dependent", "field": "symbol",
+                        "func": "lambda symbol: state['recent'].mean(symbol, 0.0)"},
+            },
+            "outputs": [{"type": "file", "format": "json", "filename": str(tmp_path / "out.json")}],
+        }},
+    }
+
+def run(config, resume=False):
+    asyncio.run(Scheduler(config, resume).run())
+
+def lines(path):
+    return path.read_text().splitlines()
+
+def test_resumed_stream_continues_where_it_stopped(tmp_path):
+    straight, split = tmp_path / "straight", tmp_path / "split"
+    run(stream_config(straight, 300))
+    run(stream_config(split, 120))
+    run(stream_config(split, 300), resume=True)
+
+    expected = lines(straight / "out.json")
+    assert len(expected) == 300
+    assert lines(split / "out.json") == expected
+    assert [json.loads(line)["id"] for line in expected] == list(range(300))
+
+def test_resumed_vectorized_stream_is_reproducible(tmp_path):
+    pytest.importorskip("numpy")
+    # Column draws depend on batch sizes, so compare two runs stopped at the same count
+    for directory in ("first", "second"):
+        run(stream_config(tmp_path / directory, 120, True))
+        run(stream_config(tmp_path / directory, 300, True), resume=True)
+
+    records = [json.loads(line) for line in lines(tmp_path / "first" / "out.json")]
+    assert lines(tmp_path / "first" / "out.json") == lines(tmp_path / "second" / "out.json")
+    assert [record["id"] for record in records] == list(range(300))
+    assert [record["at"] for record in records] == sorted(record["at"] for record in records)
+
+def test_resume_from_the_command_line(tmp_path):
+    config = stream_config(tmp_path, None)
+    del config["streams"]["ticks"]["count"]
+    config_path = tmp_path / "config.yml"
+    config_path.write_text(yaml.safe_dump(config, sort_keys=False))
+    command = [sys.executable, "-m", "src", "-c", str(config_path)]
+    subprocess.run(command + ["--count", "50"], check=True, capture_output=True)
+    subprocess.run(command + ["--count", "80", "--resume"], check=True, capture_output=True)
+    assert [json.loads(line)["id"] for line in lines(tmp_path / "out.json")] == list(range(80))
+
+    del config["checkpoint"]
+    config_path.write_text(yaml.safe_dump(config, sort_keys=False))
+    result = subprocess.run(command + ["--resume"], capture_output=True, text=True)
+    assert result.returncode == 1 and "needs a checkpoint section" in result.stderr
+
+def test_snapshots_are_independent_of_the_live_state():
+    table = KeyedState()
+    table.add_column("n", 0)
+    window = RollingWindow("v", 3)
+    state = {"counter": 1, "items": [1], "table": table, "recent": window, "_last_record": {"v": 1}}
+    snapshot = snapshot_state(state)
+    state["items"].append(2)
+    table.row("new")
+    window.push({"v": 5.0})
+    assert snapshot["items"] == [1] and "new" not in snapshot["table"].ids and snapshot["recent"].count() == 0
+    assert snapshot["_last_record"] is state["_last_record"]
+
+def test_checkpoints_round_trip(tmp_path):
+    checkpointer = Checkpointer({"path": str(tmp_path / "checkpoints")})
+    checkpoint = {"record_count": 3, "state": {"sequence__default": 3}, "clock": None, "random": (1, 2)}
+    asyncio.run(checkpointer.save({"a/b": checkpoint}))
+    assert not checkpointer.changed("a/b", 3)
+
+    loaded = Checkpointer({"path": str(tmp_path / "checkpoints")}).load("a/b")
+    assert loaded == dict(checkpoint, version=1)
+    assert Checkpointer({"path": str(tmp_path / "checkpoints")}).load("missing") is None
+
+def test_unreadable_checkpoints_are_refused(tmp_path):
+    checkpointer = Checkpointer({"path": str(tmp_path)})
+    (tmp_path / "s.ckpt").write_bytes(b"not a pickle")
+    with pytest.raises(ValueError, match="cannot read checkpoint"):
+        checkpointer.load("s")
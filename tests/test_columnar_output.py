@@ -0,0 +1,113 @@
+import asyncio
+
+import pytest
+
+pa = pytest.importorskip("pyarrow")
+pq = pytest.importorskip("pyarrow.parquet")
+
+from src.clock import WallClock
+from src.generators import compile_schema
+from src.generators.batch import ColumnarBatch
+from src.outputs.columnar import ArrowConnector, ColumnarConnector, ParquetConnector
+
+SCHEMA = {
+    "local": {"type": "timestamp"},
+    "utc": {"type": "timestamp", "timezone": "utc"},
+    "epoch": {"type": "timestamp", "format": "epoch"},
+    "n": {"type": "sequence_int"},
+}
+
+def write(connector, rows):
+    connector.set_schema(SCHEMA)
+
+    async def run():
+        await connector.send(ColumnarBatch.from_rows(rows, list(SCHEMA)))
+        await connector.close()
+
+    asyncio.run(run())
+
+def records(n):
+    plan = compile_schema(SCHEMA, clock=WallClock())
+    state = {}
+    return [plan.generate(state, i + 1) for i in range(n)]
+
+def test_timestamps_keep_their_timezone(tmp_path):
+    rows = records(3)
+    filename = str(tmp_path / "out.parquet")
+    write(ParquetConnector({"type": "parquet", "filename": filename}), rows)
+
+    table = pq.read_table(filename)
+    assert table.schema.field("local").type == pa.timestamp("us")
+    assert table.schema.field("utc").type == pa.timestamp("us", tz="UTC")
+    assert table.column("local").null_count == table.column("utc").null_count == 0
+    assert [value.isoformat() for value in table.column("local").to_pylist()] == [row["local"] for row in rows]
+    assert [value.isoformat() for value in table.column("utc").to_pylist()] == [row["utc"] for row in rows]
+    assert table.column("n").to_pylist() == [0, 1, 2]
+
+def test_arrow_file_round_trips_rows(tmp_path):
+    rows = records(5)
+    filename = str(tmp_path / "out.arrow")
+    write(ArrowConnector({"type": "arrow", "filename": filename, "row_group_size": 2}), rows)
+
+    with pa.ipc.open_file(filename) as reader:
+        table = reader.read_all()
+        assert reader.num_record_batches == 3
+    assert table.column("n").to_pylist() == [row["n"] for row in rows]
+    assert [int(value.timestamp()) for value in table.column("epoch").to_pylist()] == [row["epoch"] for row in rows]
+
+def test_base_class_needs_a_writer():
+    with pytest.raises(TypeError):
+        ColumnarConnector({"type": "parquet"})
+
+MIXED = {
+    "id": {"type": "sequence_int"},
+    "key": {"type": "uuid", "format": "bytes"},
+    "flake": {"type": "snowflake"},
+    "level": {"type": "choice", "values": ["low", "high"]},
+    "reading": {"type": "gaussian"},
+    "label": {"type": "dependent", "field": "id", "func": "lambda id: id * 2"},
+}
+
+def write_batches(connector, schema, batches, events=None):
+    connector.set_schema(schema, events)
+
+    async def run():
+        await connector.send_batch(batches)
+        await connector.close()
+
+    asyncio.run(run())
+
+def test_schema_types_and_dictionaries(tmp_path, caplog):
+    plan = compile_schema(MIXED, seed=1)
+    state = {}
+    rows = [plan.generate(state, i) for i in range(4)]
+    rows[1]["level"] = "alert"
+    rows[2]["level"] = "unknown"
+    filename = str(tmp_path / "out.parquet")
+    write_batches(ParquetConnector({"type": "parquet", "filename": filename}), MIXED,
+                  [ColumnarBatch.from_rows(rows[:2], list(MIXED)), ColumnarBatch.from_rows(rows[2:], list(MIXED))],
+                  [{"record": {"level": "alert"}}])
+
+    table = pq.read_table(filename)
+    assert table.schema.field("key").type == pa.binary(16)
+    assert table.schema.field("flake").type == pa.int64()
+    assert table.schema.field("level").type == pa.dictionary(pa.int32(), pa.string())
+    assert table.schema.field("label").type == pa.int64()
+    assert table.column("key").to_pylist() == [row["key"] for row in rows]
+    assert table.column("level").to_pylist() == [rows[0]["level"], "alert", None, rows[3]["level"]]
+    assert "values outside its choices" in caplog.text
+
+def test_vectorized_batches_are_written_column_by_column(tmp_path):
+    pytest.importorskip("numpy")
+    from src.generators.batch import compile_batch
+
+    schema = {name: config for name, config in MIXED.items() if name != "label"}
+    plan = compile_batch(schema, seed=2)
+    state = {}
+    batches = [plan.generate(state, i * 100, 100) for i in range(3)]
+    filename = str(tmp_path / "out.arrow")
+    write_batches(ArrowConnector({"type": "arrow", "filename": filename}), schema, batches)
+    with pa.ipc.open_file(filename) as reader:
+        table = reader.read_all()
+    assert table.column("id").to_pylist() == list(range(300))
+    assert table.column("reading").to_pylist() == [row["reading"] for batch in batches for row in batch.rows()]
@@ -0,0 +1,48 @@
+import pytest
+
+from src.config import validate_stream_config
+
+def stream(output):
+    return {"schema": {"id": {"type": "sequence_int"}}, "rate": 10, "outputs": [output]}
+
+@pytest.mark.parametrize("output", [
+    {"type": "file", "format": "msgpack"},
+    {"type": "stdout", "format": "avro"},
+    {"type": "partitioned_file", "format": "msgpack"},
+    {"type": "http", "format": "msgpack", "url": "http://localhost", "batch_size": 10},
+    {"type": "http", "format": "avro", "url": "http://localhost", "method": "get"},
+])
+def test_binary_formats_rejected_on_newline_framed_outputs(output):
+    with pytest.raises(ValueError, match="binary"):
+        validate_stream_config("s", stream(output))
+
+@pytest.mark.parametrize("output", [
+    {"type": "kafka", "format": "avro", "topic": "t"},
+    {"type": "http", "format": "msgpack", "url": "http://localhost"},
+    {"type": "file", "format": "json"},
+])
+def test_binary_formats_allowed_on_message_outputs(output):
+    validate_stream_config("s", stream(output))
+
+def id_stream(*outputs):
+    return {"schema": {"id": {"type": "ulid", "format": "bytes"}}, "rate": 10, "outputs": list(outputs)}
+
+@pytest.mark.parametrize("output", [
+    {"type": "kafka", "format": "json", "topic": "t"},
+    {"type": "file", "format": "csv"},
+])
+def test_bytes_ids_rejected_on_text_formats(output):
+    with pytest.raises(ValueError, match="holds bytes"):
+        validate_stream_config("s", id_stream({"type": "kafka", "format": "msgpack", "topic": "t"}, output))
+
+def test_bytes_ids_allowed_on_binary_formats():
+    validate_stream_config("s", id_stream(
+        {"type": "kafka", "format": "msgpack", "topic": "t"},
+        {"type": "kafka", "format": "avro", "topic": "t"},
+        {"type": "parquet"},
+    ))
+
+@pytest.mark.parametrize("value", [0, -1, 1.5, "10", True])
+def test_max_outstanding_must_be_a_positive_integer(value):
+    with pytest.raises(ValueError, match="max_outstanding"):
+        validate_stream_config("s", stream({"type": "kafka", "format": "json", "topic": "t", "max_outstanding": value}))
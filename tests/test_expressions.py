@@ -0,0 +1,56 @@
+import random
+
+import pytest
+
+from src.generators.expressions import compile_expression
+
+def test_fields_state_and_count_are_bound():
+    func = compile_expression("lambda price: round(price * quantity + state['fee'] + count, 2)", 1, ["quantity"])
+    assert func(2.5, {"quantity": 4}, {"fee": 1}, 3) == 14.0
+    assert func.fields == {"quantity"}
+
+def test_random_is_the_given_generator():
+    func = compile_expression("lambda x: random.random()", 1, rng=random.Random(5))
+    assert func(0, {}, {}, 0) == random.Random(5).random()
+
+@pytest.mark.parametrize("source", [
+    "lambda x: x.__class__",
+    "lambda x: x._private",
+    "lambda x: _record",
+    "lambda x: '{0.__class__}'.format(x)",
+    "lambda x: '{x}'.format_map(state)",
+    "lambda x: type.mro(x)",
+    "lambda x: int.mro()",
+])
+def test_underscore_and_format_access_is_blocked(source):
+    with pytest.raises(ValueError, match="not allowed|not defined"):
+        compile_expression(source, 1)
+
+@pytest.mark.parametrize("source", [
+    "lambda x: (abs := x)",
+    "lambda x: [abs for abs in x]",
+    "lambda x: (lambda abs: abs)(x)",
+    "lambda x: __import__('os')",
+    "lambda x: open('/etc/passwd')",
+    "lambda x: getattr(x, 'real')",
+])
+def test_builtins_cannot_be_shadowed_or_reached(source):
+    with pytest.raises(ValueError):
+        compile_expression(source, 1)
+
+def test_expressions_do_not_share_builtins():
+    first = compile_expression("lambda x: abs(x)", 1)
+    first.__globals__["__builtins__"]["abs"] = str
+    second = compile_expression("lambda y: abs(y)", 1)
+    assert second(-1, {}, {}, 0) == 1
+
+@pytest.mark.parametrize("source, arity", [
+    ("abs(1)", 1),
+    ("lambda x, y: x", 1),
+    ("lambda *x: x", 1),
+    ("lambda _x: 1", 1),
+    ("lambda x: (", 1),
+])
+def test_malformed_lambdas_are_rejected(source, arity):
+    with pytest.raises(ValueError):
+        compile_expression(source, arity)
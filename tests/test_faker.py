@@ -0,0 +1,54 @@
+import itertools
+import random
+import time
+
+import pytest
+
+from src.generators.context import GeneratorContext
+from src.generators.faker import FakerPool, compile_faker
+
+def draws(n, pause_every=None):
+    counter = itertools.count()
+    pool = FakerPool(lambda: next(counter), {}, 50, 0.5, random.Random(1))
+    values = []
+    for i in range(n):
+        if pause_every and i % pause_every == 0:
+            # Give the refill thread a different head start
+            time.sleep(0.002)
+        values.append(pool.draw())
+    return values, pool
+
+def test_refreshes_do_not_depend_on_thread_timing():
+    first, pool = draws(400)
+    second, _ = draws(400, pause_every=7)
+    assert first == second
+    assert pool.refreshed == 200
+    # Refreshed values show up among the draws
+    assert max(first) >= 50
+
+def test_refresh_ratio_zero_keeps_the_pool_fixed():
+    counter = itertools.count()
+    pool = FakerPool(lambda: next(counter), {}, 10, 0, random.Random(1))
+    assert all(pool.draw() < 10 for _ in range(100))
+
+def test_failing_provider_keeps_current_values():
+    counter = itertools.count()
+
+    def provider():
+        value = next(counter)
+        if value >= 12:
+            raise RuntimeError("provider broke")
+        return value
+
+    pool = FakerPool(provider, {}, 10, 1, random.Random(1))
+    values = [pool.draw() for _ in range(50)]
+    assert all(value < 12 for value in values)
+
+def test_seeded_faker_pools_are_reproducible():
+    pytest.importorskip("faker")
+    config = {"type": "faker", "provider": "name", "pool_size": 20, "refresh_ratio": 0.5}
+    runs = []
+    for _ in range(2):
+        generate = compile_faker(config, GeneratorContext(random.Random(3)))
+        runs.append([generate({}, i, {}) for i in range(200)])
+    assert runs[0] == runs[1]
@@ -0,0 +1,110 @@
+import asyncio
+import concurrent.futures
+import time
+
+import pytest
+
+from src.outputs.file import BufferedFileWriter, FileConnector
+from src.scheduler import _file_header
+
+class FailingFile:
+    def write(self, data):
+        raise OSError("disk full")
+
+    def close(self):
+        pass
+
+def test_unwritable_path_fails_at_construction():
+    with pytest.raises(OSError):
+        FileConnector({"type": "file", "filename": "/proc/nope/out.json"})
+
+def test_write_error_is_raised_by_next_send(tmp_path):
+    async def run():
+        connector = FileConnector({"type": "file", "filename": str(tmp_path / "out.json")})
+        connector.writer._file = FailingFile()
+        await connector.send(b"first")
+        await connector.writer.flush()
+        await asyncio.sleep(0.1)
+        with pytest.raises(OSError, match="disk full"):
+            await connector.send(b"second")
+        # The error is raised once
+        await connector.send(b"third")
+        connector.writer._file = None
+        await connector.close()
+
+    asyncio.run(run())
+
+def test_finished_writes_are_reaped(tmp_path):
+    async def run():
+        executor = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+        writer = BufferedFileWriter(str(tmp_path / "out.json"), executor, flush_interval=0.001)
+        for i in range(200):
+            await writer.write(b"%d" % i)
+            await asyncio.sleep(0.005)
+        assert len(writer._pending) <= 2
+        await writer.close()
+        executor.shutdown()
+
+    asyncio.run(run())
+    lines = (tmp_path / "out.json").read_bytes().splitlines()
+    assert lines == [b"%d" % i for i in range(200)]
+
+def test_csv_header_only_starts_empty_files(tmp_path):
+    filename = str(tmp_path / "out.csv")
+    schema = {"id": {"type": "sequence_int"}, "name": {"type": "choice", "values": ["a"]}}
+    config = _file_header({"type": "file", "format": "csv", "csv": {"header": True}, "filename": filename}, schema)
+    assert config["csv"] == {"header": False}
+
+    async def run():
+        connector = FileConnector(config)
+        await connector.send(b"1,a")
+        await connector.close()
+
+    asyncio.run(run())
+    asyncio.run(run())
+    assert (tmp_path / "out.csv").read_bytes() == b"id,name\n1,a\n1,a\n"
+
+def test_rotated_files_each_get_the_header(tmp_path):
+    async def run():
+        executor = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+        writer = BufferedFileWriter(str(tmp_path / "out-{seq}.csv"), executor, rotate_bytes=4, header=b"h\n")
+        for data in (b"1", b"2", b"3"):
+            await writer.write(data)
+            await writer.flush()
+        await writer.close()
+        executor.shutdown()
+
+    asyncio.run(run())
+    assert (tmp_path / "out-0.csv").read_bytes() == b"h\n1\n2\n"
+    assert (tmp_path / "out-1.csv").read_bytes() == b"h\n3\n"
+
+class Clock:
+    """Stand-in stream clock set by the test."""
+
+    def __init__(self, t):
+        self.t = t
+
+    def now(self):
+        return self.t
+
+def test_dated_files_follow_the_stream_clock(tmp_path):
+    clock = Clock(time.mktime((2024, 1, 1, 12, 0, 0, 0, 0, -1)))
+
+    async def run():
+        executor = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+        writer = BufferedFileWriter(str(tmp_path / "out-{date}.json"), executor, clock=clock)
+        await writer.write(b"1")
+        await writer.flush()
+        clock.t += 86400
+        await writer.write(b"2")
+        await writer.close()
+        executor.shutdown()
+
+    asyncio.run(run())
+    assert (tmp_path / "out-2024-01-01.json").read_bytes() == b"1\n"
+    assert (tmp_path / "out-2024-01-02.json").read_bytes() == b"2\n"
+
+@pytest.mark.parametrize("filename", ["out-{hour}.json", "out-{}.json", "out-{date.year}.json", "out-{.json"])
+def test_unknown_placeholders_fail_at_construction(tmp_path, filename):
+    with pytest.raises(ValueError, match="placeholders"):
+        FileConnector({"type": "file", "filename": str(tmp_path / filename)})
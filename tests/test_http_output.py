@@ -0,0 +1,119 @@
+import asyncio
+
+import pytest
+
+from src.outputs.http import HttpConnector
+from src.outputs.queued import QueuedOutput
+from src.stats import ConnectorStats
+
+class Response:
+    def __init__(self, status, session=None):
+        self.status = status
+        self.headers = {}
+        self.session = session
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def read(self):
+        if self.session is not None:
+            self.session.active += 1
+            await asyncio.sleep(self.session.delay)
+            self.session.active -= 1
+            assert not self.session.closed
+        return b""
+
+class Session:
+    """Stand-in aiohttp session answering with the given statuses, then 200."""
+
+    def __init__(self, *statuses, delay=0.0):
+        self.statuses = list(statuses)
+        self.bodies = []
+        self.closed = False
+        self.delay = delay
+        self.active = 0
+
+    def request(self, method, url, data=None):
+        self.bodies.append(data)
+        return Response(self.statuses.pop(0) if self.statuses else 200, self if self.delay else None)
+
+    async def close(self):
+        assert self.active == 0, "session closed with a request in flight"
+        self.closed = True
+
+def connector(session, **config):
+    return HttpConnector(dict({"url": "http://test", "backoff_ms": 1}, **config), session=session)
+
+def test_records_are_batched_and_counted_once_delivered():
+    session = Session()
+    http = connector(session, batch_size=3)
+
+    async def run():
+        await http.send_batch([b"1", b"2", b"3", b"4", b"5", b"6", b"7"])
+        await http.close()
+
+    asyncio.run(run())
+    assert session.bodies == [b"1\n2\n3\n", b"4\n5\n6\n", b"7\n"]
+    assert (http.stats.records, http.stats.bytes, http.stats.errors) == (7, 7, 0)
+
+def test_retryable_status_is_retried():
+    session = Session(503, 429)
+    http = connector(session, batch_size=2, framing="json_array")
+
+    async def run():
+        await http.send_batch([b"1", b"2"])
+        await http.close()
+
+    asyncio.run(run())
+    assert session.bodies == [b"[1,2]"] * 3
+    assert (http.stats.records, http.stats.errors) == (2, 0)
+
+def test_failed_batches_count_as_errors():
+    session = Session(500, 500, 500, 400)
+    http = connector(session, batch_size=2, max_retries=2)
+
+    async def run():
+        await http.send_batch([b"1", b"2", b"3", b"4"])
+        await http.close()
+
+    asyncio.run(run())
+    # Three attempts for the first batch, none retried for the rejected second one
+    assert len(session.bodies) == 4
+    assert (http.stats.records, http.stats.errors) == (0, 4)
+
+def test_queued_output_counts_deliveries_reported_by_connector():
+    stats = ConnectorStats()
+    http = connector(Session(400), batch_size=2)
+
+    async def run():
+        output = QueuedOutput(http, stats, "http[0]")
+        output.start()
+        for data in (b"1", b"2", b"3", b"4"):
+            await output.put(data)
+        await output.close()
+        await http.close()
+
+    asyncio.run(run())
+    assert (stats.records, stats.bytes, stats.errors) == (2, 2, 2)
+
+def test_close_waits_for_requests_started_by_linger():
+    session = Session(delay=0.05)
+    http = connector(session, batch_size=2, linger_ms=1)
+
+    async def run():
+        await http.send_batch([b"1", b"2"])
+        await http.send_batch([b"3"])
+        # The linger timer fires while the first request holds the window
+        await asyncio.sleep(0.01)
+        await http.close()
+
+    asyncio.run(run())
+    assert session.bodies == [b"1\n2\n", b"3\n"]
+    assert (http.stats.records, http.stats.errors) == (3, 0)
+
+def test_get_cannot_compress():
+    with pytest.raises(ValueError, match="cannot compress"):
+        connector(Session(), method="get", compression="gzip")
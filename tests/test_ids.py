@@ -0,0 +1,101 @@
+import uuid
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from src.clock import SimulationClock, parse_time
+from src.generators.batch import compile_batch
+from src.generators.ids import DEFAULT_SNOWFLAKE_EPOCH
+from src.generators.plan import compile_schema
+
+START = parse_time("2024-01-01T00:00:00Z")
+CROCKFORD = "0123456789ABCDEFGHJKMNPQRSTVWXYZ"
+
+def clock(rate):
+    return SimulationClock(START, None, rate)
+
+def scalar_ids(config, rate, n, seed=1):
+    plan = compile_schema({"id": config}, seed, clock(rate))
+    return [plan.generate({}, i)["id"] for i in range(n)]
+
+def vector_ids(config, rate, n, batch=100, seed=1):
+    plan = compile_batch({"id": config}, seed, clock(rate))
+    ids = []
+    for count in range(0, n, batch):
+        ids += plan.generate({}, count, min(batch, n - count)).rows()
+    return [row["id"] for row in ids]
+
+def value(config, id_):
+    """Integer value of an ID in any format."""
+    if isinstance(id_, int):
+        return id_
+    if isinstance(id_, bytes):
+        return int.from_bytes(id_, "big")
+    if config["type"] == "ulid" and config.get("format", "canonical") == "canonical":
+        return sum(CROCKFORD.index(c) << 5 * (25 - i) for i, c in enumerate(id_))
+    return int(id_.replace("-", ""), 16)
+
+def milliseconds(n, rate):
+    return [int(t * 1000) for t in clock(rate).times(n)]
+
+@pytest.mark.parametrize("generate", [scalar_ids, vector_ids])
+@pytest.mark.parametrize("config", [
+    {"type": "uuid", "version": 7},
+    {"type": "uuid", "version": 7, "format": "bytes"},
+    {"type": "ulid"},
+    {"type": "ulid", "format": "hex"},
+    {"type": "snowflake"},
+    {"type": "snowflake", "format": "hex"},
+])
+def test_time_ordered_ids_strictly_increase(generate, config):
+    # Five records per millisecond, so most IDs share their timestamp
+    ids = generate(config, 5000, 1000)
+    values = [value(config, id_) for id_ in ids]
+    assert all(a < b for a, b in zip(values, values[1:]))
+
+@pytest.mark.parametrize("generate", [scalar_ids, vector_ids])
+def test_uuid7_layout_and_timestamps(generate):
+    ids = generate({"type": "uuid", "version": 7}, 5000, 300)
+    parsed = [uuid.UUID(id_) for id_ in ids]
+    assert all(u.version == 7 and u.variant == uuid.RFC_4122 for u in parsed)
+    assert [u.int >> 80 for u in parsed] == milliseconds(300, 5000)
+
+@pytest.mark.parametrize("generate", [scalar_ids, vector_ids])
+def test_ulid_timestamps_follow_the_clock(generate):
+    config = {"type": "ulid"}
+    ids = generate(config, 5000, 300)
+    assert all(len(id_) == 26 for id_ in ids)
+    assert [value(config, id_) >> 80 for id_ in ids] == milliseconds(300, 5000)
+
+@pytest.mark.parametrize("id_format", ["canonical", "hex", "bytes"])
+def test_vector_snowflakes_match_scalar_ones(id_format):
+    # 10000 records per millisecond overflow the 12-bit sequence
+    config = {"type": "snowflake", "worker_id": 5, "format": id_format}
+    assert vector_ids(config, 10_000_000, 20000, batch=3000) == scalar_ids(config, 10_000_000, 20000)
+
+def test_snowflake_layout():
+    ids = scalar_ids({"type": "snowflake", "worker_id": 5}, 250, 3)
+    epoch = int(parse_time(DEFAULT_SNOWFLAKE_EPOCH) * 1000)
+    assert [(id_ >> 22, id_ >> 12 & 1023, id_ & 4095) for id_ in ids] == [
+        (ms - epoch, 5, 0) for ms in milliseconds(3, 250)
+    ]
+
+@pytest.mark.parametrize("config", [
+    {"type": "uuid"},
+    {"type": "uuid", "version": 7, "format": "hex"},
+    {"type": "ulid", "format": "bytes"},
+])
+def test_vector_and_scalar_ids_share_their_format(config):
+    scalar, vector = scalar_ids(config, 5000, 50), vector_ids(config, 5000, 50)
+    assert {type(id_) for id_ in scalar} == {type(id_) for id_ in vector}
+    assert {len(id_) for id_ in scalar} == {len(id_) for id_ in vector}
+    if config.get("version") == 7:
+        assert [value(config, id_) >> 80 for id_ in scalar] == [value(config, id_) >> 80 for id_ in vector]
+    if config["type"] == "uuid" and "version" not in config:
+        assert all(uuid.UUID(id_).version == 4 for id_ in scalar + vector)
+
+def test_same_seed_gives_same_ids():
+    config = {"type": "ulid"}
+    assert scalar_ids(config, 5000, 20, seed=9) == scalar_ids(config, 5000, 20, seed=9)
+    assert vector_ids(config, 5000, 20, seed=9) == vector_ids(config, 5000, 20, seed=9)
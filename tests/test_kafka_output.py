@@ -0,0 +1,108 @@
+import asyncio
+import threading
+
+from src.outputs.kafka import KafkaConnector
+from src.outputs.queued import QueuedOutput
+from src.stats import ConnectorStats
+
+class Future:
+    def __init__(self):
+        self.callbacks = []
+        self.errbacks = []
+
+    def add_callback(self, f, *args):
+        self.callbacks.append((f, args))
+
+    def add_errback(self, f, *args):
+        self.errbacks.append((f, args))
+
+    def succeed(self):
+        for f, args in self.callbacks:
+            f(*args, "metadata")
+
+    def fail(self, error):
+        for f, args in self.errbacks:
+            f(*args, error)
+
+class Producer:
+    """Stand-in producer whose messages are acknowledged by the test."""
+
+    def __init__(self):
+        self.sent = []
+        self.futures = []
+        self.closed = False
+
+    def send(self, topic, value=None, key=None):
+        self.sent.append((topic, value, key))
+        future = Future()
+        self.futures.append(future)
+        return future
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+def settle(futures, error=None):
+    """Resolve futures from another thread, like the producer's I/O thread."""
+    thread = threading.Thread(target=lambda: [f.fail(error) if error else f.succeed() for f in futures])
+    thread.start()
+    thread.join()
+
+def test_window_limits_unacknowledged_messages():
+    producer = Producer()
+    kafka = KafkaConnector({"topic": "t", "max_outstanding": 2}, producer=producer)
+
+    async def run():
+        await kafka.send(b"a")
+        await kafka.send(b"b")
+        third = asyncio.ensure_future(kafka.send(b"c", b"key"))
+        await asyncio.sleep(0.05)
+        assert not third.done()
+
+        settle(producer.futures[:1])
+        await asyncio.wait_for(third, 1)
+        settle(producer.futures[1:])
+        await asyncio.sleep(0.05)
+        await kafka.close()
+
+    asyncio.run(run())
+    assert producer.sent == [("t", b"a", None), ("t", b"b", None), ("t", b"c", b"key")]
+    assert producer.closed
+    assert (kafka.stats.records, kafka.stats.bytes, kafka.stats.errors) == (3, 3, 0)
+
+def test_delivery_errors_are_counted_and_free_the_window():
+    producer = Producer()
+    kafka = KafkaConnector({"topic": "t", "max_outstanding": 1}, producer=producer)
+
+    async def run():
+        await kafka.send(b"a")
+        settle(producer.futures, RuntimeError("broker down"))
+        await asyncio.wait_for(kafka.send(b"b"), 1)
+        settle(producer.futures[1:])
+        await asyncio.sleep(0.05)
+
+    asyncio.run(run())
+    assert (kafka.stats.records, kafka.stats.errors) == (1, 1)
+
+def test_queued_output_counts_acknowledged_messages_only():
+    stats = ConnectorStats()
+    producer = Producer()
+    kafka = KafkaConnector({"topic": "t"}, producer=producer)
+
+    async def run():
+        output = QueuedOutput(kafka, stats, "kafka[0]")
+        output.start()
+        for data in (b"1", b"22", b"333"):
+            await output.put(data)
+        await output.close()
+        # Sent but not acknowledged yet
+        assert (stats.records, stats.errors) == (0, 0)
+
+        settle(producer.futures[:2])
+        settle(producer.futures[2:], RuntimeError("too large"))
+        await asyncio.sleep(0.05)
+
+    asyncio.run(run())
+    assert (stats.records, stats.bytes, stats.errors) == (2, 3, 1)
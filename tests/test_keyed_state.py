@@ -0,0 +1,89 @@
+import pytest
+
+from src.clock import SimulationClock
+from src.generators.plan import compile_schema
+from src.state import KeyedState
+
+def walk_schema(**options):
+    return {
+        "symbol": {"type": "choice", "values": ["a", "b", "c"]},
+        "venue": {"type": "choice", "values": ["x", "y"]},
+        "price": dict({"type": "stateful", "state_key": "price_{symbol}", "initial": 0,
+                       "update_func": "lambda price, count: price + 1"}, **options),
+    }
+
+def test_every_entity_keeps_its_own_value():
+    plan = compile_schema(walk_schema(), seed=1)
+    state = {}
+    seen = {}
+    for i in range(300):
+        record = plan.generate(state, i)
+        assert record["price"] == seen.get(record["symbol"], 0)
+        seen[record["symbol"]] = record["price"] + 1
+    table = state["_keyed:symbol"]
+    assert sorted(table.ids) == ["a", "b", "c"]
+    assert [table.get("price_{symbol}", table.ids[key]) for key in "abc"] == [seen[key] for key in "abc"]
+
+def test_fields_keyed_alike_share_one_table():
+    schema = walk_schema()
+    schema["volume"] = {"type": "stateful", "state_key": "volume_{symbol}", "initial": 1.5,
+                        "update_func": "lambda volume, count: volume * 2"}
+    schema["pair"] = {"type": "stateful", "state_key": "{symbol}/{venue}", "initial": 0,
+                      "update_func": "lambda n, count: n + 1"}
+    plan = compile_schema(schema, seed=2)
+    state = {}
+    for i in range(100):
+        plan.generate(state, i)
+    assert set(state) == {"_keyed:symbol", "_keyed:symbol,venue"}
+    assert set(state["_keyed:symbol"].columns) == {"price_{symbol}", "volume_{symbol}"}
+    assert set(state["_keyed:symbol,venue"].ids) <= {(s, v) for s in "abc" for v in "xy"}
+
+def test_least_recently_used_entities_start_over():
+    table = KeyedState(max_entities=10)
+    table.add_column("n", 0)
+    for key in range(10):
+        table.set("n", table.row(key), key + 100)
+    table.row(0)
+    table.set("n", table.row(10), 7)
+    # One entity, the least recently used, made room
+    assert len(table) == 10 and 1 not in table.ids and table.evicted == 1
+    assert table.get("n", table.row(0)) == 100
+    assert table.get("n", table.row(1)) == 0
+
+def test_idle_entities_expire_with_stream_time():
+    clock = SimulationClock(0.0, None, 1.0)
+    schema = walk_schema(ttl=5)
+    schema["symbol"] = {"type": "sequence_int"}
+    plan = compile_schema(schema, seed=3, clock=clock)
+    state = {}
+    for i in range(20):
+        plan.generate(state, i)
+    # One record per second: only entities seen in the last ttl seconds remain
+    assert 5 <= len(state["_keyed:symbol"]) <= 11
+
+def test_values_that_do_not_fit_the_array_are_kept():
+    table = KeyedState()
+    table.add_column("n", 0)
+    table.add_column("f", 0.5)
+    row = table.row("k")
+    table.set("n", row, 1 << 70)
+    table.set("f", row, "text")
+    assert (table.get("n", row), table.get("f", row)) == (1 << 70, "text")
+
+def test_snapshots_do_not_change_with_the_state():
+    table = KeyedState()
+    table.add_column("n", 0)
+    table.set("n", table.row("a"), 1)
+    snapshot = table.snapshot()
+    table.set("n", table.row("a"), 2)
+    table.row("b")
+    assert snapshot.get("n", snapshot.ids["a"]) == 1 and "b" not in snapshot.ids
+
+@pytest.mark.parametrize("options, message", [
+    ({"state_key": "price_{missing}"}, "not generated before it"),
+    ({"state_key": "price", "ttl": 5}, "need a state_key"),
+    ({"max_entities": 0}, "max_entities"),
+])
+def test_invalid_keyed_fields_are_rejected(options, message):
+    with pytest.raises(ValueError, match=message):
+        compile_schema(walk_schema(**options))
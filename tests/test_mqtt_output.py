@@ -0,0 +1,101 @@
+import asyncio
+import threading
+
+from src.outputs.mqtt import MqttConnector
+
+class Info:
+    def __init__(self, rc, mid):
+        self.rc = rc
+        self.mid = mid
+
+class Client:
+    """Stand-in paho client answering publishes with the given return codes, then 0."""
+
+    def __init__(self, *codes):
+        self.codes = list(codes)
+        self.published = []
+        self.mid = 0
+
+    def connect_async(self, host, port):
+        pass
+
+    def loop_start(self):
+        pass
+
+    def loop_stop(self):
+        pass
+
+    def disconnect(self):
+        pass
+
+    def publish(self, topic, data, qos):
+        self.mid += 1
+        rc = self.codes.pop(0) if self.codes else 0
+        if rc == 0:
+            self.published.append(data)
+        return Info(rc, self.mid)
+
+def from_thread(callback, *args):
+    """Run a paho callback on another thread, like paho's network loop."""
+    thread = threading.Thread(target=callback, args=args)
+    thread.start()
+    thread.join()
+
+def test_qos1_messages_count_once_acknowledged():
+    client = Client()
+    mqtt = MqttConnector({"topic": "t", "qos": 1, "max_inflight": 2}, client=client)
+
+    async def run():
+        sending = asyncio.ensure_future(mqtt.send_batch([b"a", b"bb", b"ccc"]))
+        await asyncio.sleep(0.01)
+        from_thread(client.on_connect, client, None, {}, 0)
+        await asyncio.sleep(0.05)
+        # The window holds two unacknowledged messages
+        assert client.published == [b"a", b"bb"] and not sending.done()
+        assert mqtt.stats.records == 0
+
+        from_thread(client.on_publish, client, None, 1)
+        await asyncio.wait_for(sending, 1)
+        from_thread(client.on_publish, client, None, 2)
+        from_thread(client.on_publish, client, None, 3)
+        await mqtt.close()
+
+    asyncio.run(run())
+    assert client.published == [b"a", b"bb", b"ccc"]
+    assert (mqtt.stats.records, mqtt.stats.bytes, mqtt.stats.errors) == (3, 6, 0)
+
+def test_qos0_message_is_published_again_after_reconnect():
+    client = Client(4)
+    mqtt = MqttConnector({"topic": "t"}, client=client)
+
+    async def run():
+        sending = asyncio.ensure_future(mqtt.send(b"a"))
+        await asyncio.sleep(0.01)
+        from_thread(client.on_connect, client, None, {}, 0)
+        await asyncio.sleep(0.05)
+        # The first publish found no connection; the message waits for the next one
+        assert client.published == [] and not sending.done()
+
+        from_thread(client.on_disconnect, client, None)
+        from_thread(client.on_connect, client, None, {}, 0)
+        await asyncio.wait_for(sending, 1)
+        await mqtt.close()
+
+    asyncio.run(run())
+    assert client.published == [b"a"]
+    assert (mqtt.stats.records, mqtt.stats.errors) == (1, 0)
+
+def test_failed_publish_and_unacknowledged_messages_count_as_errors():
+    client = Client(7)
+    mqtt = MqttConnector({"topic": "t", "qos": 1, "close_timeout": 0.05}, client=client)
+
+    async def run():
+        sending = asyncio.ensure_future(mqtt.send_batch([b"a", b"b"]))
+        await asyncio.sleep(0.01)
+        from_thread(client.on_connect, client, None, {}, 0)
+        await asyncio.wait_for(sending, 1)
+        await mqtt.close()
+
+    asyncio.run(run())
+    assert client.published == [b"b"]
+    assert (mqtt.stats.records, mqtt.stats.errors) == (0, 2)
@@ -0,0 +1,22 @@
+import random
+
+from src.pacing import Pacer, create_pacer
+
+def deadlines(pacer, steps=50):
+    pacer._begin(0.0)
+    result = []
+    for step in range(1, steps + 1):
+        result.append(pacer._take_due(step * 0.1))
+    return result, pacer._next
+
+def test_jitter_is_reproducible_with_seeded_rng():
+    config = {"rate": 100, "jitter": 0.5}
+    first = deadlines(create_pacer(config, rng=random.Random("7/arrivals")))
+    second = deadlines(create_pacer(config, rng=random.Random("7/arrivals")))
+    other = deadlines(create_pacer(config, rng=random.Random("8/arrivals")))
+    assert first == second
+    assert first != other
+
+def test_jitter_keeps_average_rate():
+    due, _ = deadlines(Pacer(100, jitter=0.5, rng=random.Random(1)), steps=100)
+    assert 950 <= sum(due) <= 1050
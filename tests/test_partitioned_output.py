@@ -0,0 +1,50 @@
+import asyncio
+
+from src.outputs.partitioned import PartitionedFileConnector
+
+def connector(tmp_path, path, **config):
+    return PartitionedFileConnector(dict({"type": "partitioned_file", "path": str(tmp_path / path)}, **config))
+
+def write(output, records, batch=True):
+    async def run():
+        data = [str(record["n"]).encode() for record in records]
+        keys = [output.route(record) for record in records]
+        if batch:
+            await output.send_batch(data, keys)
+        else:
+            for args in zip(data, keys):
+                await output.send(*args)
+        await output.close()
+
+    asyncio.run(run())
+
+def test_records_are_split_by_field_and_time(tmp_path):
+    output = connector(tmp_path, "dt={date}/hour={hour}/device={device}.json", time_field="t")
+    write(output, [
+        {"n": 1, "device": "a", "t": "2024-01-01T10:15:00Z"},
+        {"n": 2, "device": "b/c", "t": 1704103200},
+        {"n": 3, "device": "a", "t": "2024-01-01T10:45:00Z"},
+        {"n": 4, "device": "", "t": "not a time"},
+    ])
+    assert (tmp_path / "dt=2024-01-01/hour=10/device=a.json").read_bytes() == b"1\n3\n"
+    assert (tmp_path / "dt=2024-01-01/hour=10/device=b%2Fc.json").read_bytes() == b"2\n"
+    default = "__HIVE_DEFAULT_PARTITION__"
+    assert (tmp_path / f"dt={default}/hour={default}/device={default}.json").read_bytes() == b"4\n"
+
+def test_evicted_partitions_are_appended_to(tmp_path):
+    output = connector(tmp_path, "{device}.json", max_open_files=1, append=False)
+    write(output, [{"n": n, "device": device} for n, device in enumerate("abab")], batch=False)
+    assert (tmp_path / "a.json").read_bytes() == b"0\n2\n"
+    assert (tmp_path / "b.json").read_bytes() == b"1\n3\n"
+    assert output.evicted == 3
+
+def test_rotation_continues_after_eviction(tmp_path):
+    output = connector(tmp_path, "{device}-{seq}.json", max_open_files=1, rotate_bytes=4, flush_bytes=1)
+    write(output, [{"n": n, "device": device} for n, device in zip(range(10, 16), "aabbaa")], batch=False)
+    assert [(tmp_path / f"a-{seq}.json").read_bytes() for seq in range(3)] == [b"10\n", b"11\n14\n", b"15\n"]
+
+def test_only_rotated_partitions_are_remembered(tmp_path):
+    output = connector(tmp_path, "{device}-{seq}.json", max_open_files=1, rotate_bytes=4, flush_bytes=1)
+    write(output, [{"n": n, "device": n} for n in range(100)] + [{"n": 100, "device": "x"}, {"n": 200, "device": "x"}], batch=False)
+    assert list(output._seqs) == [str(tmp_path / "x-{seq}.json").encode()]
+    assert output.opened == 101
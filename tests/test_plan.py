@@ -0,0 +1,39 @@
+import pytest
+
+from src.generators.plan import compile_schema
+
+def test_dependents_run_after_the_fields_they_read():
+    plan = compile_schema({
+        "total": {"type": "dependent", "field": "net", "func": "lambda net: net + tax"},
+        "tax": {"type": "dependent", "field": "net", "func": "lambda net: net // 10"},
+        "net": {"type": "dependent", "field": "price", "func": "lambda price: price * quantity"},
+        "price": {"type": "static", "value": 20},
+        "quantity": 3,
+    }, seed=1)
+    names = plan.field_names
+    # Independent fields keep their order and come first
+    assert names[:2] == ["price", "quantity"]
+    assert names.index("net") < names.index("tax") < names.index("total")
+    assert plan.generate({}, 0) == {"price": 20, "quantity": 3, "net": 60, "tax": 6, "total": 66}
+
+def test_dependency_cycles_are_rejected():
+    with pytest.raises(ValueError, match="cycle"):
+        compile_schema({
+            "a": {"type": "dependent", "field": "b"},
+            "b": {"type": "dependent", "field": "c", "func": "lambda c: c + a"},
+            "c": {"type": "dependent", "field": "a"},
+        })
+
+@pytest.mark.parametrize("schema, message", [
+    ({"a": {"type": "nope"}}, "unknown generator type"),
+    ({"a": {"type": "dependent", "field": "missing"}}, "unknown field"),
+    ({"a": {"type": "dependent", "field": "a"}}, "unknown field"),
+])
+def test_invalid_schemas_are_rejected(schema, message):
+    with pytest.raises(ValueError, match=message):
+        compile_schema(schema)
+
+def test_same_seed_gives_same_records():
+    schema = {"n": {"type": "random_int", "min": 0, "max": 1000000}, "x": {"type": "gaussian", "mean": 0, "stddev": 1}}
+    first, second = compile_schema(schema, seed=7), compile_schema(schema, seed=7)
+    assert [first.generate({}, i) for i in range(5)] == [second.generate({}, i) for i in range(5)]
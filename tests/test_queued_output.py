@@ -0,0 +1,60 @@
+import asyncio
+
+import pytest
+
+from src.outputs import queued
+from src.outputs.queued import QueuedOutput, SpillFile
+from src.stats import ConnectorStats
+
+class SlowConnector:
+    """Stand-in connector that takes a while per batch."""
+
+    def __init__(self, config):
+        self.config = config
+        self.sent = []
+
+    async def send(self, data):
+        self.sent.append(data)
+
+    async def send_batch(self, batch):
+        await asyncio.sleep(0.001)
+        self.sent.extend(batch)
+
+@pytest.mark.parametrize("keyed", [False, True])
+def test_spill_file_keeps_order_across_memory_and_disk(tmp_path, monkeypatch, keyed):
+    monkeypatch.setattr(queued, "SPILL_BUFFER", 10)
+    items = [b"%d" % i for i in range(50)]
+    if keyed:
+        items = [(data, data if i % 3 else None) for i, data in enumerate(items)]
+
+    async def run():
+        spill = SpillFile(str(tmp_path), keyed)
+        popped = []
+        for i, item in enumerate(items):
+            spill.push(item)
+            if spill.full:
+                await spill.flush()
+            if i % 7 == 0:
+                popped += await spill.pop_batch(3)
+        while spill.pending:
+            popped += await spill.pop_batch(4)
+        spill.close()
+        return popped
+
+    assert asyncio.run(run()) == items
+
+def test_spilled_records_are_delivered_in_order(tmp_path, monkeypatch):
+    monkeypatch.setattr(queued, "SPILL_BUFFER", 16)
+    stats = ConnectorStats()
+    connector = SlowConnector({"queue_size": 2, "overflow": "spill", "spill_dir": str(tmp_path)})
+
+    async def run():
+        output = QueuedOutput(connector, stats, "slow[0]")
+        output.start()
+        for i in range(500):
+            await output.put(b"%d" % i)
+        await output.close()
+
+    asyncio.run(run())
+    assert connector.sent == [b"%d" % i for i in range(500)]
+    assert stats.spilled > 0 and stats.records == 500
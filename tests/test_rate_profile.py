@@ -0,0 +1,48 @@
+import math
+import random
+
+from src.rate_profile import ArrivalTimes, RateProfile
+
+RAMP_AND_STOP = [
+    {"duration": 10, "from": 0, "to": 100},
+    {"duration": 10, "rate": 100},
+    {"duration": 5, "rate": 0},
+]
+
+def arrivals(config, rate=10.0, rng=None):
+    times = ArrivalTimes(RateProfile(config, rate), rng)
+    result = []
+    while True:
+        t = times.next()
+        if t == math.inf:
+            return result
+        result.append(t)
+
+def test_ramp_follows_expected_count():
+    times = arrivals({"segments": [{"duration": 10, "from": 0, "to": 100}, {"duration": 1, "rate": 0}]})
+    # The expected count of a ramp from 0 to 100 over 10s is 5 t^2
+    assert len(times) == 501
+    assert math.isclose(times[20], math.sqrt(20 / 5))
+
+def test_profile_ends_when_rate_stays_zero():
+    assert len(arrivals({"segments": RAMP_AND_STOP})) == 1501
+
+def test_bursts_and_curve_cannot_revive_ended_profile():
+    for extra in ({"bursts": {"every": 30, "duration": 2}}, {"curve": {"period": 60}}):
+        times = arrivals(dict(extra, segments=RAMP_AND_STOP))
+        assert times and times[-1] <= 20
+
+def test_repeated_zero_schedule_ends():
+    assert arrivals({"segments": [{"duration": 1, "rate": 0}], "repeat": True, "curve": {}}) == []
+
+def test_poisson_arrivals_end_too():
+    config = {"segments": RAMP_AND_STOP, "bursts": {"every": 30, "duration": 2}}
+    expected = len(arrivals(config))
+    times = arrivals(dict(config, arrivals="poisson"), rng=random.Random(1))
+    assert abs(len(times) - expected) < 5 * math.sqrt(expected)
+    assert times[-1] <= 20
+
+def test_long_zero_run_ends_profile(monkeypatch):
+    monkeypatch.setattr("src.rate_profile.MAX_IDLE_PIECES", 10)
+    config = {"segments": [{"duration": 5, "rate": 0}, {"duration": 1, "rate": 10}], "curve": {"period": 9.6}}
+    assert arrivals(config) == []
@@ -0,0 +1,65 @@
+import asyncio
+import logging
+import types
+
+import pytest
+
+from src.clock import WallClock
+from src.events import EventIndex
+from src.generators import compile_batch
+from src.scheduler import Scheduler
+from src.stats import StreamStats
+
+def encoder():
+    def encode(record):
+        if record["id"] == 2:
+            raise TypeError("bad value")
+        return b"%d" % record["id"]
+
+    encode.encode_many = lambda records: [encode(record) for record in records]
+    return encode
+
+def test_failed_batch_encoding_falls_back_to_single_records(caplog):
+    scheduler = types.SimpleNamespace(stats={"s": StreamStats()})
+    rows = [{"id": i} for i in range(4)]
+    with caplog.at_level(logging.WARNING):
+        encoded = Scheduler._encode_rows(scheduler, encoder(), rows, "s")
+
+    assert [data for data, _ in encoded] == [b"0", b"1", b"3"]
+    assert scheduler.stats["s"].errors == 1
+    assert "encoding them one at a time: bad value" in caplog.text
+
+def test_events_do_not_consume_vectorized_sequence_values():
+    pytest.importorskip("numpy")
+    clock = WallClock()
+    plan = compile_batch({"id": {"type": "sequence_int", "start": 990}}, 1, clock)
+    events = EventIndex([{"at_count": 3, "record": {"id": -1}}, {"every_count": 5, "record": {"id": -2}}])
+    state = {}
+
+    batch, records, injected = Scheduler._generate_batch(None, plan, events, clock, state, 0, 6)
+    assert batch is None
+    assert [record and int(record["id"]) for record in records] == [990, 991, None, 992, None, 993]
+    assert injected == {2: {"id": -1}, 4: {"id": -2}}
+
+    batch, records, injected = Scheduler._generate_batch(None, plan, events, clock, state, 6, 3)
+    assert [int(record["id"]) for record in records] == [994, 995, 996]
+    assert batch is not None and not injected
+
+def test_failing_batch_generation_backs_off(monkeypatch):
+    pytest.importorskip("numpy")
+    monkeypatch.setattr("src.scheduler.ERROR_BACKOFF", 0.05)
+    config = {"streams": {"s": {
+        "rate": "max",
+        "vectorized": True,
+        "duration": 0.3,
+        "schema": {"id": {"type": "sequence_int"}},
+        "outputs": [{"type": "stdout", "format": "json"}],
+    }}}
+    scheduler = Scheduler(config)
+
+    def fail(*args):
+        raise RuntimeError("generator broke")
+
+    monkeypatch.setattr(scheduler.batch_plans["s"], "generate", fail)
+    asyncio.run(scheduler.run())
+    assert 1 <= scheduler.stats["s"].errors <= 8
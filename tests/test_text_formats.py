@@ -0,0 +1,85 @@
+import csv
+import io
+import json
+import random
+
+import pytest
+
+from src.formatters.csv_format import compile_csv
+from src.formatters.json_format import MAX_LAYOUTS, compile_json
+from src.generators.plan import compile_schema
+
+SCHEMA = {
+    "id": {"type": "sequence_int"},
+    "reading": {"type": "gaussian", "mean": 0, "stddev": 1e9},
+    "level": {"type": "choice", "values": ["low", "high, \"very\""]},
+    "at": {"type": "timestamp", "timezone": "utc"},
+    "key": {"type": "uuid"},
+    "flake": {"type": "snowflake"},
+    "note": {"type": "dependent", "field": "id", "func": "lambda id: [None, 'a,b', 'é\\n\"', id * 1.5, True][id % 5]"},
+    "site": "north",
+}
+
+EVENTS = [{"record": {"level": "alert", "extra": 1}}]
+
+# Values of every field's unexpected types
+ODD_VALUES = [None, "", "x\ty", " ", 1, -0.0, float("nan"), float("inf"), 1e300, True, [1, "a"], {"k": None}]
+
+def records(n=200):
+    plan = compile_schema(SCHEMA, seed=2)
+    rows = [plan.generate({}, i) for i in range(n)]
+    rng = random.Random(1)
+    # Generated timestamps and IDs are trusted to need no escaping
+    fields = [name for name in SCHEMA if name not in ("at", "key")]
+    for row in rows[::3]:
+        row[rng.choice(fields)] = rng.choice(ODD_VALUES)
+    # Event records, reordered and partial records
+    rows.append({"level": "alert", "extra": 1})
+    rows.append(dict(reversed(list(rows[0].items()))))
+    rows.append({name: value for name, value in rows[1].items() if name != "reading"})
+    rows.append({})
+    return rows
+
+def json_row(row):
+    # Records with the schema's fields are written in schema order, others in their own
+    if set(row) == set(SCHEMA):
+        row = {name: row[name] for name in SCHEMA}
+    return json.dumps(row).encode()
+
+def test_json_matches_json_dumps():
+    encode = compile_json(SCHEMA, {}, EVENTS)
+    rows = records()
+    assert [encode(row) for row in rows] == [json_row(row) for row in rows]
+    assert encode.encode_many(rows) == [json_row(row) for row in rows]
+
+def test_json_falls_back_past_max_layouts():
+    encode = compile_json(SCHEMA, {})
+    rows = [{f"f{i}": i} for i in range(MAX_LAYOUTS + 10)]
+    assert [encode(row) for row in rows] == [json.dumps(row).encode() for row in rows]
+
+def csv_row(row):
+    output = io.StringIO()
+    csv.writer(output).writerow([row.get(name, "") for name in SCHEMA])
+    return output.getvalue()[:-2].encode()
+
+def test_csv_matches_csv_writer():
+    encode = compile_csv(SCHEMA, {}, EVENTS)
+    rows = records()
+    assert [encode(row) for row in rows] == [csv_row(row) for row in rows]
+    assert encode.encode_many(rows) == [csv_row(row) for row in rows]
+
+def test_csv_header_starts_the_first_row_only():
+    encode = compile_csv(SCHEMA, {"header": True})
+    rows = records(3)
+    assert encode.encode_many(rows) == [b"id,reading,level,at,key,flake,note,site\n" + csv_row(rows[0])] + [
+        csv_row(row) for row in rows[1:]
+    ]
+    assert encode(rows[0]) == csv_row(rows[0])
+
+@pytest.mark.parametrize("schema", [{}, {"only": {"type": "choice", "values": ["", "a"]}}])
+def test_csv_small_schemas_match_csv_writer(schema):
+    encode = compile_csv(schema, {})
+    for row in ({}, {"only": ""}, {"only": "a"}):
+        output = io.StringIO()
+        csv.writer(output).writerow([row.get(name, "") for name in schema])
+        assert encode(row) == output.getvalue()[:-2].encode()
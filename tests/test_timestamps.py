@@ -0,0 +1,18 @@
+import datetime
+
+from src.clock import WallClock
+from src.generators.context import GeneratorContext
+from src.generators.datetime import compile_timestamp
+
+def generate(config):
+    return compile_timestamp(dict({"type": "timestamp"}, **config), GeneratorContext(clock=WallClock()))({}, 1, {})
+
+def test_timestamps_default_to_naive_local_time():
+    value = datetime.datetime.fromisoformat(generate({}))
+    assert value.tzinfo is None
+    assert abs(value - datetime.datetime.now()) < datetime.timedelta(seconds=5)
+
+def test_utc_timestamps_carry_their_offset():
+    value = datetime.datetime.fromisoformat(generate({"timezone": "utc"}))
+    assert value.utcoffset() == datetime.timedelta(0)
+    assert abs(value - datetime.datetime.now(datetime.timezone.utc)) < datetime.timedelta(seconds=5)
@@ -0,0 +1,80 @@
+import collections
+import random
+import statistics
+
+import pytest
+
+from src.generators.plan import compile_schema
+from src.state import RollingWindow, StateManager
+
+def check(window, expected, key=None):
+    """Compare a window's aggregates with ones computed from its values."""
+    assert window.values(key) == expected
+    assert window.count(key) == len(expected)
+    assert window.sum(key) == pytest.approx(sum(expected))
+    assert window.mean(key) == pytest.approx(statistics.fmean(expected))
+    assert window.min(key) == min(expected)
+    assert window.max(key) == max(expected)
+    assert window.last(key) == expected[-1]
+    if len(expected) > 1:
+        assert window.variance(key) == pytest.approx(statistics.variance(expected), rel=1e-6, abs=1e-9)
+        assert window.stdev(key) == pytest.approx(statistics.stdev(expected), rel=1e-6, abs=1e-9)
+
+def test_aggregates_match_the_window_values():
+    rng = random.Random(1)
+    window = RollingWindow("v", 7)
+    expected = collections.deque(maxlen=7)
+    for _ in range(200):
+        value = rng.choice([rng.uniform(-1e3, 1e3), rng.randint(0, 3)])
+        window.push({"v": value})
+        expected.append(float(value))
+        check(window, list(expected))
+
+def test_entities_have_their_own_windows():
+    rng = random.Random(2)
+    window = RollingWindow("v", 4, by="device")
+    expected = collections.defaultdict(lambda: collections.deque(maxlen=4))
+    for _ in range(100):
+        device = rng.choice("abc")
+        value = rng.gauss(0, 10)
+        window.push({"device": device, "v": value})
+        expected[device].append(value)
+    for device, values in expected.items():
+        check(window, list(values), device)
+    assert window.mean("unknown", default=-1) == -1 and window.count("unknown") == 0
+
+def test_batches_update_windows_like_records():
+    rng = random.Random(3)
+    records = [{"device": rng.choice("ab"), "v": rng.choice([rng.random(), None, "x", float("nan")])} for _ in range(60)]
+    pushed, extended = RollingWindow("v", 5, by="device"), RollingWindow("v", 5, by="device")
+    for record in records:
+        pushed.push(record)
+    extended.extend({"device": [r["device"] for r in records], "v": [r["v"] for r in records]})
+    for device in "ab":
+        assert pushed.values(device) == extended.values(device)
+        assert all(isinstance(value, float) and value == value for value in pushed.values(device))
+
+def test_windows_are_read_from_state_by_generators():
+    manager = StateManager({}, {"recent": {"field": "v", "size": 3}})
+    plan = compile_schema({
+        "v": {"type": "sequence_int"},
+        "avg": {"type": "dependent", "field": "v", "func": "lambda v: state['recent'].mean(None, -1)"},
+    })
+    averages = []
+    for i in range(5):
+        record = plan.generate(manager.state, i)
+        manager.update(record)
+        averages.append(record["avg"])
+    # Generators see the records before the current one
+    assert averages == [-1, 0.0, 0.5, 1.0, 2.0]
+
+@pytest.mark.parametrize("windows, message", [
+    ({"w": {"field": "v", "size": 0}}, "size"),
+    ({"w": {"size": 3}}, "field"),
+    ({"w": {"field": "v", "size": 3, "max_entities": 5}}, "needs a by field"),
+    ({"counter": {"field": "v", "size": 3}}, "initial_state"),
+    ({"w": [1]}, "dictionary"),
+])
+def test_invalid_windows_are_rejected(windows, message):
+    with pytest.raises(ValueError, match=message):
+        StateManager({"counter": 0}, windows)
@@ -0,0 +1,28 @@
+import pytest
+
+from src.config import validate_stream_config
+from src.workers import plan_shards
+
+def config(**stream):
+    schema = {"id": {"type": "sequence_int"}}
+    schema.update(stream.pop("schema", {}))
+    return {"streams": {"s": dict({"schema": schema, "rate": 5000, "outputs": [{"type": "stdout"}]}, **stream)}}
+
+def test_fast_streams_are_sharded():
+    workers = plan_shards(config(), 2)
+    assert len(workers) == 2
+
+@pytest.mark.parametrize("stream", [
+    {"schema": {"price": {"type": "stateful", "initial_value": 1, "update_func": "lambda v, s: v"}}},
+    {"windows": {"recent": {"field": "id", "size": 10}}},
+    {"rate": "max", "windows": {"recent": {"field": "id", "size": 10}}},
+])
+def test_streams_with_state_are_not_sharded(stream):
+    workers = plan_shards(config(**stream), 2)
+    assert len(workers) == 1
+    assert list(workers[0]["streams"]) == ["s"]
+
+def test_explicit_shards_rejected_for_streams_with_state():
+    stream = config(windows={"recent": {"field": "id", "size": 10}}, shards=2)["streams"]["s"]
+    with pytest.raises(ValueError, match="cannot be split"):
+        validate_stream_config("s", stream)